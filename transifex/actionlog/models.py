@@ -1,7 +1,10 @@
 from __future__ import absolute_import
 import datetime
+import threading
+from django.core.signals import request_started, request_finished
 from django.db import models
 from django.db.models import get_model
+from django.db.models.signals import post_save, post_delete
 from django.contrib.contenttypes import generic
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import User
@@ -10,32 +13,58 @@ from django.utils.translation import ugettext_lazy as _
 from django.utils.encoding import smart_unicode, force_unicode
 from django.template import loader, Context, TemplateDoesNotExist
 from django.utils.translation import get_language, activate
+from djangobulk.bulk import insert_many
 from notification.models import NoticeType
 from transifex.txcommon.log import logger
 from .queues import log_to_queues
 
+# The NoticeType objects and the compiled message templates, by label.
+_notice_types = {}
+_templates = {}
+
+# The log entries of the current request, when they are written behind.
+_buffer = threading.local()
+
+def _get_notice_type(label):
+    """Return the NoticeType object with the specified label."""
+    notice_type = _notice_types.get(label)
+    if notice_type is None:
+        notice_type = _notice_types[label] = NoticeType.objects.get(
+            label=label
+        )
+    return notice_type
+
+def _clear_notice_types(sender, **kwargs):
+    _notice_types.clear()
+
+post_save.connect(_clear_notice_types, sender=NoticeType)
+post_delete.connect(_clear_notice_types, sender=NoticeType)
+
 def _get_formatted_message(label, context):
     """
     Return a message that is a rendered template with the given context using
     the default language of the system.
     """
-    current_language = get_language()
+    template_name = 'notification/%s/notice.html' % label
+    template = _templates.get(template_name)
+    if template is None:
+        try:
+            template = loader.get_template(template_name)
+        except TemplateDoesNotExist:
+            logger.error("Template '%s' doesn't exist." % template_name)
+            return None
+        _templates[template_name] = template
 
     # Setting the environment to the default language
-    activate(settings.LANGUAGE_CODE)
-
-    c = Context(context)
-    template = 'notification/%s/notice.html' % label
+    current_language = get_language()
+    if current_language != settings.LANGUAGE_CODE:
+        activate(settings.LANGUAGE_CODE)
     try:
-        msg = loader.get_template(template).render(c)
-    except TemplateDoesNotExist:
-        logger.error("Template '%s' doesn't exist." % template)
-        msg = None
-
-    # Reset environment to original language
-    activate(current_language)
-
-    return msg
+        return template.render(Context(context))
+    finally:
+        # Reset environment to original language
+        if current_language != settings.LANGUAGE_CODE:
+            activate(current_language)
 
 def _user_counting(query):
     """
@@ -251,22 +280,72 @@ def action_logging(user, object_list, action_type, message=None, context=None):
     if message is None:
         message = _get_formatted_message(action_type, context)
 
-    action_type_obj = NoticeType.objects.get(label=action_type)
+    action_type_obj = _get_notice_type(action_type)
 
     time = datetime.datetime.now()
 
     try:
-        for object in object_list:
-            l = LogEntry(
-                    user_id = user.pk,
-                    content_type = ContentType.objects.get_for_model(object),
-                    object_id = object.pk,
-                    object_name = force_unicode(object)[:200],
-                    action_type = action_type_obj,
-                    action_time = time,
-                    message = message)
-            l.save()
-            if settings.USE_REDIS:
-                log_to_queues(object, user, time, action_type_obj, message)
+        object_list = list(object_list)
     except TypeError:
         raise TypeError("The 'object_list' parameter must be iterable")
+    rows = []
+    for object in object_list:
+        rows.append({
+            'user_id': user.pk,
+            'content_type_id': ContentType.objects.get_for_model(object).pk,
+            'object_id': object.pk,
+            'object_name': force_unicode(object)[:200],
+            'action_type_id': action_type_obj.pk,
+            'action_time': time,
+            'message': message,
+        })
+    if getattr(settings, 'ACTIONLOG_WRITE_BEHIND', False):
+        _write_behind(rows)
+    else:
+        save_log_entries(rows)
+    if settings.USE_REDIS:
+        log_to_queues(object_list, user, time, action_type_obj, message)
+
+def save_log_entries(rows):
+    """Insert log entries in bulk.
+
+    Args:
+        rows: A list of dictionaries with the values of the fields of the
+            log entries.
+    """
+    insert_many(LogEntry, [LogEntry(**row) for row in rows])
+
+def _write_behind(rows):
+    """Leave the saving of log entries to a celery task.
+
+    Inside a request, the entries are buffered and saved by a single task
+    when the request finishes.
+    """
+    buffered = getattr(_buffer, 'rows', None)
+    if buffered is not None:
+        buffered.extend(rows)
+    else:
+        _save_behind(rows)
+
+def _save_behind(rows):
+    from .tasks import save_log_entries_task
+    try:
+        save_log_entries_task.delay(rows)
+    except Exception, e:
+        logger.error(
+            "Could not queue %d log entries, saving them now: %s" % (
+                len(rows), e
+            ), exc_info=True
+        )
+        save_log_entries(rows)
+
+def _start_buffering(sender, **kwargs):
+    _buffer.rows = []
+
+def _flush_buffer(sender, **kwargs):
+    rows, _buffer.rows = getattr(_buffer, 'rows', None), None
+    if rows:
+        _save_behind(rows)
+
+request_started.connect(_start_buffering)
+request_finished.connect(_flush_buffer)
@@ -4,6 +4,8 @@
 Redis related stuff for action logs.
 """
 
+import re
+from django.core.cache import cache
 from django.db.models import get_model
 from django.utils.encoding import force_unicode
 from django.contrib.auth.models import User
@@ -27,35 +29,88 @@ def redis_key_for_user(user):
     return 'user:history:%s' % user.id
 
 
+# The cache key of the slugs of the private projects.
+PRIVATE_SLUGS_KEY = 'actionlog.private_project_slugs'
+
+# The slugs the matcher of the current process has been compiled for and
+# the matcher itself.
+_private_matcher = (None, None)
+
+
+def invalidate_private_slugs(sender, **kwargs):
+    """Signal handler to invalidate the cached slugs of the private
+    projects.
+    """
+    cache.delete(PRIVATE_SLUGS_KEY)
+
+
+def _private_slugs_matcher():
+    """Return a compiled regular expression that matches the urls of the
+    private projects in a message, or None, if there are no private
+    projects.
+    """
+    global _private_matcher
+    slugs = cache.get(PRIVATE_SLUGS_KEY)
+    if slugs is None:
+        Project = get_model('projects', 'Project')
+        slugs = frozenset(Project.objects.filter(
+            private=True
+        ).values_list('slug', flat=True))
+        cache.set(PRIVATE_SLUGS_KEY, slugs)
+    if _private_matcher[0] != slugs:
+        matcher = None
+        if slugs:
+            matcher = re.compile('/projects/p/(?:%s)/' % '|'.join(
+                re.escape(slug) for slug in slugs
+            ))
+        _private_matcher = (slugs, matcher)
+    return _private_matcher[1]
+
+
 @redis_exception_handler
-def log_to_queues(o, user, action_time, action_type, message):
-    """Log actions to redis' queues."""
+def log_to_queues(objects, user, action_time, action_type, message):
+    """Log an action on some objects to redis' queues.
+
+    The writes to all queues are sent in a single pipeline.
+    """
     Project = get_model('projects', 'Project')
     Resource = get_model('resources', 'Resource')
     Team = get_model('teams', 'Team')
-    _log_to_user_history(user, action_time, action_type, message)
-    if isinstance(o, Project):
-        _log_to_recent_project_actions(o, user.id, action_time, message)
-        _log_to_project_history(o, action_time, action_type, message)
-    elif isinstance(o, Resource):
-        _log_to_resource_history(o, action_time, action_type, message)
-    elif isinstance(o, Team):
-        _log_to_team_history(o, action_time, action_type, message)
-
-def _log_to_recent_project_actions(p, user_id, action_time, message):
+    pipe = TxRedisMapper().pipeline()
+    for o in objects:
+        _log_to_user_history(pipe, user, action_time, action_type, message)
+        if isinstance(o, Project):
+            _log_to_recent_project_actions(
+                pipe, o, user.id, action_time, message
+            )
+            _log_to_project_history(
+                pipe, o, action_time, action_type, message
+            )
+        elif isinstance(o, Resource):
+            _log_to_resource_history(
+                pipe, o, action_time, action_type, message
+            )
+        elif isinstance(o, Team):
+            _log_to_team_history(pipe, o, action_time, action_type, message)
+    pipe.execute()
+
+
+def _push(pipe, key, data, length):
+    """Push an item to a queue and trim it to its length."""
+    pipe.lpush(key, data=data)
+    pipe.ltrim(key, 0, length - 1)
+
+
+def _log_to_recent_project_actions(pipe, p, user_id, action_time, message):
     """Log actions that refer to projects to a queue of most recent actions.
 
     We use redis' list for that. We skip actions that refer to private projects.
     """
-    Project = get_model('projects', 'Project')
     if p.private:
         return
-    private_slugs = Project.objects.filter(
-        private=True
-    ).values_list('slug', flat=True)
-    for slug in private_slugs:
-        if ('/projects/p/%s/' % slug) in message:
-            return
+    matcher = _private_slugs_matcher()
+    if matcher is not None and matcher.search(message):
+        return
 
     key = 'event_feed'
     data = {
@@ -64,64 +119,50 @@ def _log_to_recent_project_actions(p, user_id, action_time, message):
         'action_time': action_time,
         'message': message
     }
-    r = TxRedisMapper()
-    r.lpush(key, data=data)
-    r.ltrim(key, 0, 11)
+    _push(pipe, key, data, 12)
 
 
-@redis_exception_handler
-def _log_to_project_history(project, action_time, action_type, message):
+def _log_to_project_history(pipe, project, action_time, action_type, message):
     """Log a message to a project's history queue."""
-    Project = get_model('projects', 'Project')
     key = redis_key_for_project(project)
     data = {
         'action_time': action_time,
         'message': message,
         'action_type': action_type,
     }
-    r = TxRedisMapper()
-    r.lpush(key, data=data)
-    r.ltrim(key, 0, 4)
+    _push(pipe, key, data, 5)
 
     # Store logs in hubs, too
     if project.outsource:
         _log_to_project_history(
-            project.outsource, action_time, action_type, message
+            pipe, project.outsource, action_time, action_type, message
         )
 
 
-@redis_exception_handler
-def _log_to_resource_history(resource, action_time, action_type, message):
+def _log_to_resource_history(pipe, resource, action_time, action_type,
+                             message):
     """Log a message to a resource's history queue."""
-    Resource = get_model('resources', 'Resource')
     key = redis_key_for_resource(resource)
     data = {
         'action_time': action_time,
         'message': message,
         'action_type': action_type,
     }
-    r = TxRedisMapper()
-    r.lpush(key, data=data)
-    r.ltrim(key, 0, 4)
+    _push(pipe, key, data, 5)
 
 
-@redis_exception_handler
-def _log_to_team_history(team, action_time, action_type, message):
+def _log_to_team_history(pipe, team, action_time, action_type, message):
     """Log a message to a team's history queue."""
-    Resource = get_model('teams', 'Team')
     key = redis_key_for_team(team)
     data = {
         'action_time': action_time,
         'message': message,
         'action_type': action_type,
     }
-    r = TxRedisMapper()
-    r.lpush(key, data=data)
-    r.ltrim(key, 0, 4)
+    _push(pipe, key, data, 5)
 
 
-@redis_exception_handler
-def _log_to_user_history(user, action_time, action_type, message):
+def _log_to_user_history(pipe, user, action_time, action_type, message):
     """Log a message to a user's history queue."""
     key = redis_key_for_user(user)
     data = {
@@ -130,6 +171,4 @@ def _log_to_user_history(user, action_time, action_type, message):
         'action_type': action_type,
         'user': user.username
     }
-    r = TxRedisMapper()
-    r.lpush(key, data=data)
-    r.ltrim(key, 0, 11)
+    _push(pipe, key, data, 12)
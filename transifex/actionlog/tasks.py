@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+from celery.decorators import task
+
+
+@task(name='save_log_entries', ignore_result=True)
+def save_log_entries_task(rows):
+    """Save the log entries that have been written behind."""
+    from transifex.actionlog.models import save_log_entries
+    save_log_entries(rows)
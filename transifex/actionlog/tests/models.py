@@ -0,0 +1,59 @@
+#-*- coding: utf-8 -*-
+from django.conf import settings
+from django.core.signals import request_started, request_finished
+from mock import patch
+from transifex.txcommon.tests import base
+from transifex.actionlog.models import *
+
+
+class ActionlogModelTests(base.BaseTestCase):
+
+    def _entries(self):
+        return LogEntry.objects.filter(
+            action_type__label='project_changed', user=self.user['maintainer']
+        )
+
+    def test_action_logging(self):
+        """Test that an entry is saved for each object."""
+        before = self._entries().count()
+        action_logging(self.user['maintainer'],
+                       [self.project, self.resource], 'project_changed',
+                       message='changed')
+        entries = self._entries()
+        self.assertEqual(entries.count(), before + 2)
+        self.assertEqual(set(e.object for e in entries[:2]),
+                         set([self.project, self.resource]))
+        # The notice type is fetched from the database once.
+        self.assertNumQueries(1, action_logging, self.user['maintainer'],
+                              [self.project], 'project_changed',
+                              message='changed')
+
+    def test_write_behind(self):
+        """Test that the entries of a request are saved at its end."""
+        old_write_behind = getattr(settings, 'ACTIONLOG_WRITE_BEHIND', False)
+        settings.ACTIONLOG_WRITE_BEHIND = True
+        before = self._entries().count()
+        try:
+            with patch('transifex.actionlog.tasks.save_log_entries_task.delay',
+                       save_log_entries):
+                request_started.send(sender=None)
+                action_logging(self.user['maintainer'], [self.project],
+                               'project_changed', message='changed')
+                action_logging(self.user['maintainer'], [self.resource],
+                               'project_changed', message='changed')
+                self.assertEqual(self._entries().count(), before)
+                request_finished.send(sender=None)
+        finally:
+            settings.ACTIONLOG_WRITE_BEHIND = old_write_behind
+        self.assertEqual(self._entries().count(), before + 2)
+
+    def test_private_slugs_matcher(self):
+        """Test the matcher of the urls of private projects."""
+        from transifex.actionlog.queues import _private_slugs_matcher
+        matcher = _private_slugs_matcher()
+        self.assertTrue(matcher.search('<a href="/projects/p/project2/">'))
+        self.assertFalse(matcher.search('<a href="/projects/p/project1/">'))
+        self.project.private = True
+        self.project.save()
+        matcher = _private_slugs_matcher()
+        self.assertTrue(matcher.search('<a href="/projects/p/project1/">'))
@@ -5,6 +5,9 @@ File containing the necessary mechanics for the txlanguages management command.
 from optparse import make_option, OptionParser
 import os.path
 import sys
+import threading
+import time
+from multiprocessing.pool import ThreadPool
 from django.core.management.base import (BaseCommand, LabelCommand, CommandError)
 from django.db.models import get_model
 from django.conf import settings
@@ -12,6 +15,20 @@ from django.conf import settings
 URLInfo = get_model("autofetch", "URLInfo")
 Resource = get_model("resources", "Resource")
 
+
+def _fetch(handler, force):
+    """Fetch the source file of a URLInfo object in a worker thread.
+
+    Returns:
+        A tuple with the handler, the FetchedFile object (or None) and the
+        exception raised (or None).
+    """
+    try:
+        return handler, handler.fetch_source_file(force=force), None
+    except Exception, e:
+        return handler, None, e
+
+
 class Command(LabelCommand):
     """
     Management Command Class about resource source file updating
@@ -25,12 +42,23 @@ class Command(LabelCommand):
         make_option('--skip', action='store_true',
             dest='skip', default=False,
             help='Import data from a file or from the default '),
+        make_option('--workers', action='store', type='int',
+            dest='workers', default=8,
+            help='The number of source files fetched concurrently.'),
+        make_option('--force', action='store_true',
+            dest='force', default=False,
+            help='Fetch and import the source files, even if they have not '
+                 'changed since the last import.'),
     )
 
     can_import_settings = True
 
     def handle(self, *args, **options):
         skip = options.get('skip')
+        force = options.get('force')
+        workers = options.get('workers')
+        if workers < 1:
+            raise CommandError("The --workers option must be at least 1.")
         resource_urlhandlers = []
         if not args:
             resource_urlhandlers = URLInfo.objects.filter(auto_update=True)
@@ -46,7 +74,12 @@ class Command(LabelCommand):
 
             resource_urlhandlers = URLInfo.objects.filter(resource__in=resources)
 
-        num = resource_urlhandlers.count()
+        # Everything the imports need is fetched here, so that the worker
+        # threads do not access the database.
+        resource_urlhandlers = list(resource_urlhandlers.select_related(
+            'resource__project', 'resource__source_language'
+        ))
+        num = len(resource_urlhandlers)
 
         if num == 0:
             sys.stderr.write("No resources suitable for updating found. Exiting...\n")
@@ -54,19 +87,67 @@ class Command(LabelCommand):
 
         sys.stdout.write("A total of %s resources are listed for updating.\n" % num)
 
-        for seq, handler in enumerate(resource_urlhandlers):
-            sys.stdout.write((u"Updating resource %s.%s (%s of %s)\n" %
-                ( handler.resource.project.slug, handler.resource.slug, seq+1,num)).encode('UTF-8'))
-            try:
-                handler.update_source_file()
-            except Exception, e:
-                sys.stderr.write((u"Error updating source file for resource %s.%s\n" %
-                    ( handler.resource.project.slug, handler.resource.slug)).encode('UTF-8'))
-                sys.stderr.write("Exception was: %s\n" % e)
-                if skip:
-                    continue
-                sys.stderr.write("Aborting...\n")
-                sys.exit(1)
-            else:
-               sys.stdout.write((u"Updated source file for resource %s.%s\n" %
-                    (handler.resource.project.slug, handler.resource.slug)).encode('UTF-8'))
+        # The files are fetched by a pool of threads and imported one at a
+        # time in this thread. At most 2 * workers files are held in memory
+        # while they wait to be imported.
+        slots = threading.BoundedSemaphore(2 * workers)
+
+        def pending():
+            for handler in resource_urlhandlers:
+                slots.acquire()
+                yield handler
+
+        pool = ThreadPool(workers)
+        start = time.time()
+        unchanged = 0
+        try:
+            results = pool.imap_unordered(
+                lambda handler: _fetch(handler, force), pending()
+            )
+            for seq, (handler, fetched, error) in enumerate(results):
+                try:
+                    import_time = self._update(
+                        handler, fetched, error, seq, num, force
+                    )
+                except Exception, e:
+                    sys.stderr.write((u"Error updating source file for resource %s.%s\n" %
+                        ( handler.resource.project.slug, handler.resource.slug)).encode('UTF-8'))
+                    sys.stderr.write("Exception was: %s\n" % e)
+                    if skip:
+                        continue
+                    sys.stderr.write("Aborting...\n")
+                    sys.exit(1)
+                finally:
+                    slots.release()
+                if import_time is None:
+                    unchanged += 1
+        finally:
+            pool.terminate()
+            pool.join()
+        sys.stdout.write("Fetched %s resources (%s unchanged) in %.2f s.\n" %
+            (num, unchanged, time.time() - start))
+
+    def _update(self, handler, fetched, error, seq, num, force):
+        """Import the fetched source file of a resource.
+
+        Returns:
+            The time spent to import the file in seconds, or None if the file
+            had not changed.
+        """
+        slug = u"%s.%s" % (handler.resource.project.slug, handler.resource.slug)
+        sys.stdout.write((u"Updating resource %s (%s of %s)\n" %
+            (slug, seq + 1, num)).encode('UTF-8'))
+        if error is not None:
+            raise error
+        if not (force or handler.has_changed(fetched)):
+            handler.import_source_file(fetched)
+            sys.stdout.write((u"Source file for resource %s is unchanged "
+                "(fetch %.2f s)\n" % (slug, fetched.elapsed)).encode('UTF-8'))
+            return None
+        start = time.time()
+        handler.import_source_file(fetched, force=force)
+        elapsed = time.time() - start
+        sys.stdout.write((u"Updated source file for resource %s "
+            "(fetch %.2f s, import %.2f s)\n" %
+            (slug, fetched.elapsed, elapsed)).encode('UTF-8'))
+        return elapsed
@@ -1,5 +1,7 @@
 import gc
+import time
 from django.db import models
+from django.utils.hashcompat import md5_constructor
 from django.utils.translation import ugettext_lazy as _
 
 from transifex.resources.models import Resource
@@ -11,6 +13,35 @@ import urllib2, urlparse
 from uuid import uuid4
 
 
+class FetchedFile(object):
+    """The response to the request for a source file.
+
+    Attributes:
+        content: The content of the file, or None if it has not been
+            modified since the last fetch.
+        content_hash: The md5 hash of the content.
+        filename: The name of the file.
+        etag: The ETag header of the response.
+        last_modified: The Last-Modified header of the response.
+        elapsed: The time spent to fetch the file, in seconds.
+    """
+
+    def __init__(self, content=None, filename='', etag='', last_modified='',
+                 elapsed=0):
+        self.content = content
+        self.content_hash = None
+        if content is not None:
+            self.content_hash = md5_constructor(content).hexdigest()
+        self.filename = filename
+        self.etag = etag
+        self.last_modified = last_modified
+        self.elapsed = elapsed
+
+    @property
+    def not_modified(self):
+        return self.content is None
+
+
 class URLInfo(models.Model):
 
    # URL info for remote fetching/updating
@@ -23,6 +54,17 @@ class URLInfo(models.Model):
         " file should be automatically updated by pulling and merging from"\
         " the given URL."))
 
+    # Validators of the last imported file, for conditional requests
+    etag = models.CharField(_("ETag"), max_length=255, blank=True,
+        default='', editable=False, help_text=_("The ETag of the last"
+        " imported source file."))
+    last_modified = models.CharField(_("Last modified"), max_length=64,
+        blank=True, default='', editable=False, help_text=_("The"
+        " Last-Modified date of the last imported source file."))
+    content_hash = models.CharField(_("Content hash"), max_length=32,
+        blank=True, default='', editable=False, help_text=_("The md5 hash"
+        " of the content of the last imported source file."))
+
     # Foreign keys
     resource = models.OneToOneField(Resource, verbose_name=_('Resource'),
         blank=False, null=False, related_name='url_info', unique=True,
@@ -35,32 +77,97 @@ class URLInfo(models.Model):
     def __unicode__(self):
         return "%s.%s" % (self.resource.project.slug, self.resource.slug)
 
-    def update_source_file(self, fake=False):
+    def save(self, *args, **kwargs):
+        """Forget the validators of the last import, if the URL changed."""
+        if self.pk is not None:
+            old_urls = URLInfo.objects.filter(pk=self.pk).values_list(
+                'source_file_url', flat=True
+            )
+            if old_urls and old_urls[0] != self.source_file_url:
+                self.etag = self.last_modified = self.content_hash = ''
+        super(URLInfo, self).save(*args, **kwargs)
+
+    def fetch_source_file(self, force=False):
         """
-        Fetch source file from remote url and import it, updating existing
-        entries.
+        Fetch the source file from the remote url.
+
+        Unless forced, the request is conditional on the validators of the
+        last imported file. This method does not access the database, so
+        that it can be called from other threads.
+
+        Returns:
+            A FetchedFile object.
         """
+        request = urllib2.Request(self.source_file_url)
+        if not force:
+            if self.etag:
+                request.add_header('If-None-Match', self.etag)
+            if self.last_modified:
+                request.add_header('If-Modified-Since', self.last_modified)
+        start = time.time()
         try:
-            source_file = urllib2.urlopen(self.source_file_url)
+            source_file = urllib2.urlopen(request)
+        except urllib2.HTTPError, e:
+            if e.code == 304:
+                return FetchedFile(
+                    etag=self.etag, last_modified=self.last_modified,
+                    elapsed=time.time() - start
+                )
+            logger.error("Could not pull source file %s: %s" %
+                (self.source_file_url, e))
+            raise
         except:
-            logger.error("Could not pull source file for resource %s (%s)" %
-                (self.resource.full_name, self.source_file_url))
+            logger.error("Could not pull source file %s" %
+                self.source_file_url)
             raise
 
-        filename = ''
-        if source_file.info().has_key('Content-Disposition'):
+        try:
+            info = source_file.info()
+            filename = ''
+            if info.has_key('Content-Disposition'):
                 # If the response has Content-Disposition, we try to take
                 # filename from it
-                content = source_file.info()['Content-Disposition']
+                content = info['Content-Disposition']
                 if 'filename' in content:
                     filename = content.split('filename')[1]
                     filename = filename.replace('"', '').replace("'", ""
                         ).replace("=", "").replace('/', '-').strip()
 
-        if filename == '':
-            parts = urlparse.urlsplit(self.source_file_url)
-            #FIXME: This still might end empty
-            filename = parts.path.split('/')[-1]
+            if filename == '':
+                parts = urlparse.urlsplit(self.source_file_url)
+                #FIXME: This still might end empty
+                filename = parts.path.split('/')[-1]
+
+            return FetchedFile(
+                content=source_file.read(), filename=filename,
+                etag=info.get('ETag', ''),
+                last_modified=info.get('Last-Modified', ''),
+                elapsed=time.time() - start
+            )
+        finally:
+            source_file.close()
+
+    def has_changed(self, fetched):
+        """Return whether a fetched file differs from the last imported one."""
+        return not fetched.not_modified and \
+                fetched.content_hash != self.content_hash
+
+    def import_source_file(self, fetched, fake=False, force=False):
+        """
+        Import a fetched source file, updating existing entries.
+
+        Unless forced, files that have not been modified since the last
+        import are not parsed. Unless faked, the validators of the file are
+        stored for the next fetch.
+
+        Returns:
+            A tuple with the number of the added and the updated strings.
+        """
+        if fetched.not_modified:
+            return 0, 0
+        if not (fake or force or self.has_changed(fetched)):
+            self._store_validators(fetched)
+            return 0, 0
 
         try:
             if not self.resource.i18n_method:
@@ -69,11 +176,10 @@ class URLInfo(models.Model):
                 return
             parser = registry.appropriate_handler(
                 self.resource, language=self.resource.source_language,
-                filename=filename
+                filename=fetched.filename
             )
             language = self.resource.source_language
-            content = source_file.read()
-            parser.bind_content(content)
+            parser.bind_content(fetched.content)
             parser.set_language(language)
             parser.bind_resource(self.resource)
             parser.is_content_valid()
@@ -81,13 +187,34 @@ class URLInfo(models.Model):
             strings_added, strings_updated = 0, 0
             if not fake:
                 strings_added, strings_updated = parser.save2db(is_source=True)
+                self._store_validators(fetched)
         except Exception,e:
             logger.error("Error importing source file for resource %s.%s (%s): %s" %
                 ( self.resource.project.slug, self.resource.slug,
                     self.source_file_url, str(e)))
             raise
         finally:
-            source_file.close()
             gc.collect()
 
         return strings_added, strings_updated
+
+    def update_source_file(self, fake=False, force=False):
+        """
+        Fetch source file from remote url and import it, updating existing
+        entries.
+        """
+        force = force or fake
+        return self.import_source_file(
+            self.fetch_source_file(force=force), fake=fake, force=force
+        )
+
+    def _store_validators(self, fetched):
+        """Store the validators of an imported file."""
+        self.etag = fetched.etag[:255]
+        self.last_modified = fetched.last_modified[:64]
+        self.content_hash = fetched.content_hash
+        if self.pk is not None:
+            URLInfo.objects.filter(pk=self.pk).update(
+                etag=self.etag, last_modified=self.last_modified,
+                content_hash=self.content_hash
+            )
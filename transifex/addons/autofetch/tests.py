@@ -57,3 +57,26 @@ class TestFetchUrl(BaseTestCase):
             '"status": 500, "message": "Error updating source file."',
             status_code=200
         )
+
+    def test_unchanged_source_file(self):
+        """Test that an unchanged source file is not imported again."""
+        source_url = os.path.join(
+            settings.TX_ROOT, 'resources/tests/lib/pofile/tests.pot'
+        )
+        url_info = URLInfo.objects.create(
+            source_file_url='file://' + source_url,
+            auto_update=True, resource = self.resource
+        )
+        fetched = url_info.fetch_source_file()
+        self.assertTrue(url_info.has_changed(fetched))
+        url_info.import_source_file(fetched)
+        url_info = URLInfo.objects.get(pk=url_info.pk)
+        self.assertEquals(url_info.content_hash, fetched.content_hash)
+
+        fetched = url_info.fetch_source_file()
+        self.assertFalse(url_info.has_changed(fetched))
+        self.assertEquals(url_info.import_source_file(fetched), (0, 0))
+
+        url_info.source_file_url = 'file://' + source_url + '?changed'
+        url_info.save()
+        self.assertEquals(url_info.content_hash, '')
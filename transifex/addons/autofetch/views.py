@@ -19,7 +19,7 @@ def fetch_url(request, project_slug, resource_slug):
     try:
         urlinfo = URLInfo.objects.get(resource__slug=resource_slug,
             resource__project__slug=project_slug)
-        urlinfo.update_source_file()
+        urlinfo.update_source_file(force=True)
     except URLInfo.DoesNotExist:
         response_dict = { 'status':404,
                           'message':_("URL not set for this resource."),
@@ -4,7 +4,8 @@ from django.http import Http404, HttpResponseRedirect, HttpResponse
 from django.shortcuts import get_object_or_404, render_to_response
 from django.template import RequestContext
 from transifex.projects.models import Project
-from transifex.resources.models import Resource, RLStats
+from transifex.resources.models import Resource, RLStats, \
+        ProjectLanguageStats, ProjectStats
 from transifex.txcommon.context_processors import site_url_prefix_processor
 from transifex.txcommon.utils import key_sort
 
@@ -40,6 +41,11 @@ def get_sorted_stats(obj, project=False):
     else:
         return key_sort(obj, '-translated_perc')[:NUM_LANGS]
 
+def get_project_stats(project):
+    """Return the statistics of a project per language."""
+    return ProjectLanguageStats.objects.by_project(project).aggregated(
+        ProjectStats.objects.by_project(project).total_entities())
+
 def get_image_url(obj, project=False):
     """
     Returns URL for the static image
@@ -102,8 +108,7 @@ def chart_project_image(request, project_slug):
     if project.private:
         raise PermissionDenied
     return HttpResponseRedirect(get_image_url(
-        RLStats.objects.by_project_language_aggregated(project
-            ), True))
+        get_project_stats(project), True))
 
 def chart_resource_html_js(request, project_slug, resource_slug, template_name):
     resource = get_object_or_404(Resource, slug=resource_slug,
@@ -136,5 +141,4 @@ def chart_project_json(request, project_slug):
     if project.private:
         raise PermissionDenied
     return HttpResponse(content = get_gviz_json(
-        RLStats.objects.by_project_language_aggregated(project
-            ), True))
+        get_project_stats(project), True))
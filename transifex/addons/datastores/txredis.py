@@ -79,3 +79,11 @@ class TxRedisMapper(TxRedis):
             return functools.update_wrapper(new_attr, attr)
         else:
             return super(TxRedisMapper, self).__getattr__(name)
+
+    def pipeline(self, transaction=True):
+        """Return a mapper which buffers the commands in a pipeline, until
+        its ``execute`` method is called.
+        """
+        mapper = TxRedisMapper.__new__(TxRedisMapper)
+        mapper._r = self._r.pipeline(transaction=transaction)
+        return mapper
@@ -8,7 +8,7 @@ from django.contrib.sites.models import Site
 from django.contrib import messages
 from notification  import models as notification
 from transifex.resources.models import Resource
-from transifex.resources.utils import invalidate_template_cache
+from transifex.txcommon.cache import bump_generation
 from transifex.teams.models import Team
 from transifex.txcommon.log import logger
 from txcron.signals import cron_daily, cron_hourly
@@ -40,6 +40,9 @@ def pre_handler(sender, resource=None, language=None, user=None,
 # Update the lock if user checked the checkbox
 def post_handler(sender, request=None, resource=None, language=None,
     user=None, instance=None, **kwargs):
+    if request is None:
+        # The file has been imported in the background.
+        return
     if 'lock_extend' in request.POST and request.POST['lock_extend']:
         if user:
             Lock.objects.create_update(resource, language, user).expires
@@ -116,20 +119,8 @@ def invalidate_cache(sender, instance, created=True, **kwargs):
     if created:
         logger.debug("lock-addon: Invalidating cache: %s" % instance)
 
-        invalidate_template_cache('resource_details_lang',
-            instance.rlstats.resource.project.slug,
-            instance.rlstats.resource.slug,
-            instance.rlstats.language.code)
-
-        invalidate_template_cache('resource_details',
-            instance.rlstats.resource.project.slug,
-            instance.rlstats.resource.slug)
-
-        invalidate_template_cache("team_details",
-            instance.rlstats.resource.project.slug,
-            instance.rlstats.language.code,
-            instance.rlstats.resource.id
-        )
+        bump_generation('resource_language',
+            instance.rlstats.resource_id, instance.rlstats.language_id)
 
 def connect():
     pre_submit_translation.connect(pre_handler, sender=Resource)
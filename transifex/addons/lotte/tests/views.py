@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
+from __future__ import with_statement
+from django.conf import settings
 from django.core.urlresolvers import reverse
+from django.db import connection
 from django.db.models.loading import get_model
 from django.utils import simplejson as json
+from mock import patch
 from transifex.txcommon.tests.base import BaseTestCase
 from utils import *
 
@@ -272,6 +276,60 @@ class LotteViewsTests(BaseTestCase):
             source_entity=self.source_entity_plural,
             language=self.language_ar).count(), 6)
 
+    def test_push_invalidates_stats_once(self):
+        """Test that the stats of a push are invalidated once per language."""
+        data = {"strings":[{"id":self.source_string_plural1.id,
+                            "translations":{
+                                "zero":"ArabicTrans0_2",
+                                "one":"ArabicTrans1_2",
+                                "two":"ArabicTrans2_2",
+                                "few":"ArabicTrans3_2",
+                                "many":"ArabicTrans4_2",
+                                "other":"ArabicTrans5_2",}
+                           },]
+               }
+        with patch('transifex.resources.handlers._invalidate_stats_cache') \
+                as invalidate_mock:
+            resp = self.client['maintainer'].post(self.push_translation,
+                json.dumps(data), content_type='application/json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(invalidate_mock.call_count, 1)
+        args, kwargs = invalidate_mock.call_args
+        self.assertEqual(args, (self.resource, self.language_ar))
+
+    def test_push_plural_delta_wordcount(self):
+        """Test that the stats delta of a push counts the words of all
+        the plural forms of the source string.
+        """
+        Translation.objects.filter(source_entity=self.source_entity_plural,
+            language=self.language_ar).delete()
+        data = {"strings":[{"id":self.source_string_plural1.id,
+                            "translations":{
+                                "zero":"ArabicTrans0_3",
+                                "one":"ArabicTrans1_3",
+                                "two":"ArabicTrans2_3",
+                                "few":"ArabicTrans3_3",
+                                "many":"ArabicTrans4_3",
+                                "other":"ArabicTrans5_3",}
+                           },]
+               }
+        wordcount = sum(Translation.objects.filter(
+            source_entity=self.source_entity_plural,
+            language=self.resource.source_language
+        ).values_list('wordcount', flat=True))
+        old_incremental = getattr(settings, 'INCREMENTAL_STATS', False)
+        settings.INCREMENTAL_STATS = True
+        try:
+            with patch('transifex.resources.handlers._invalidate_stats_cache') \
+                    as invalidate_mock:
+                resp = self.client['maintainer'].post(self.push_translation,
+                    json.dumps(data), content_type='application/json')
+        finally:
+            settings.INCREMENTAL_STATS = old_incremental
+        self.assertEqual(resp.status_code, 200)
+        delta = invalidate_mock.call_args[1]['delta']
+        self.assertEqual(delta[self.language_ar.id], (1, 0, wordcount))
+
     def test_push_singular_translation(self):
         data1 = {"strings":[{"id":self.source_string3.id,
                              "translations":{
@@ -327,6 +385,33 @@ class LotteViewsTests(BaseTestCase):
             source_entity=self.source_entity4,
             language=self.language_ar).count(), 1)
 
+    def test_push_many_translations(self):
+        """Test that the strings of a push are saved or rejected separately."""
+        data = {"strings":[{"id":self.source_string1.id,
+                            "translations":{"other":"String2_ar",}},
+                           {"id":self.source_string3.id,
+                            "translations":{"other":"String4_ar",}},
+                           {"id":self.source_string4.id,
+                            "translations":{
+                                "other":"String with arguments: %s %f",}},]
+               }
+        resp = self.client['maintainer'].post(self.push_translation,
+            json.dumps(data), content_type='application/json')
+        self.assertEqual(resp.status_code, 200)
+        statuses = json.loads(resp.content)
+        self.assertEqual(statuses[str(self.source_string1.id)]['status'], 200)
+        self.assertEqual(statuses[str(self.source_string3.id)]['status'], 200)
+        self.assertEqual(statuses[str(self.source_string4.id)]['status'], 400)
+        self.assertEqual(Translation.objects.get(
+            source_entity=self.source_entity1,
+            language=self.language_ar).string, "String2_ar")
+        self.assertEqual(Translation.objects.get(
+            source_entity=self.source_entity3,
+            language=self.language_ar).string, "String4_ar")
+        self.assertEqual(Translation.objects.filter(
+            source_entity=self.source_entity4,
+            language=self.language_ar).count(), 0)
+
     def test_dt_search_string(self):
         """Test the Datatable's search."""
         self.DataTable_params["sSearch"] = "ArabicTrans"
@@ -352,6 +437,38 @@ class LotteViewsTests(BaseTestCase):
             self.translate_content_arabic_url, self.DataTable_params)
         self.assertContains(resp, 'ArabicTrans', status_code=200)
 
+    def test_stringset_queries(self):
+        """Test that the queries of the stringset do not depend on the
+        number of strings in the page.
+        """
+        from transifex.addons.lotte.views import _get_stringset
+        params = self.DataTable_params.copy()
+        params['iDisplayLength'] = 50
+        params['more_languages'] = '%s,' % self.language_en.id
+
+        def count_queries():
+            connection.use_debug_cursor = True
+            start = len(connection.queries)
+            try:
+                resp = _get_stringset(
+                    params, [self.resource], self.language_ar, review=True
+                )
+            finally:
+                connection.use_debug_cursor = False
+            self.assertEqual(resp.status_code, 200)
+            rows = json.loads(resp.content)['aaData']
+            return len(rows), len(connection.queries) - start
+
+        rows, queries = count_queries()
+        for i in range(20):
+            se = SourceEntity.objects.create(string='Bulk%s' % i,
+                context='Bulk', resource=self.resource)
+            for language in (self.language_en, self.language_ar):
+                se.translations.create(string='Bulk%s' % i,
+                    language=language, user=self.user['maintainer'],
+                    rule=5, resource=self.resource)
+        self.assertEqual(count_queries(), (rows + 20, queries))
+
     def test_filters(self):
         """Test lotte filters one by one."""
         pass
@@ -25,12 +25,16 @@ from transifex.txcommon.log import logger
 from transifex.languages.models import Language
 from transifex.projects.models import Project
 from transifex.projects.permissions import *
-from transifex.projects.permissions.project import ProjectPermission
+from transifex.projects.permissions.project import \
+        ProjectPermissionSnapshot, permission_snapshot
 from transifex.resources.models import Translation, Resource, SourceEntity, \
     ReviewHistory, get_source_language
-from transifex.resources.handlers import invalidate_stats_cache
-from transifex.resources.formats.validators import create_error_validators, \
-        create_warning_validators, ValidationError
+from transifex.resources.handlers import invalidate_stats_cache, \
+        coalesce_invalidations
+from transifex.resources.stats import StatsDelta
+from transifex.resources.states import get_state_index
+from transifex.resources.formats.validators import ValidatorPipeline, \
+        ValidationError
 from transifex.teams.models import Team
 from transifex.txcommon.decorators import one_perm_required_or_403
 from transifex.txcommon.utils import normalize_query
@@ -67,7 +71,7 @@ def translate(request, project_slug, lang_code, resource_slug=None,
     # Project should always be available
     project = get_object_or_404(Project, slug=project_slug)
     team = Team.objects.get_or_none(project, lang_code)
-    check = ProjectPermission(request.user)
+    check = permission_snapshot(request)
     if not check.submit_translations(team or project) and not\
         check.maintain(project):
         return permission_denied(request)
@@ -203,7 +207,7 @@ def exit(request, project_slug, lang_code, resource_slug=None, *args, **kwargs):
     # Project should always be available
     project = get_object_or_404(Project, slug=project_slug)
     team = Team.objects.get_or_none(project, lang_code)
-    check = ProjectPermission(request.user)
+    check = permission_snapshot(request)
     if not check.submit_translations(team or project) and not\
         check.maintain(project):
         return permission_denied(request)
@@ -289,6 +293,18 @@ def view_strings(request, project_slug, lang_code, resource_slug=None,
 #FIXME: Find a more clever way to do it, to avoid putting placeholders.
 SORTING_DICT=( 'id', 'id', 'string')
 
+# The states of the strings that the combinations of the state filters
+# select (see _get_source_strings_for_request) in the state indexes.
+STATE_FILTERS = {
+    0: ('all', ),
+    1: ('untranslated', ),
+    2: ('translated', ),
+    3: (),
+    4: ('reviewed', ),
+    5: ('unreviewed', ),
+    6: ('untranslated', 'reviewed', ),
+}
+
 # Restrict access only for private projects since this is used to fetch stuff!
 # Allow even anonymous access on public projects
 @one_perm_required_or_403(pr_project_private_perm,
@@ -319,7 +335,7 @@ def stringset_handling(request, project_slug, lang_code, resource_slug=None,
 
     # Check if user is a team reviewer so that we can
     # send the extra info.
-    check = ProjectPermission(request.user)
+    check = permission_snapshot(request)
     review = check.proofread(project, language)
 
     # FIXME Do we need to check for non-POST requests and return an error?
@@ -339,10 +355,12 @@ def _get_stringset(post_data, resources, language, review=False, session='', *ar
     # Find a way to determine the source language of multiple resources #FIXME
     source_language = get_source_language(resources)
     try:
-        source_strings = _get_source_strings_for_request(
-            post_data, resources, source_language, language,
-            session
-        )
+        source_ids = _get_indexed_source_strings(post_data, resources, language)
+        if source_ids is None:
+            source_strings = _get_source_strings_for_request(
+                post_data, resources, source_language, language,
+                session
+            )
     except LotteBadRequestError, e:
         logger.warning("Error in lotte filters: %s" % e.message, exc_info=True)
         return HttpResponseBadRequest()
@@ -351,12 +369,15 @@ def _get_stringset(post_data, resources, language, review=False, session='', *ar
         resource__in=resources,
         language=language)
 
-    if not isinstance(source_strings, list):
-        more_languages = []
-        if post_data and post_data.has_key('more_languages'):
-            # rsplit is used to remove the trailing ','
-            more_languages = post_data.get('more_languages').rstrip(',').split(',')
+    more_languages = []
+    if post_data and post_data.has_key('more_languages'):
+        # rsplit is used to remove the trailing ','
+        more_languages = post_data.get('more_languages').rstrip(',').split(',')
 
+    if source_ids is not None:
+        # for statistics
+        total = len(source_ids)
+    elif not isinstance(source_strings, list):
         # keyword filtering
         search = post_data.get('sSearch', '')
         if not search == '':
@@ -395,9 +416,15 @@ def _get_stringset(post_data, resources, language, review=False, session='', *ar
     except ValueError, e:
         return HttpResponseBadRequest()
 
-    # NOTE: It's important to keep the translation string matching inside this
-    # iteration to prevent extra un-needed queries. In this iteration only the
-    # strings displayed are calculated, saving a lot of resources.
+    # NOTE: Only the strings displayed are fetched. The data of their rows
+    # are fetched for the whole page at once, to avoid per-row queries.
+    if source_ids is not None:
+        page = _get_strings_by_id(source_ids[dstart:dstart+dlength])
+    else:
+        page = source_strings[dstart:dstart+dlength]
+        if not isinstance(page, list):
+            page = list(page.select_related('source_entity'))
+    rows = _get_page_strings(page, source_language, language, more_languages)
     response_dict = {
         'sEcho': post_data.get('sEcho','1'),
         'iTotalRecords': total,
@@ -410,13 +437,13 @@ def _get_stringset(post_data, resources, language, review=False, session='', *ar
                 s.source_entity.string,
                 # 3. Get all the necessary source strings, including plurals and
                 # similar langs, all in a dictionary (see also below)
-                _get_source_strings(s, source_language, language.code, more_languages),
+                rows[s.source_entity_id]['source'],
                 # 4. Get all the Translation strings mapped with plural rules
                 # in a single dictionary (see docstring of function)
-                _get_strings(translated_strings, language, s.source_entity),
+                rows[s.source_entity_id]['strings'],
                 # 5. A number which indicates the number of Suggestion objects
                 # attached to this row of the table.
-                Suggestion.objects.filter(source_entity=s.source_entity, language__code=language.code).count(),
+                rows[s.source_entity_id]['suggestions'],
                 # 6. save buttons and hidden context (ready to inject snippet)
                 # It includes the following content, wrapped in span tags:
                 # * SourceEntity object's "context" value
@@ -426,19 +453,16 @@ def _get_stringset(post_data, resources, language, review=False, session='', *ar
                  '<span class="undo edit-panel inactive" id="undo_' + str(counter) + '" style="border:0" title="' + _("Undo to initial text") + '"></span>'
                  '<span class="context" id="context_' + str(counter) + '" style="display:none;">' + escape(str(s.source_entity.context_string.encode('UTF-8'))) + '</span>'
                  '<span class="source_id" id="sourceid_' + str(counter) + '"style="display:none;">' + str(s.source_entity.id) + '</span>'),
-            ] for counter,s in enumerate(source_strings[dstart:dstart+dlength])
+            ] for counter,s in enumerate(page)
         ],
     }
 
     if review:
-        for counter, s in enumerate(source_strings[dstart:dstart+dlength]):
-            try:
-                translation = Translation.objects.get(
-                    source_entity__id=s.source_entity.id,
-                    language__code=language.code, rule=5
-                )
-                review_snippet = '<span><input class="review-check" title="' + _("Reviewed string") + '" id="review_source_' + str(s.source_entity.id) + '" type="checkbox" name="review" ' + ('checked="checked"' if translation.reviewed else '') + ' value="Review"/></span>',
-            except Translation.DoesNotExist:
+        for counter, s in enumerate(page):
+            reviewed = rows[s.source_entity_id]['reviewed']
+            if reviewed is not None:
+                review_snippet = '<span><input class="review-check" title="' + _("Reviewed string") + '" id="review_source_' + str(s.source_entity.id) + '" type="checkbox" name="review" ' + ('checked="checked"' if reviewed else '') + ' value="Review"/></span>',
+            else:
                 review_snippet = '<span><input class="review-check" title="' + _("Reviewed string") + '" id="review_source_' + str(s.source_entity.id) + '" type="checkbox" name="review" disabled="disabled" value="Review"/></span>',
 
             response_dict['aaData'][counter].append(review_snippet)
@@ -471,11 +495,12 @@ def proofread(request, project_slug, lang_code, resource_slug=None, *args, **kwa
         raise Http404
 
     # Check if the user has the necessary permissions to review strings.
-    check = ProjectPermission(request.user)
+    check = permission_snapshot(request)
     if not check.proofread(project, language):
         return permission_denied(request)
 
     request_data = simplejson.loads(request.raw_post_data)
+    delta = StatsDelta(resource)
 
     if 'true' in request_data:
         source_entity_ids = request_data['true']
@@ -483,6 +508,7 @@ def proofread(request, project_slug, lang_code, resource_slug=None, *args, **kwa
             source_entity__id__in=source_entity_ids,
             language__code=lang_code,
         )
+        delta.review_translations(translations, True)
         translations.update(reviewed=True)
         ReviewHistory.add_many(translations, request.user, project.id, reviewed=True)
 
@@ -492,33 +518,24 @@ def proofread(request, project_slug, lang_code, resource_slug=None, *args, **kwa
             source_entity__id__in=source_entity_ids,
             language__code=lang_code,
         )
+        delta.review_translations(translations, False)
         translations.update(reviewed=False)
         ReviewHistory.add_many(translations, request.user, project.id, reviewed=False)
 
-    invalidate_stats_cache(resource, language, user=request.user)
+    invalidate_stats_cache(resource, language, user=request.user, delta=delta)
 
     return HttpResponse(status=200)
 
 
-def _get_source_strings_for_request(post_data, resources, source_language,
-        language, session):
-    """Return the source strings that correspond to the filters in the request.
+def _parse_filters(post_data, resources):
+    """Parse the filters of a request.
 
-    Use powers of two for each possible filter, so that we can get a unique
-    number for each possible combination. Use that number as index to call
-    the specialized for the combination function.
-    This allows to optimize queries based on the specific filters applied
-    and bypass the database for combinations which are guaranteed to return
-    empty results.
+    Returns:
+        A tuple with the resources the request is filtered to, the index
+        of the combination of the state filters (see
+        ``_get_source_strings_for_request``) and the ids of the users to
+        filter by, or None.
     """
-    # FIXME Is this possible?
-    if not post_data:
-        return Translation.objects.filter(
-            resource__in=resources,
-            language=source_language,
-            rule=5
-        )
-
     if 'resource_filters' in post_data:
         requested_resources = set(
             post_data['resource_filters'].rstrip(',').split(',')
@@ -558,6 +575,70 @@ def _get_source_strings_for_request(post_data, resources, source_language,
                 "Invalid user id specified: %s" % post_data['user_filters']
             )
         index += 7
+    return resources, index, users
+
+
+def _get_indexed_source_strings(post_data, resources, language):
+    """Return the ids of the source strings that correspond to the filters
+    in the request, using the state indexes of the resources.
+
+    The strings are filtered, counted and sorted in memory. Only requests
+    that filter by state and sort by id are handled; for the rest, None is
+    returned and the strings are queried from the database.
+    """
+    if not post_data or post_data.get('sSearch', ''):
+        return None
+    try:
+        sorting_cols = int(post_data.get('iSortingCols', '0'))
+        col = int(post_data.get('iSortCol_0', '0'))
+    except ValueError:
+        return None
+    if sorting_cols != 1 or col >= len(SORTING_DICT) or \
+            SORTING_DICT[col] != 'id':
+        return None
+    resources, index, users = _parse_filters(post_data, resources)
+    if users is not None or index not in STATE_FILTERS:
+        return None
+
+    states = STATE_FILTERS[index]
+    ids = []
+    for resource in resources:
+        ids.extend(get_state_index(resource, language).select(*states))
+    if len(resources) > 1:
+        ids.sort()
+    if post_data.get('sSortDir_0') != 'asc':
+        ids.reverse()
+    return ids
+
+
+def _get_strings_by_id(ids):
+    """Return the source strings with the specified ids, in the same
+    order.
+    """
+    strings = Translation.objects.select_related('source_entity').in_bulk(ids)
+    return [strings[id_] for id_ in ids if id_ in strings]
+
+
+def _get_source_strings_for_request(post_data, resources, source_language,
+        language, session):
+    """Return the source strings that correspond to the filters in the request.
+
+    Use powers of two for each possible filter, so that we can get a unique
+    number for each possible combination. Use that number as index to call
+    the specialized for the combination function.
+    This allows to optimize queries based on the specific filters applied
+    and bypass the database for combinations which are guaranteed to return
+    empty results.
+    """
+    # FIXME Is this possible?
+    if not post_data:
+        return Translation.objects.filter(
+            resource__in=resources,
+            language=source_language,
+            rule=5
+        )
+
+    resources, index, users = _parse_filters(post_data, resources)
 
     querysets = [
         _get_all_source_strings,
@@ -669,69 +750,96 @@ def _get_user_filtered_source_strings(resources, users, language, *args, **kwarg
     return Translation.objects.user_translated_strings(resources, language, users)
 
 
-def _get_source_strings(source_string, source_language, lang_code, more_languages):
+def _get_page_strings(source_strings, source_language, target_language,
+        more_languages):
     """
-    Get all the necessary source strings, including plurals and similar langs.
-
-    Returns a dictionary with the keys:
-    'source_strings' : {"one":<string>, "two":<string>, ... , "other":<string>}
-    'similar_lang_strings' :
-        {"lang1": {"one":<string>, ... , "other":<string>},
-         "lang2": {"one":<string>, "two":<string>, ... , "other":<string>}}
+    Get the data of the rows of a page of the stringset.
+
+    The data of all the rows are fetched at once, in a constant number of
+    queries, instead of querying the database for each row.
+
+    Returns a dictionary from the source entity ids of the source strings
+    to dictionaries with the keys:
+    'source' : All the necessary source strings, including plurals and
+        similar langs, in a dictionary with the keys:
+        'source_strings' : {"one":<string>, "two":<string>, ... , "other":<string>}
+        'similar_lang_strings' :
+            {"lang1": {"one":<string>, ... , "other":<string>},
+             "lang2": {"one":<string>, "two":<string>, ... , "other":<string>}}
+    'strings' : All the Translation strings in the target language, or
+        empty strings for the untranslated ones, in the form
+        {"zero":<string>, "one":<string>, ... , "other":<string>}
+    'suggestions' : The number of Suggestion objects in the target language.
+    'reviewed' : The reviewed flag of the translation, or None if the
+        string has not been translated.
     """
-    source_entity = source_string.source_entity
-    # This is the rule 5 ('other')
-    source_strings = { "other":source_string.string }
-    # List that will contain all the similar translations
-    similar_lang_strings = {}
-
-    if source_entity.pluralized:
-        # These are the remaining plural forms of the source string.
+    rows = {}
+    plural_ids = set()
+    for s in source_strings:
+        translation_strings = {}
+        if s.source_entity.pluralized:
+            plural_ids.add(s.source_entity_id)
+            # Fill with empty strings to have the Untranslated entries!
+            for rule in target_language.get_pluralrules():
+                translation_strings[rule] = ""
+        else:
+            translation_strings["other"] = ""
+        rows[s.source_entity_id] = {
+            # This is the rule 5 ('other')
+            'source': {'source_strings': {"other": s.string},
+                       'similar_lang_strings': {}},
+            'strings': translation_strings,
+            'suggestions': 0,
+            'reviewed': None,
+        }
+    if not rows:
+        return rows
+    se_ids = rows.keys()
+
+    if plural_ids:
+        # These are the remaining plural forms of the source strings.
         plural_strings = Translation.objects.filter(
-            source_entity = source_entity,
-            language = source_language).exclude(rule=5).order_by('rule')
-        for pl_string in plural_strings:
-            plural_name = source_language.get_rule_name_from_num(pl_string.rule)
-            source_strings[plural_name] = pl_string.string
+            source_entity__in=plural_ids, language=source_language
+        ).exclude(rule=5).values_list('source_entity', 'rule', 'string')
+        for se_id, rule, string in plural_strings.iterator():
+            plural_name = source_language.get_rule_name_from_num(rule)
+            rows[se_id]['source']['source_strings'][plural_name] = string
 
     # for each similar language fetch all the translation strings
-    for lang_id in more_languages:
-        l = Language.objects.get(pk=lang_id)
-        similar_lang_strings[l.name] = {}
-        for t in Translation.objects.filter(source_entity=source_entity, language=l).order_by('rule'):
-            plural_name = source_language.get_rule_name_from_num(t.rule)
-            similar_lang_strings[l.name][plural_name] = t.string
-    return { 'source_strings' : source_strings,
-             'similar_lang_strings' : similar_lang_strings }
-
-
-def _get_strings(query, target_language, source_entity):
-    """
-    Helper function for returning all the Translation strings or an empty dict.
+    if more_languages:
+        names = dict(Language.objects.filter(
+            pk__in=more_languages
+        ).values_list('id', 'name'))
+        for row in rows.itervalues():
+            for name in names.itervalues():
+                row['source']['similar_lang_strings'][name] = {}
+        similar_strings = Translation.objects.filter(
+            source_entity__in=se_ids, language__in=names.keys()
+        ).values_list('source_entity', 'language', 'rule', 'string')
+        for se_id, lang_id, rule, string in similar_strings.iterator():
+            plural_name = source_language.get_rule_name_from_num(rule)
+            rows[se_id]['source']['similar_lang_strings'][names[lang_id]][
+                plural_name] = string
 
-    Used in the list concatenation above to preserve code sanity.
-    Returns a dictionary in the following form:
-    {"zero":<string>, "one":<string>, ... , "other":<string>},
-    where the 'zero', 'one', ... are the plural names of the corresponding
-    plural forms.
-    """
     # It includes the plural translations, too!
-    translation_strings = {}
-    if source_entity.pluralized:
-        translations = query.filter(source_entity=source_entity).order_by('rule')
-        # Fill with empty strings to have the Untranslated entries!
-        for rule in target_language.get_pluralrules():
-            translation_strings[rule] = ""
-        for translation in translations:
-            plural_name = target_language.get_rule_name_from_num(translation.rule)
-            translation_strings[plural_name] = translation.string
-    else:
-        try:
-            translation_strings["other"] = query.get(source_entity=source_entity,
-                                                     rule=5).string
-        except Translation.DoesNotExist:
-            translation_strings["other"] = ""
-    return translation_strings
+    translations = Translation.objects.filter(
+        source_entity__in=se_ids, language=target_language
+    ).values_list('source_entity', 'rule', 'string', 'reviewed')
+    for se_id, rule, string, reviewed in translations.iterator():
+        row = rows[se_id]
+        if rule == 5:
+            row['reviewed'] = reviewed
+        elif se_id not in plural_ids:
+            continue
+        plural_name = target_language.get_rule_name_from_num(rule)
+        row['strings'][plural_name] = string
+
+    suggestions = Suggestion.objects.filter(
+        source_entity__in=se_ids, language=target_language
+    ).order_by().values('source_entity').annotate(count=Count('id'))
+    for suggestion in suggestions:
+        rows[suggestion['source_entity']]['suggestions'] = suggestion['count']
+    return rows
 
 
 # Restrict access only to : (The checks are done in the view's body)
@@ -741,6 +849,7 @@ def _get_strings(query, target_language, source_entity):
 # 4)superusers
 # CAUTION!!! WE RETURN 404 instead of 403 for security reasons
 @login_required
+@coalesce_invalidations
 def push_translation(request, project_slug, lang_code, *args, **kwargs):
     """
     Client pushes an id and a translation string.
@@ -756,7 +865,7 @@ def push_translation(request, project_slug, lang_code, *args, **kwargs):
     # Project should always be available
     project = get_object_or_404(Project, slug=project_slug)
     team = Team.objects.get_or_none(project, lang_code)
-    check = ProjectPermission(request.user)
+    check = permission_snapshot(request)
     if not check.submit_translations(team or project) and not\
         check.maintain(project):
         return permission_denied(request)
@@ -783,14 +892,18 @@ def push_translation(request, project_slug, lang_code, *args, **kwargs):
     # translations-> translation strings (includes all plurals)
     # context-> source_entity context
     # occurrence-> occurrence (not yet well supported)
-    # Iterate through all the row data that have been sent.
+    # A string pushed more than once is saved with its last translations.
+    rows = {}
     for row in strings:
-        source_id = int(row['id'])
-        try:
-            source_string = Translation.objects.select_related(depth=1).get(
-                id=source_id
-            )
-        except Translation.DoesNotExist:
+        rows[int(row['id'])] = row['translations']
+    source_strings = Translation.objects.select_related(
+        'source_entity', 'resource__project', 'resource__source_language'
+    ).in_bulk(rows.keys())
+
+    pushed = []
+    for source_id, translations in rows.iteritems():
+        source_string = source_strings.get(source_id)
+        if source_string is None:
             # TODO: Log or inform here
             push_response_dict[source_id] = { 'status':400,
                  'message':_("Source string cannot be identified in the DB")}
@@ -802,121 +915,159 @@ def push_translation(request, project_slug, lang_code, *args, **kwargs):
             push_response_dict[source_id] = { 'status':400,
                  'message':_("The resource of this source string is not "
                     "accepting translations.") }
+            continue
 
         # If the translated source string is pluralized check that all the
-        # source language supported rules have been filled in, else return error
-        # and donot save the translations.
+        # source language supported rules have been filled in, or that all of
+        # them are empty, in which case all the plurals are deleted. Else
+        # return error and donot save the translations.
         if source_string.source_entity.pluralized:
-            error_flag = False
-            for rule in target_language.get_pluralrules():
-                if rule in row['translations'] and row['translations'][rule] != "":
-                    continue
-                else:
-                    error_flag = True
-            if error_flag:
-                error_flag = False
-                # Check also if all of them are "". If yes, delete all the plurals!
-                for rule in target_language.get_pluralrules():
-                    if rule in row['translations'] and row['translations'][rule] == "":
-                        continue
-                    else:
-                        error_flag = True
-            if error_flag:
+            values = [
+                translations.get(rule)
+                for rule in target_language.get_pluralrules()
+            ]
+            if not (all(values) or all(v == "" for v in values)):
                 push_response_dict[source_id] = { 'status':400,
                     'message':(_("Cannot save unless plural translations are either "
                                "completely specified or entirely empty!"))}
                 # Skip the save as we hit on an error.
                 continue
+        pushed.append((source_string, translations))
+
+    push_response_dict.update(
+        _save_translations(pushed, target_language, request.user, check)
+    )
+    json_dict = simplejson.dumps(push_response_dict)
+    return HttpResponse(json_dict, mimetype='application/json')
+
+
+def _save_translations(pushed, target_language, user, check=None):
+    """Save the translations of many source strings to the database.
+
+    The existing translations of all strings are fetched at once and each
+    string is validated separately. The changes of the strings that pass
+    the validation are then saved in bulk, in a single transaction.
+
+    Args:
+        pushed: A list of (source_string, translations) tuples, where
+            source_string is a Translation object of the string in the source
+            language and translations is a dictionary from plural rule names
+            to strings.
+        target_language: The language the strings are translated to.
+        user: The translator.
+        check: The ProjectPermissionSnapshot of the translator, if one
+            exists already.
+    Returns:
+        A dictionary from the id of each source string to its status.
+    """
+    if not pushed:
+        return {}
+    se_ids = [s.source_entity_id for s, t in pushed]
+    language_ids = set(s.resource.source_language_id for s, t in pushed)
+    language_ids.add(target_language.id)
+    existing = {}
+    for tr in Translation.objects.filter(
+            source_entity__in=se_ids, language__in=language_ids).iterator():
+        existing[(tr.source_entity_id, tr.language_id, tr.rule)] = tr
+
+    if check is None:
+        check = ProjectPermissionSnapshot(user)
+    pipelines = {}
+    statuses = {}
+    changes = []
+    for source_string, translations in pushed:
+        resource = source_string.resource
+        project = resource.project
+        if resource.id not in pipelines:
+            pipelines[resource.id] = ValidatorPipeline(
+                resource.i18n_method, resource.source_language,
+                target_language
+            )
         try:
-            msgs = _save_translation(
-                source_string, row['translations'],
-                target_language, request.user
+            warnings, new, updated, deleted = _validate_translation(
+                source_string, translations, target_language, user,
+                existing, check.proofread(project, target_language),
+                pipelines[resource.id]
             )
-            if not msgs:
-                push_response_dict[source_id] = {'status': 200}
-            else:
-                push_response_dict[source_id] = {
-                    'status': 200, 'message': msgs[-1]
-                }
         except LotteBadRequestError, e:
-            push_response_dict[source_id] = {
-                'status': 400, 'message': e.message
-            }
-        except Exception, e:
-            logger.error(
-                "Unexpected exception raised: %s" % e.message, exc_info=True
-            )
-            push_response_dict[source_id] = {
-                'status': 400, 'message': e.message
+            logger.debug("%s" % e, exc_info=True)
+            statuses[source_string.pk] = {'status': 400, 'message': e.message}
+            continue
+        if not warnings:
+            statuses[source_string.pk] = {'status': 200}
+        else:
+            statuses[source_string.pk] = {
+                'status': 200, 'message': warnings[-1]
             }
+        changes.append((source_string, new, updated, deleted))
 
-    json_dict = simplejson.dumps(push_response_dict)
-    return HttpResponse(json_dict, mimetype='application/json')
+    try:
+        _apply_translations(changes, target_language, user)
+    # catch-all. if we don't save we _MUST_ inform the user
+    except Exception, e:
+        msg = _(
+            "Error occurred while trying to save translation: %s" % unicode(e)
+        )
+        logger.error(msg, exc_info=True)
+        for source_string, new, updated, deleted in changes:
+            statuses[source_string.pk] = {'status': 400, 'message': msg}
+    return statuses
 
 
-@transaction.commit_on_success
-def _save_translation(source_string, translations, target_language, user):
-    """Save a translation string to the database.
+def _validate_translation(source_string, translations, target_language, user,
+                          existing, review_perm, pipeline):
+    """Validate the translations of a source string and find the changes
+    they make.
 
     This functions handle a signle source entity translation
-    (could be pluralized).
-
-    Currently, the function only returns warning strings.
-    There is no message for success.
+    (could be pluralized). Nothing is saved to the database.
 
     Args:
         source_string: A Translation object of the string in the source
             language.
-        translations: A (rule, string) tuple.
+        translations: A dictionary from plural rule names to strings.
         target_language: The language the string is translated to.
         user: The translator.
+        existing: A dictionary from (source entity id, language id, rule)
+            tuples to the existing Translation objects.
+        review_perm: Whether the user may edit reviewed strings.
+        pipeline: The ValidatorPipeline of the resource of the string.
     Returns:
-        A list if strings to display to the user.
+        A tuple with a list of warnings to display to the user and the lists
+        of the Translation objects to insert, update and delete.
     Raises:
         An LotteBadRequestError exception in case of errors.
     """
-    source_id = source_string.pk
+    source_entity = source_string.source_entity
     resource = source_string.resource
     source_language = resource.source_language
     warnings = []
-
-    check = ProjectPermission(user)
-    review_perm = check.proofread(resource.project, target_language)
+    new, updated, deleted = [], [], []
 
     for rule, target_string in translations.items():
         rule = target_language.get_rule_num_from_name(rule)
+        source = source_string
         if rule != 5:
-            # fetch correct source string for plural rule
-            try:
-                source_string = Translation.objects.get(
-                    source_entity=source_string.source_entity,
-                    language=source_language, rule=rule
-                )
-            except Translation.DoesNotExist:
-                # target language has extra plural forms
-                pass
+            # fetch correct source string for plural rule, unless the
+            # target language has extra plural forms
+            source = existing.get(
+                (source_entity.id, source_language.id, rule), source_string
+            )
 
-        # check for errors
+        # check for errors and warnings
         try:
-            for ErrorValidator in create_error_validators(resource.i18n_method):
-                v = ErrorValidator(source_language, target_language, rule)
-                v(source_string.string, target_string)
+            warnings.extend(pipeline.validate(
+                source.string, target_string, rule,
+                key=(source_entity.id, source.rule)
+            ))
         except ValidationError, e:
             raise LotteBadRequestError(e.message)
-        # check for warnings
-        for WarningValidator in create_warning_validators(resource.i18n_method):
-            v = WarningValidator(source_language, target_language, rule)
-            try:
-                v(source_string.string, target_string)
-            except ValidationError, e:
-                warnings.append(e.message)
-        try:
-            # TODO: Implement get based on context and/or on context too!
-            translation_string = Translation.objects.get(
-                source_entity=source_string.source_entity,
-                language=target_language, rule=rule
-            )
 
+        # TODO: Implement get based on context and/or on context too!
+        translation_string = existing.get(
+            (source_entity.id, target_language.id, rule)
+        )
+        if translation_string is not None:
             if translation_string.reviewed:
                 if not review_perm:
                     raise LotteBadRequestError(
@@ -926,51 +1077,80 @@ def _save_translation(source_string, translations, target_language, user):
             # FIXME: Maybe we don't want to permit anyone to delete!!!
             # If an empty string has been issued then we delete the translation.
             if target_string == "":
-                translation_string.delete()
+                deleted.append(translation_string)
             else:
                 translation_string.string = target_string
                 translation_string.user = user
-                translation_string.save()
-
-            _add_copyright(source_string, target_language, user)
-            invalidate_stats_cache(resource, target_language, user=user)
-        except Translation.DoesNotExist:
+                updated.append(translation_string)
+        elif target_string != "":
             # Only create new if the translation string sent, is not empty!
-            if target_string != "":
-                Translation.objects.create(
-                    source_entity=source_string.source_entity, user=user,
-                    language=target_language, rule=rule, string=target_string,
-                    resource=resource
-                )
-                _add_copyright(source_string, target_language, user)
-                invalidate_stats_cache(resource, target_language, user=user)
-            else:
-                # In cases of pluralized translations, sometimes only one
-                # translation will exist and the rest plural forms will be
-                # empty. If the user wants to delete all of them, we need
-                # to let by the ones that don't already have a translation.
-                if not source_string.source_entity.pluralized:
-                    raise LotteBadRequestError(
-                        _("The translation string is empty")
-                    )
-        except LotteBadRequestError, e:
-            logger.debug("%s" % e, exc_info=True)
-            raise
-        # catch-all. if we don't save we _MUST_ inform the user
-        except Exception, e:
-            msg = _(
-                "Error occurred while trying to save translation: %s" % unicode(e)
+            new.append(Translation(
+                source_entity=source_entity, user=user,
+                language=target_language, rule=rule, string=target_string,
+                resource=resource
+            ))
+        elif not source_entity.pluralized:
+            # In cases of pluralized translations, sometimes only one
+            # translation will exist and the rest plural forms will be
+            # empty. If the user wants to delete all of them, we need
+            # to let by the ones that don't already have a translation.
+            raise LotteBadRequestError(_("The translation string is empty"))
+    return warnings, new, updated, deleted
+
+
+@transaction.commit_on_success
+def _apply_translations(changes, target_language, user):
+    """Save the changes of the validated strings in bulk and update the
+    statistics of their resources.
+
+    Args:
+        changes: A list of (source_string, new, updated, deleted) tuples, as
+            returned by ``_validate_translation``.
+        target_language: The language the strings are translated to.
+        user: The translator.
+    """
+    new, updated, deleted = [], [], []
+    resources, counted = {}, {}
+    for source_string, n, u, d in changes:
+        if not (n or u or d):
+            continue
+        new.extend(n)
+        updated.extend(u)
+        deleted.extend(d)
+        resource = source_string.resource
+        resources[resource.id] = resource
+        # The rule-5 translations count the strings of the statistics.
+        rows = counted.setdefault(resource.id, [])
+        rows.extend((1, tr) for tr in n if tr.rule == 5)
+        rows.extend((-1, tr) for tr in d if tr.rule == 5)
+
+    Translation.objects.bulk_insert(new)
+    Translation.objects.bulk_update(updated)
+    Translation.objects.bulk_delete([tr.id for tr in deleted])
+    for resource_id, resource in resources.iteritems():
+        delta = StatsDelta(resource)
+        rows = counted[resource_id]
+        if delta.enabled and rows:
+            wordcounts = delta.source_wordcounts(
+                set(tr.source_entity_id for sign, tr in rows)
             )
-            logger.error(msg, exc_info=True)
-            raise LotteBadRequestError(msg)
-    return warnings
+            for sign, tr in rows:
+                delta.add(
+                    target_language.id, translated=sign,
+                    reviewed=sign < 0 and tr.reviewed and -1 or 0,
+                    wordcount=sign * wordcounts.get(tr.source_entity_id, 0)
+                )
+        _add_copyright(resource, target_language, user)
+        invalidate_stats_cache(
+            resource, target_language, user=user, delta=delta
+        )
 
 
-def _add_copyright(source_string, target_language, user):
+def _add_copyright(resource, target_language, user):
     from transifex.addons.copyright.handlers import lotte_copyrights
     lotte_save_translation.connect(lotte_copyrights)
     lotte_save_translation.send(
-        None, resource=source_string.resource,
+        None, resource=resource,
         language=target_language, user=user
     )
 
@@ -982,7 +1162,7 @@ def tab_details_snippet(request, entity_id, lang_code):
 
     source_entity = get_object_or_404(SourceEntity, pk=entity_id)
 
-    check = ProjectPermission(request.user)
+    check = permission_snapshot(request)
     if not check.private(source_entity.resource.project):
         return permission_denied(request)
 
@@ -1005,7 +1185,7 @@ def tab_suggestions_snippet(request, entity_id, lang_code):
 
     source_entity = get_object_or_404(SourceEntity, pk=entity_id)
 
-    check = ProjectPermission(request.user)
+    check = permission_snapshot(request)
     if not check.private(source_entity.resource.project):
         return permission_denied(request)
 
@@ -1046,10 +1226,12 @@ def delete_translation(request, project_slug=None, resource_slug=None,
             ids.append(se_id)
 
 
+    delta = StatsDelta(resource)
     try:
         translations = Translation.objects.filter(source_entity__pk__in=ids,
                                    language=language)
 
+        delta.remove_translations(translations)
         translations.delete()
 #        request.user.message_set.create(
 #            message=_("Translations deleted successfully!"))
@@ -1058,7 +1240,7 @@ def delete_translation(request, project_slug=None, resource_slug=None,
 #            message=_("Failed to delete translations due to some error!"))
         raise Http404
 
-    invalidate_stats_cache(resource, language, user=request.user)
+    invalidate_stats_cache(resource, language, user=request.user, delta=delta)
 
     return HttpResponse(status=200)
 
@@ -1117,7 +1299,7 @@ def add_edit_developer_comment_extra(request, project_slug, *args, **kwargs):
 
     # Permissions handling
     project = get_object_or_404(Project, slug=project_slug)
-    check = ProjectPermission(request.user)
+    check = permission_snapshot(request)
     if not check.maintain(project):
         content = {'error': True, 'message': _('Permission error.')}
     elif not request.POST:
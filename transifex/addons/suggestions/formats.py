@@ -5,7 +5,7 @@ from django.conf import settings
 from suggestions.models import Suggestion
 from transifex.txcommon.log import logger
 from transifex.resources.models import Translation, SourceEntity
-from transifex.resources.formats.utils.string_utils import percent_diff
+from transifex.resources.formats.utils.string_utils import SimilarityIndex
 
 
 class SuggestionFormat(object):
@@ -25,29 +25,57 @@ class SuggestionFormat(object):
         The langs can contain a list of all languages for which the conversion
         will take place. Defaults to all available languages.
         """
-        if langs:
-            translations = Translation.objects.filter(source_entity=source,
-                language__in=langs, rule=5)
-        else:
-            translations = Translation.objects.filter(source_entity=source, rule=5)
-
-        for t in translations:
-            # Skip source language translations
-            if t.language == dest.resource.source_language:
-                continue
+        self._convert_many_to_suggestions([(source, dest)], user, langs)
 
-            tr, created = Suggestion.objects.get_or_create(
-                string = t.string,
-                source_entity = dest,
-                language = t.language
-            )
+    def _convert_many_to_suggestions(self, pairs, user=None, langs=None,
+            chunk_size=500):
+        """Add the translations of the first source entity of each pair as
+        suggestions to the second one.
 
-            # If the suggestion was created and we have a user assign him as the
-            # one who made the suggestion
-            if created and user:
-                tr.user = user
-                tr.save()
-        return
+        The translations are fetched with a query per chunk of pairs and
+        the suggestions are inserted in bulk. Translations in the source
+        language are skipped.
+
+        Args:
+            pairs: A list of (source, dest) tuples of SourceEntity objects.
+            user: The user to assign the new suggestions to.
+            langs: The languages to convert the translations of. Defaults
+                to all available languages.
+        """
+        source_language = self.resource.source_language
+        suggestions = []
+        for offset in xrange(0, len(pairs), chunk_size):
+            dests = {}
+            for source, dest in pairs[offset:offset + chunk_size]:
+                dests.setdefault(source.id, []).append(dest.id)
+            translations = Translation.objects.filter(
+                source_entity__in=dests.keys(), rule=5
+            ).exclude(language=source_language)
+            if langs:
+                translations = translations.filter(language__in=langs)
+            translations = translations.values_list(
+                'source_entity', 'language', 'string'
+            )
+            for se_id, language_id, string in translations.iterator():
+                for dest_id in dests[se_id]:
+                    suggestions.append(Suggestion(
+                        string=string, source_entity_id=dest_id,
+                        language_id=language_id, user=user
+                    ))
+        Suggestion.objects.bulk_add(suggestions)
+
+    def _source_strings(self, entities, chunk_size=500):
+        """Return a dictionary with the source strings of the specified
+        source entities.
+        """
+        se_ids = [se.id for se in entities]
+        strings = {}
+        for offset in xrange(0, len(se_ids), chunk_size):
+            strings.update(Translation.objects.filter(
+                source_entity__in=se_ids[offset:offset + chunk_size],
+                language=self.resource.source_language, rule=5
+            ).values_list('source_entity', 'string').iterator())
+        return strings
 
     def create_suggestions(self, original, new):
         """Create new suggestions.
@@ -60,28 +88,44 @@ class SuggestionFormat(object):
         """
         raise NotImplementedError
 
+    def _entity_hash(self, string, context):
+        """Return the hash of the source entity with the specified string
+        and context.
+        """
+        se = SourceEntity(string=string, context=context or "None")
+        se.presave()
+        return se.string_hash
+
     def add_from_strings(self, strings):
         """Add the strings as suggestions.
 
+        The source entities are looked up in a map of the source entities of
+        the resource by hash, which is built once, and the suggestions are
+        inserted in bulk.
+
         Args:
             strings: An iterable of strings to add as suggestions
         """
+        strings = list(strings)
+        if not strings:
+            return
+        entities = dict(SourceEntity.objects.filter(
+            resource=self.resource
+        ).values_list('string_hash', 'id').iterator())
+        suggestions = []
         for j in strings:
             # Check SE existence
-            try:
-                se = SourceEntity.objects.get(
-                    string = j.source_entity, context = j.context or "None",
-                    resource = self.resource
-                )
-            except SourceEntity.DoesNotExist:
+            se_id = entities.get(self._entity_hash(j.source_entity, j.context))
+            if se_id is None:
                 logger.warning(
                     "Source entity %s does not exist" % j.source_entity
                 )
                 continue
-            Suggestion.objects.get_or_create(
-                string = j.translation, source_entity = se,
-                language = self.language
-            )
+            suggestions.append(Suggestion(
+                string=j.translation, source_entity_id=se_id,
+                language=self.language
+            ))
+        Suggestion.objects.bulk_add(suggestions)
 
 
 class KeySuggestionFormat(SuggestionFormat):
@@ -97,21 +141,37 @@ class ContentSuggestionFormat(SuggestionFormat):
     """
 
     def create_suggestions(self, original, new):
-        iterations = len(original)*len(new)
-        # If it's not over the limit, then do it
-        if iterations < settings.MAX_STRING_ITERATIONS:
-            for se in original:
-                for ne in new:
-                    try:
-                        old_trans = Translation.objects.get(source_entity=se,
-                            language=se.resource.source_language, rule=5)
-                        new_trans = Translation.objects.get(source_entity=ne,
-                            language=se.resource.source_language, rule=5)
-                    except Translation.DoesNotExist:
-                        # Source language translation should always exist
-                        # but just in case...
-                        continue
-                    # find Levenshtein distance
-                    if percent_diff(old_trans.string, new_trans.string) < settings.MAX_STRING_DISTANCE:
-                        self._convert_to_suggestions(se, ne, self.user)
-                        break
+        """Create new suggestions.
+
+        Each original entity is matched with the first new entity (if any)
+        the source string of which differs less than MAX_STRING_DISTANCE
+        percent. The source strings of the new entities are indexed once,
+        so that each original string is compared only to the candidates
+        the index returns, instead of all of them. MAX_STRING_ITERATIONS
+        limits the total number of these comparisons.
+        """
+        original, new = list(original), list(new)
+        if not original or not new:
+            return
+        strings = self._source_strings(original + new)
+        # Source language translation should always exist but just in case...
+        new = [se for se in new if se.id in strings]
+        index = SimilarityIndex(
+            [strings[se.id] for se in new], settings.MAX_STRING_DISTANCE
+        )
+        budget = settings.MAX_STRING_ITERATIONS
+        pairs = []
+        for se in original:
+            if se.id not in strings:
+                continue
+            if budget <= 0:
+                logger.warning(
+                    "Reached MAX_STRING_ITERATIONS while creating suggestions "
+                    "for resource %s." % self.resource
+                )
+                break
+            match, compared = index.find(strings[se.id], limit=budget)
+            budget -= compared
+            if match is not None:
+                pairs.append((se, new[match]))
+        self._convert_many_to_suggestions(pairs, self.user)
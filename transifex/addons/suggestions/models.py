@@ -3,12 +3,62 @@
 from hashlib import md5
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Count
 from django.utils.translation import ugettext_lazy as _
+from djangobulk.bulk import insert_many
 
 from transifex.languages.models import Language
 from transifex.resources.models import Resource, SourceEntity
 
 
+class SuggestionManager(models.Manager):
+
+    def bulk_add(self, suggestions, chunk_size=500):
+        """Insert the suggestions that do not exist yet.
+
+        Suggestions are unique per source entity, language and string. The
+        existing ones are found with a single query per chunk of source
+        entities and the rest are inserted in batches. Duplicates in the
+        suggestions themselves are skipped, too.
+
+        Args:
+            suggestions: A list of unsaved Suggestion objects.
+            chunk_size: The number of source entities to handle at once.
+        Returns:
+            The number of suggestions inserted.
+        """
+        by_entity = {}
+        for s in suggestions:
+            s.string_hash = md5(s.string.encode('utf-8')).hexdigest()
+            by_entity.setdefault(s.source_entity_id, []).append(s)
+        se_ids = by_entity.keys()
+        inserted = 0
+        for offset in xrange(0, len(se_ids), chunk_size):
+            chunk = se_ids[offset:offset + chunk_size]
+            existing = set(self.filter(source_entity__in=chunk).values_list(
+                'source_entity', 'language', 'string_hash'
+            ).iterator())
+            # The position of the new suggestions of each source entity
+            # for the ``order_with_respect_to`` option.
+            orders = dict(self.filter(source_entity__in=chunk).order_by(
+            ).values_list('source_entity').annotate(Count('id')))
+            new = []
+            for se_id in chunk:
+                order = orders.get(se_id, 0)
+                for s in by_entity[se_id]:
+                    key = (se_id, s.language_id, s.string_hash)
+                    if key in existing:
+                        continue
+                    existing.add(key)
+                    s._order = order
+                    order += 1
+                    new.append(s)
+            if new:
+                insert_many(Suggestion, new)
+            inserted += len(new)
+        return inserted
+
+
 class Suggestion(models.Model):
     """
     The representation of a suggestion for a translation on a source string.
@@ -45,6 +95,8 @@ class Suggestion(models.Model):
         verbose_name=_('User'), blank=False, null=True,
         help_text=_("The user who committed the specific suggestion."))
 
+    objects = SuggestionManager()
+
     def __unicode__(self):
         return self.string
 
@@ -2,6 +2,10 @@ from django.db import IntegrityError
 from django.core.urlresolvers import reverse
 from django.utils import simplejson as json
 from transifex.txcommon.tests.base import BaseTestCase
+from transifex.resources.formats.resource_collections import \
+        GenericTranslation
+from suggestions.models import Suggestion
+from suggestions.formats import ContentSuggestionFormat
 
 
 
@@ -123,3 +127,43 @@ class SuggestionsModelsTests(BaseTestCase):
         self.assertRaises(IntegrityError, self._create_suggestion)
 
 
+
+    def test_bulk_add(self):
+        """Test that only new suggestions are inserted in bulk."""
+        suggestions = [
+            Suggestion(source_entity_id=self.entity.id, string=s,
+                language=self.language)
+            for s in ("Hey!", "Hello!", "Hello!", "Hi!")
+        ]
+        self.assertEqual(Suggestion.objects.bulk_add(suggestions), 2)
+        self.assertEqual(
+            sorted(self.entity.suggestions.filter(
+                language=self.language
+            ).values_list('string', flat=True)),
+            ["Hello!", "Hey!", "Hi!"]
+        )
+        self.assertEqual(Suggestion.objects.bulk_add(suggestions), 0)
+
+
+class SuggestionFormatTests(BaseTestCase):
+
+    def test_add_from_strings(self):
+        """Test adding the suggestions of an uploaded file."""
+        entity = self.resource.entities[0]
+        strings = [
+            GenericTranslation(entity.string, "Suggestion",
+                context=entity.context),
+            GenericTranslation(entity.string, "Suggestion",
+                context=entity.context),
+            GenericTranslation("No such entity", "Suggestion"),
+        ]
+        handler = ContentSuggestionFormat(
+            self.resource, self.language, self.user["registered"]
+        )
+        handler.add_from_strings(strings)
+        self.assertEqual(
+            list(entity.suggestions.filter(
+                language=self.language
+            ).values_list('string', flat=True)),
+            ["Suggestion"]
+        )
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+"""
+Delivery of the events of the web hooks.
+
+The changes to the statistics of a translation are not sent right away.
+The first change of a (resource, language) pair schedules the
+``send_event`` task after WEBHOOKS_COALESCE_WINDOW seconds, which sends the
+latest state of the translation to each web hook of the project with a
+separate ``deliver_event`` task. Failed deliveries are retried with an
+exponential backoff.
+
+The requests of a worker process share a session, so that the connections
+to the same hosts are kept alive, and the outcome of each delivery is
+counted per hook in the cache.
+
+Whether a project has any web hooks is cached, so that the changes to the
+statistics of the projects without web hooks do not schedule any tasks.
+The cached flag of a project is deleted when one of its web hooks is saved
+or deleted and, inside a request, once more when the request finishes,
+since a flag computed before the transaction of the request commits would
+be stale.
+"""
+
+import threading
+import time
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_started, request_finished
+from django.db.models import get_model
+from transifex.txcommon.log import logger
+
+
+# How long the delivery metrics are kept, in seconds.
+METRICS_TIMEOUT = 7 * 24 * 60 * 60
+
+# How long the flag of whether a project has web hooks is cached, in seconds.
+HAS_HOOKS_TIMEOUT = 24 * 60 * 60
+
+_session = None
+
+# The projects the flags of which are deleted again when the current
+# request finishes.
+_pending = threading.local()
+
+
+def get_session():
+    """Return the requests session of the process."""
+    global _session
+    if _session is None:
+        _session = requests.session()
+    return _session
+
+
+def event_info(stats):
+    """Return the data sent to the web hooks for a RLStats object."""
+    resource = stats.resource
+    return {
+        'project': resource.project.slug,
+        'resource': resource.slug,
+        'language': stats.language.code,
+        'percent': stats.translated_perc,
+    }
+
+
+def _has_hooks_key(project_id):
+    return 'webhooks.has_hooks.%s' % project_id
+
+
+def project_has_hooks(project_id):
+    """Return whether a project has any web hooks."""
+    key = _has_hooks_key(project_id)
+    has_hooks = cache.get(key)
+    if has_hooks is None:
+        WebHook = get_model('webhooks', 'WebHook')
+        has_hooks = WebHook.objects.filter(project=project_id).exists()
+        cache.set(key, has_hooks, HAS_HOOKS_TIMEOUT)
+    return has_hooks
+
+
+def invalidate_has_hooks(sender, instance, **kwargs):
+    """Delete the cached flag of the project of a web hook, when the web
+    hook is saved or deleted.
+    """
+    cache.delete(_has_hooks_key(instance.project_id))
+    project_ids = getattr(_pending, 'project_ids', None)
+    if project_ids is not None:
+        project_ids.add(instance.project_id)
+
+
+def _start_request(sender, **kwargs):
+    _pending.project_ids = set()
+
+
+def _finish_request(sender, **kwargs):
+    project_ids, _pending.project_ids = \
+            getattr(_pending, 'project_ids', None), None
+    if project_ids:
+        cache.delete_many([_has_hooks_key(p) for p in project_ids])
+
+request_started.connect(_start_request)
+request_finished.connect(_finish_request)
+
+
+def _event_key(resource_id, language_id):
+    return 'webhooks.event.%s.%s' % (resource_id, language_id)
+
+
+def schedule_event(stats):
+    """Schedule the delivery of the state of a translation to the web hooks
+    of its project, unless it is already scheduled or the project has no
+    web hooks.
+    """
+    from webhooks.tasks import send_event
+    if not project_has_hooks(stats.resource.project_id):
+        return
+    window = getattr(settings, 'WEBHOOKS_COALESCE_WINDOW', 0)
+    key = _event_key(stats.resource_id, stats.language_id)
+    if window and not cache.add(key, True, window * 2):
+        return
+    send_event.apply_async(
+        args=[stats.resource_id, stats.language_id], countdown=window
+    )
+
+
+def clear_event(resource_id, language_id):
+    """Mark the event of a translation as sent, so that later changes
+    schedule a new one.
+    """
+    cache.delete(_event_key(resource_id, language_id))
+
+
+def post_event(hook_id, url, data, post_function=None):
+    """Send an event to a web hook.
+
+    Args:
+        hook_id: The id of the web hook.
+        url: The URL of the web hook.
+        data: The event info.
+        post_function: The function to send the request with. Defaults to
+            the ``post`` method of the session of the process.
+    Returns:
+        True, if the web hook responded with success.
+    """
+    if post_function is None:
+        post_function = get_session().post
+    start = time.time()
+    try:
+        res = post_function(
+            url, data=data, allow_redirects=False,
+            timeout=getattr(settings, 'WEBHOOKS_TIMEOUT', 2.0)
+        )
+    except requests.RequestException, e:
+        logger.error("Error visiting webhook %s: %s" % (url, e))
+        ok = False
+    else:
+        ok = res.ok
+        if ok:
+            logger.debug("POST for project %s successful." % data['project'])
+        else:
+            logger.error("Error visiting webhook %s: HTTP code is %s" % (
+                url, res.status_code
+            ))
+    record_delivery(hook_id, ok, time.time() - start)
+    return ok
+
+
+def retry_delay(retries):
+    """Return the delay of a retry in seconds."""
+    return getattr(settings, 'WEBHOOKS_RETRY_DELAY', 30) * 2 ** retries
+
+
+def _metric_key(hook_id, metric):
+    return 'webhooks.metrics.%s.%s' % (hook_id, metric)
+
+
+def _incr(key, delta=1):
+    if not cache.add(key, delta, METRICS_TIMEOUT):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # The key expired in between.
+            cache.set(key, delta, METRICS_TIMEOUT)
+
+
+def record_delivery(hook_id, ok, elapsed):
+    """Count the outcome and the duration of a delivery."""
+    _incr(_metric_key(hook_id, ok and 'delivered' or 'failed'))
+    _incr(_metric_key(hook_id, 'elapsed_ms'), int(elapsed * 1000))
+
+
+def record_dropped(hook_id):
+    """Count an event that has not been delivered after all retries."""
+    _incr(_metric_key(hook_id, 'dropped'))
+
+
+def delivery_metrics(hook_id):
+    """Return the delivery metrics of a web hook.
+
+    Returns:
+        A dictionary with the number of the delivered, failed (including
+        the retried ones) and dropped requests and the total time spent in
+        milliseconds.
+    """
+    names = ('delivered', 'failed', 'dropped', 'elapsed_ms', )
+    values = cache.get_many([_metric_key(hook_id, n) for n in names])
+    return dict(
+        (n, values.get(_metric_key(hook_id, n), 0)) for n in names
+    )
@@ -4,8 +4,8 @@
 Handlers for the addon.
 """
 
-import requests
 from django.db.models import get_model
+from django.db.models.signals import post_save, post_delete
 from django import forms
 from django.utils.translation import ugettext_lazy as _
 from transifex.txcommon.log import logger
@@ -13,6 +13,8 @@ from transifex.txcommon.validators import validate_http_url
 from transifex.resources.signals import post_update_rlstats
 from transifex.projects.signals import project_form_init, post_proj_save_m2m
 from webhooks.models import WebHook
+from webhooks.delivery import schedule_event, event_info, post_event, \
+        invalidate_has_hooks
 
 
 def visit_url(sender, **kwargs):
@@ -22,49 +24,30 @@ def visit_url(sender, **kwargs):
     of the translation as identifiers. Send the translation percentage
     as information.
 
+    The web hooks are visited by celery tasks, once per coalescing window
+    (see ``webhooks.delivery``). No task is scheduled for the projects
+    without web hooks. If a ``post_function`` is given, they are
+    visited right away with it instead.
+
     Args:
         sender: The rlstats object itself.
-    Returns:
-        True of False for success (or not).
     """
-    # TODO make it a celery task
-    # TODO increase the timeout in celery
-
     stats = sender
-    resource = stats.resource
-    project = resource.project
-    language = stats.language
+    project = stats.resource.project
 
-    if 'post_function' in kwargs:
-        post_function = kwargs['post_function']
-    else:
-        post_function = requests.post
+    if 'post_function' not in kwargs:
+        schedule_event(stats)
+        return
 
     hooks = WebHook.objects.filter(project=project)
     if not hooks:
         logger.debug("Project %s has no web hooks" % project.slug)
         return
 
-    event_info = {
-        'project': project.slug,
-        'resource': resource.slug,
-        'language': language.code,
-        'percent': stats.translated_perc,
-    }
-    logger.debug(
-        "POST data for %s: %s" % (stats.resource.project.slug, event_info)
-    )
-
+    data = event_info(stats)
+    logger.debug("POST data for %s: %s" % (project.slug, data))
     for hook in hooks:
-        res = post_function(hook.url,
-          data=event_info, allow_redirects=False, timeout=2.0)
-
-        if res.ok:
-            logger.debug("POST for project %s successful." % project)
-        else:
-            msg = "Error visiting webhook %s: HTTP code is %s" % (
-              hook, res.status_code)
-            logger.error(msg)
+        post_event(hook.id, hook.url, data, kwargs['post_function'])
 
 
 def add_web_hook_field(sender, **kwargs):
@@ -107,3 +90,5 @@ def connect():
     post_update_rlstats.connect(visit_url)
     project_form_init.connect(add_web_hook_field)
     post_proj_save_m2m.connect(save_web_hook)
+    post_save.connect(invalidate_has_hooks, sender=WebHook)
+    post_delete.connect(invalidate_has_hooks, sender=WebHook)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+"""
+Celery tasks of the web hooks addon.
+"""
+
+from celery.decorators import task
+from django.conf import settings
+from transifex.txcommon.log import logger
+from transifex.resources.models import RLStats
+from webhooks.models import WebHook
+from webhooks.delivery import event_info, clear_event, post_event, \
+        retry_delay, record_dropped
+
+
+@task(name='webhooks_send_event', ignore_result=True)
+def send_event(resource_id, language_id):
+    """Send the latest state of a translation to the web hooks of its
+    project.
+    """
+    clear_event(resource_id, language_id)
+    try:
+        stats = RLStats.objects.select_related(
+            'resource__project', 'language'
+        ).get(resource=resource_id, language=language_id)
+    except RLStats.DoesNotExist:
+        return
+    data = event_info(stats)
+    for hook in WebHook.objects.filter(project=stats.resource.project_id):
+        deliver_event.delay(hook.id, hook.url, data)
+
+
+@task(name='webhooks_deliver_event', ignore_result=True)
+def deliver_event(hook_id, url, data):
+    """Send an event to a web hook, retrying on failure."""
+    if post_event(hook_id, url, data):
+        return
+    retries = deliver_event.request.retries
+    if retries >= getattr(settings, 'WEBHOOKS_MAX_RETRIES', 5):
+        logger.error("Giving up on webhook %s for %s." % (url, data))
+        record_dropped(hook_id)
+        return
+    deliver_event.retry(
+        args=[hook_id, url, data], countdown=retry_delay(retries),
+        max_retries=None
+    )
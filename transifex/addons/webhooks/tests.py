@@ -5,12 +5,17 @@ Tests for the webhook addon.
 """
 
 from __future__ import with_statement
+import cgi
+import threading
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
 from mock import patch
 from django.core.exceptions import ValidationError
 from transifex.txcommon.log import logger
 from transifex.txcommon.tests.base import BaseTestCase
 from webhooks.models import WebHook
 from webhooks.handlers import visit_url, add_web_hook_field, save_web_hook
+from webhooks.delivery import event_info, post_event, delivery_metrics, \
+        schedule_event
 from transifex.resources.models import RLStats
 from transifex.projects.forms import ProjectForm
 
@@ -33,6 +38,23 @@ class TestWebHooks(BaseTestCase):
             visit_url(sender=stats)
             self.assertFalse(log_mock.called)
 
+    def test_schedule_without_hooks(self):
+        """Test that no event is scheduled for a project without web
+        hooks.
+        """
+        stats = RLStats.objects.get(
+            resource=self.resource, language=self.language_en
+        )
+        with patch('webhooks.delivery.project_has_hooks') as has_hooks:
+            with patch('webhooks.tasks.send_event') as send_event:
+                has_hooks.return_value = False
+                schedule_event(stats)
+                self.assertFalse(send_event.apply_async.called)
+                has_hooks.return_value = True
+                schedule_event(stats)
+                self.assertTrue(send_event.apply_async.called)
+        has_hooks.assert_called_with(self.resource.project_id)
+
     def test_wrong_url(self):
         """Test that an error occurs, if you try to create a web hook
         with a local URI.
@@ -64,6 +86,38 @@ class TestWebHooks(BaseTestCase):
             visit_url(stats, post_function=_mock_successful_request)
             self.assertFalse(log_mock.called)
 
+    def test_delivery(self):
+        """Test the delivery of an event to a local HTTP server."""
+        stats = RLStats.objects.get(
+            resource=self.resource, language=self.language_en
+        )
+        data = event_info(stats)
+        server = HTTPServer(('127.0.0.1', 0), _StubHandler)
+        server.received = []
+        server.status = 200
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        try:
+            hook = WebHook.objects.create(
+                project=self.resource.project,
+                url='http://127.0.0.1:%s/hook' % server.server_port
+            )
+            self.assertTrue(post_event(hook.id, hook.url, data))
+            server.status = 500
+            self.assertFalse(post_event(hook.id, hook.url, data))
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEquals(len(server.received), 2)
+        self.assertEquals(server.received[0]['project'], [self.project.slug])
+        self.assertEquals(
+            server.received[0]['language'], [self.language_en.code]
+        )
+        metrics = delivery_metrics(hook.id)
+        self.assertEquals(metrics['delivered'], 1)
+        self.assertEquals(metrics['failed'], 1)
+
 
 class TestWebHookHandlers(BaseTestCase):
     """Test signal handlers for project edit form."""
@@ -93,3 +147,19 @@ class MockResponse(object):
     def __init__(self, code):
         self.status_code = code
         self.ok = self.status_code == 200
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Record the form data of the POST requests and respond with the
+    status of the server.
+    """
+
+    def do_POST(self):
+        length = int(self.headers.getheader('content-length'))
+        self.server.received.append(cgi.parse_qs(self.rfile.read(length)))
+        self.send_response(self.server.status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
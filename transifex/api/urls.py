@@ -12,7 +12,7 @@ from transifex.languages.api import LanguageHandler
 from transifex.projects.api import ProjectHandler
 from transifex.resources.api import ResourceHandler, StatsHandler, \
         TranslationHandler, FormatsHandler, TranslationObjectsHandler,\
-        SingleTranslationHandler
+        SingleTranslationHandler, ImportJobHandler, ProjectStatsHandler
 from transifex.releases.api import ReleaseHandler
 from transifex.actionlog.api import ActionlogHandler
 from transifex.api.views import reject_legacy_api
@@ -23,6 +23,7 @@ resource_handler = Resource(ResourceHandler, authentication=auth)
 release_handler = Resource(ReleaseHandler, authentication=auth)
 project_handler = Resource(ProjectHandler, authentication=auth)
 stats_handler = Resource(StatsHandler, authentication=auth)
+project_stats_handler = Resource(ProjectStatsHandler, authentication=auth)
 translation_handler = Resource(TranslationHandler, authentication=auth)
 actionlog_handler = Resource(ActionlogHandler, authentication=auth)
 formats_handler = Resource(FormatsHandler, authentication=auth)
@@ -30,6 +31,7 @@ translation_objects_handler = Resource(TranslationObjectsHandler,
         authentication=auth)
 single_translation_handler = Resource(SingleTranslationHandler,
         authentication=auth)
+import_job_handler = Resource(ImportJobHandler, authentication=auth)
 
 urlpatterns = patterns('',
     url(
@@ -92,6 +94,11 @@ urlpatterns = patterns('',
         never_cache(translation_handler),
         {'api_version': 2},
         name='apiv2_translation',
+    ), url(
+        r'^2/project/(?P<project_slug>[-\w]+)/resource/(?P<resource_slug>[-\w]+)/import/(?P<job_id>\d+)/$',
+        never_cache(import_job_handler),
+        {'api_version': 2},
+        name='apiv2_import_job',
     ), url(
         r'^2/project/(?P<project_slug>[-\w]+)/resource/(?P<resource_slug>[-\w]+)/stats/$',
         never_cache(stats_handler),
@@ -102,6 +109,26 @@ urlpatterns = patterns('',
         never_cache(stats_handler),
         {'api_version': 2},
         name='apiv2_stats',
+    ), url(
+        r'^2/project/(?P<project_slug>[-\w]+)/stats/$',
+        never_cache(project_stats_handler),
+        {'api_version': 2, 'lang_code': None},
+        name='apiv2_project_stats',
+    ), url(
+        r'^2/project/(?P<project_slug>[-\w]+)/stats/(?P<lang_code>[\-_@\w\.]+)/$',
+        never_cache(project_stats_handler),
+        {'api_version': 2},
+        name='apiv2_project_stats',
+    ), url(
+        r'^2/project/(?P<project_slug>[-\w]+)/release/(?P<release_slug>[-\w]+)/stats/$',
+        never_cache(project_stats_handler),
+        {'api_version': 2, 'lang_code': None},
+        name='apiv2_release_stats',
+    ), url(
+        r'^2/project/(?P<project_slug>[-\w]+)/release/(?P<release_slug>[-\w]+)/stats/(?P<lang_code>[\-_@\w\.]+)/$',
+        never_cache(project_stats_handler),
+        {'api_version': 2},
+        name='apiv2_release_stats',
     ), url(
         r'^2/project/(?P<project_slug>[-\w]+)/release/(?P<release_slug>[-\w]+)/$',
         never_cache(release_handler),
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+"""
+Cache of the private projects each user has access to.
+
+Filtering the projects a user may see used to exclude the private projects
+with a join on the maintainers and the teams of every project, followed by
+a DISTINCT, and that filter was nested in the filters of resources,
+statistics and translations. Instead, the ids of the private projects a
+user has access to are looked up once and cached, so that the filters are
+plain ``private = false OR id IN (...)`` lookups (see ``visible_projects_q``).
+
+The cached sets are versioned with generations (see
+``transifex.txcommon.cache``). The 'project_access' generation of a user
+changes when they become or stop being a maintainer of a project or a
+member of a team, and the 'private_projects' generation changes when a
+project becomes private or public.
+
+The generations are changed after the rows are written. Inside a request
+they are changed once more when the request finishes, since a view may
+commit its transaction later and a set computed in the meantime from the
+old rows would be cached under the new generation.
+"""
+
+import threading
+from django.core.cache import cache
+from django.core.signals import request_started, request_finished
+from django.db.models import get_model, Q
+from transifex.txcommon.cache import get_generations, bump_generation
+
+# How long the private projects of a user are cached, in seconds.
+PROJECT_ACCESS_TIMEOUT = 24 * 60 * 60
+
+# The generations to change again when the current request finishes.
+_pending = threading.local()
+
+
+def private_project_ids(user):
+    """Return the set of the ids of the private projects a user has access
+    to, as a maintainer or as a member of one of their teams.
+    """
+    generations = get_generations([
+        ('private_projects', ), ('project_access', user.pk)
+    ])
+    key = 'project_access.%s.%s.%s' % (user.pk, generations[0],
+                                        generations[1])
+    ids = cache.get(key)
+    if ids is None:
+        Project = get_model('projects', 'Project')
+        Team = get_model('teams', 'Team')
+        candidates = set(Project.maintainers.through.objects.filter(
+            user=user
+        ).values_list('project', flat=True))
+        candidates.update(Team.objects.for_user(user).values_list(
+            'project', flat=True
+        ))
+        ids = frozenset()
+        if candidates:
+            ids = frozenset(Project.objects.filter(
+                private=True, id__in=candidates
+            ).values_list('id', flat=True))
+        cache.set(key, ids, PROJECT_ACCESS_TIMEOUT)
+    return ids
+
+
+def visible_projects_q(user, prefix=''):
+    """Return a Q object matching the projects a user has access to.
+
+    Args:
+        user: The user, or None for an anonymous user.
+        prefix: The lookup of the project in the filtered objects, e.g.
+            'project__' for resources. By default the projects themselves
+            are filtered.
+    """
+    if user is None or not user.is_authenticated():
+        return Q(**{prefix + 'private': False})
+    if user.is_superuser:
+        return Q()
+    query = Q(**{prefix + 'private': False})
+    ids = private_project_ids(user)
+    if ids:
+        query |= Q(**{prefix + 'id__in': list(ids)})
+    return query
+
+
+def _bump(*scope):
+    """Change the generation of a scope now and, inside a request, when
+    the request finishes.
+    """
+    bump_generation(*scope)
+    scopes = getattr(_pending, 'scopes', None)
+    if scopes is not None:
+        scopes.add(scope)
+
+
+def invalidate_project_access(*user_ids):
+    """Invalidate the cached private projects of some users."""
+    for user_id in user_ids:
+        _bump('project_access', user_id)
+
+
+def on_project_pre_save(sender, instance, raw=False, **kwargs):
+    """Remember whether the privacy of a project changes, when it is
+    saved.
+    """
+    instance._privacy_changed = not raw and instance.pk is not None and \
+            not sender.objects.filter(
+                pk=instance.pk, private=instance.private
+            ).exists()
+
+
+def on_project_post_save(sender, instance, **kwargs):
+    """Invalidate the cached private projects of all users, when a project
+    has become private or public.
+    """
+    if getattr(instance, '_privacy_changed', False):
+        instance._privacy_changed = False
+        _bump('private_projects')
+
+
+def users_changed(field):
+    """Return a m2m_changed signal handler, which invalidates the cached
+    private projects of the users added to or removed from the ``field``
+    (e.g. the members of a team).
+    """
+    def handler(sender, instance, action, reverse, pk_set, **kwargs):
+        if reverse:
+            # The projects or the teams of a user changed.
+            if action in ('post_add', 'post_remove', 'post_clear'):
+                invalidate_project_access(instance.pk)
+        elif action in ('post_add', 'post_remove'):
+            invalidate_project_access(*(pk_set or ()))
+        elif action == 'pre_clear':
+            instance._cleared_user_ids = list(
+                getattr(instance, field).values_list('pk', flat=True)
+            )
+        elif action == 'post_clear':
+            invalidate_project_access(
+                *getattr(instance, '_cleared_user_ids', ())
+            )
+    return handler
+
+
+def _team_user_ids(team):
+    user_ids = set()
+    for field in ('coordinators', 'members', 'reviewers'):
+        user_ids.update(
+            getattr(team, field).values_list('pk', flat=True)
+        )
+    return user_ids
+
+
+def on_team_save(sender, instance, **kwargs):
+    """Invalidate the cached private projects of the users of a team, when
+    it is saved (e.g. moved to another project).
+    """
+    invalidate_project_access(*_team_user_ids(instance))
+
+
+def on_team_pre_delete(sender, instance, **kwargs):
+    """Remember the users of a team, since they are removed before the
+    team is.
+    """
+    instance._access_user_ids = _team_user_ids(instance)
+
+
+def on_team_post_delete(sender, instance, **kwargs):
+    """Invalidate the cached private projects of the users of a deleted
+    team.
+    """
+    invalidate_project_access(*getattr(instance, '_access_user_ids', ()))
+
+
+def _start_request(sender, **kwargs):
+    _pending.scopes = set()
+
+
+def _finish_request(sender, **kwargs):
+    scopes, _pending.scopes = getattr(_pending, 'scopes', None), None
+    for scope in scopes or ():
+        bump_generation(*scope)
+
+request_started.connect(_start_request)
+request_finished.connect(_finish_request)
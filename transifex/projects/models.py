@@ -9,7 +9,7 @@ from tagging_autocomplete.models import TagAutocompleteField
 import markdown
 
 from django.conf import settings
-from django.contrib.auth.models import User, AnonymousUser
+from django.contrib.auth.models import User
 from django.contrib.contenttypes import generic
 from django.core.cache import cache
 from django.core.exceptions import ValidationError
@@ -29,6 +29,7 @@ from userena.models import upload_to_mugshot
 from easy_thumbnails.fields import ThumbnailerImageField
 
 from transifex.actionlog.models import LogEntry
+from transifex.actionlog.queues import invalidate_private_slugs
 from transifex.txcommon.db.models import ChainerManager
 from transifex.txcommon.log import log_model, logger
 from transifex.languages.models import Language
@@ -36,6 +37,8 @@ from datastores import TxRedisMapper, redis_exception_handler
 from .signals import project_created, project_deleted, \
         project_outsourced_changed
 from .handlers import on_outsource_change
+from .access import visible_projects_q, on_project_pre_save, \
+        on_project_post_save, users_changed
 
 from south.modelsinspector import add_introspection_rules
 add_introspection_rules([], ["tagging_autocomplete.models.TagAutocompleteField"])
@@ -106,16 +109,7 @@ class DefaultProjectQuerySet(models.query.QuerySet):
         checks permissions and filters out private projects that the user
         doesn't have access to.
         """
-        projects = self
-        if user in [None, AnonymousUser()]:
-            projects = projects.filter(private=False)
-        else:
-            if not user.is_superuser:
-                Team = get_model('teams', 'Team')
-                projects = projects.exclude(
-                    Q(private=True) & ~(Q(maintainers__in=[user]) |
-                    Q(team__in=Team.objects.for_user(user)))).distinct()
-        return projects
+        return self.filter(visible_projects_q(user))
 
     def public(self):
         return self.filter(private=False)
@@ -395,3 +389,11 @@ class HubRequest(models.Model):
 
 # Connect to signals
 project_outsourced_changed.connect(on_outsource_change)
+models.signals.post_save.connect(invalidate_private_slugs, sender=Project)
+models.signals.post_delete.connect(invalidate_private_slugs, sender=Project)
+models.signals.pre_save.connect(on_project_pre_save, sender=Project)
+models.signals.post_save.connect(on_project_post_save, sender=Project)
+models.signals.m2m_changed.connect(
+    users_changed('maintainers'), sender=Project.maintainers.through,
+    weak=False
+)
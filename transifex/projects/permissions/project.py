@@ -148,4 +148,89 @@ class ProjectPermission(BasePermission):
         return False
     private.short_description=_('Is allowed to browse this private project')
 
+
+
+def _object_key(obj):
+    if obj is None:
+        return None
+    return (obj.__class__.__name__, obj.pk)
+
+
+class ProjectPermissionSnapshot(ProjectPermission):
+    """A ProjectPermission that resolves each check once.
+
+    The result of each check is kept per (project, language) or team, so
+    that operations that check the same permissions for many strings (e.g.
+    saving a translation file) query the database once. The results are
+    never invalidated, so a snapshot should only live as long as the
+    request or the operation it was created for.
+    """
+
+    def __init__(self, user=None, *args, **kwargs):
+        super(ProjectPermissionSnapshot, self).__init__(user, *args, **kwargs)
+        self._results = {}
+        self._snapshots = {}
+
+    def _resolve(self, check, args, kwargs, key):
+        key = (check, ) + key
+        try:
+            return self._results[key]
+        except KeyError:
+            method = getattr(super(ProjectPermissionSnapshot, self), check)
+            result = self._results[key] = method(*args, **kwargs)
+            return result
+
+    def maintain(self, project=None):
+        return self._resolve(
+            'maintain', (project, ), {}, (_object_key(project), )
+        )
+
+    def coordinate_team(self, project=None, language=None):
+        return self._resolve(
+            'coordinate_team', (project, language), {},
+            (_object_key(project), _object_key(language))
+        )
+
+    def proofread(self, project=None, language=None, any_team=False):
+        return self._resolve(
+            'proofread', (project, language), {'any_team': any_team},
+            (_object_key(project), _object_key(language), any_team)
+        )
+
+    def submit_translations(self, obj, any_team=False):
+        return self._resolve(
+            'submit_translations', (obj, ), {'any_team': any_team},
+            (_object_key(obj), any_team)
+        )
+
+    def private(self, project=None):
+        return self._resolve(
+            'private', (project, ), {}, (_object_key(project), )
+        )
+
+    def for_user(self, user):
+        """Return the snapshot of another user, which lives as long as this
+        one.
+        """
+        if user == self.user:
+            return self
+        if user.pk not in self._snapshots:
+            self._snapshots[user.pk] = ProjectPermissionSnapshot(user)
+        return self._snapshots[user.pk]
+
+
+def permission_snapshot(request):
+    """Return the ProjectPermissionSnapshot of the user of a request.
+
+    The snapshot is created on first use and shared by the rest of the
+    request.
+    """
+    snapshot = getattr(request, '_permission_snapshot', None)
+    if snapshot is None or snapshot.user != request.user:
+        snapshot = request._permission_snapshot = ProjectPermissionSnapshot(
+            request.user
+        )
+    return snapshot
+
+
 authority.register(Project, ProjectPermission)
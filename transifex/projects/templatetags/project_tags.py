@@ -1,7 +1,6 @@
 from django import template
 from django.db.models import Sum
-from transifex.languages.models import Language
-from transifex.resources.models import RLStats, Resource
+from transifex.resources.models import ProjectLanguageStats, ProjectStats
 from transifex.txcommon.utils import StatBarsPositions
 
 register = template.Library()
@@ -10,16 +9,14 @@ register = template.Library()
 def progress_for_project(project, language_code=None, width=100):
     """Render a progressbar for the specified project."""
 
-    stats = RLStats.objects.by_project(project).filter(
+    stats = ProjectLanguageStats.objects.by_project(project).filter(
         language__code=language_code
     ).values('language__code').annotate(
         trans=Sum('translated'),
         untrans=Sum('untranslated')
     ).order_by()
 
-    total = Resource.objects.by_project(project).aggregate(
-        total_entities=Sum('total_entities')
-    )['total_entities']
+    total = ProjectStats.objects.by_project(project).total_entities()
 
     if not stats:
         # Project has no resources
@@ -267,3 +267,36 @@ class ProjectAccessControlTestCase(BaseTestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'projects/project_detail.html')
+
+    def test_permission_snapshot(self):
+        """Test that a snapshot resolves the same permissions once."""
+        from django.db import connection
+        from transifex.projects.permissions.project import \
+                ProjectPermission, ProjectPermissionSnapshot
+        for role in USER_ROLES[1:]:
+            user = self.user[role]
+            check = ProjectPermission(user)
+            snapshot = ProjectPermissionSnapshot(user)
+            expected = (
+                check.maintain(self.project),
+                check.proofread(self.project, self.language),
+                check.submit_translations(self.team),
+            )
+            result = (
+                snapshot.maintain(self.project),
+                snapshot.proofread(self.project, self.language),
+                snapshot.submit_translations(self.team),
+            )
+            self.assertEqual(result, expected, role)
+
+            connection.use_debug_cursor = True
+            start = len(connection.queries)
+            try:
+                for i in range(3):
+                    snapshot.maintain(self.project)
+                    snapshot.proofread(self.project, self.language)
+                    snapshot.submit_translations(self.team)
+            finally:
+                connection.use_debug_cursor = False
+            self.assertEqual(len(connection.queries), start)
+        self.assertTrue(snapshot.for_user(snapshot.user) is snapshot)
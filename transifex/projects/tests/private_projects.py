@@ -1,3 +1,4 @@
+from __future__ import with_statement
 import os
 
 from django.conf import settings
@@ -725,6 +726,70 @@ class PrivateProjectTest(BaseTestCase):
         """
         pass
 
+    def test_for_user_follows_access_changes(self):
+        """
+        Test that the cached private projects of a user are invalidated,
+        when the maintainers, the teams or the privacy of a project change.
+        """
+        user = self.user['registered']
+        self.assertFalse(
+            Project.objects.for_user(user).filter(
+                pk=self.project_private.pk).exists()
+        )
+        self.project_private.maintainers.add(user)
+        self.assertTrue(
+            Project.objects.for_user(user).filter(
+                pk=self.project_private.pk).exists()
+        )
+        self.project_private.maintainers.remove(user)
+        self.team_private.members.add(user)
+        self.assertTrue(
+            Project.objects.for_user(user).filter(
+                pk=self.project_private.pk).exists()
+        )
+        self.team_private.members.remove(user)
+        self.assertFalse(
+            Project.objects.for_user(user).filter(
+                pk=self.project_private.pk).exists()
+        )
+
+        # A public project that becomes private is hidden from the users
+        # outside its teams.
+        maintainer = self.user['maintainer']
+        self.assertTrue(
+            Project.objects.for_user(maintainer).filter(
+                pk=self.project.pk).exists()
+        )
+        self.project.private = True
+        self.project.save()
+        self.assertTrue(
+            Project.objects.for_user(maintainer).filter(
+                pk=self.project.pk).exists()
+        )
+        self.assertFalse(
+            Project.objects.for_user(user).filter(
+                pk=self.project.pk).exists()
+        )
+
+    def test_access_invalidated_when_request_finishes(self):
+        """
+        Test that the cached private projects of a user are invalidated
+        again when the request that changed them finishes, after its
+        transaction has been committed.
+        """
+        from django.core.signals import request_started, request_finished
+        from mock import patch
+        user = self.user['registered']
+        with patch('transifex.projects.access.bump_generation') as bump:
+            request_started.send(sender=None)
+            try:
+                self.team_private.members.add(user)
+                bump.assert_called_with('project_access', user.pk)
+                bump.reset_mock()
+            finally:
+                request_finished.send(sender=None)
+            bump.assert_called_with('project_access', user.pk)
+
 
 class ProjectLookupsTests(BaseTestCase):
 
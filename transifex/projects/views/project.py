@@ -27,8 +27,9 @@ from transifex.languages.models import Language
 from transifex.projects.permissions.project import ProjectPermission
 from transifex.projects.signals import project_outsourced_changed
 from transifex.releases.handlers import update_all_release
-from transifex.resources.models import Resource, RLStats
-from transifex.resources.utils import invalidate_template_cache
+from transifex.resources.models import Resource, RLStats, \
+        ProjectLanguageStats, ProjectStats
+from transifex.txcommon.cache import bump_generation
 from transifex.teams.forms import TeamRequestSimpleForm
 from transifex.projects.models import Permission
 
@@ -245,10 +246,7 @@ def handle_stats_on_access_control_edit(project):
             for stat in new_stats:
                 RLStats.objects.get_or_create(resource=resource,
                     language=stat.language)
-            invalidate_template_cache("project_resource_details",
-                project.slug, resource.slug)
-            invalidate_template_cache("resource_details",
-                project.slug, resource.slug)
+            bump_generation('resource', resource.id)
     else:
         teams = project.team_set.all()
         for resource in project.resources.all():
@@ -256,10 +254,7 @@ def handle_stats_on_access_control_edit(project):
                 Q(translated=0) & ~Q(language__in=teams.values('language')))
             for stat in old_stats:
                 stat.delete()
-            invalidate_template_cache("project_resource_details",
-                project.slug, resource.slug)
-            invalidate_template_cache("resource_details",
-                project.slug, resource.slug)
+            bump_generation('resource', resource.id)
 
 
 def _delete_project(request, project):
@@ -314,8 +309,9 @@ def project_detail(request, project_slug):
         Q(id__in=project.outsourcing.all().values('source_language').distinct())
     ).distinct().values_list('code', flat=True)
 
-    language_stats = RLStats.objects.for_user(request.user
-        ).by_project_language_aggregated(project)
+    language_stats = ProjectLanguageStats.objects.for_user(request.user
+        ).by_project(project).aggregated(
+        ProjectStats.objects.by_project(project).total_entities())
 
     teams = project.available_teams.values('id').annotate(
         request_count=Count('join_requests', distinct=True),
@@ -363,7 +359,7 @@ def project_resources(request, project_slug):
     statslist = Resource.objects.filter(
         project=project
     ).values(
-        'slug', 'name', 'category', 'priority__level',
+        'id', 'slug', 'name', 'category', 'priority__level',
         'total_entities', 'wordcount'
     ).annotate(
         last_update=Max('rlstats__last_update')
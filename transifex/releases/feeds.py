@@ -2,12 +2,14 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.conf import settings
 from django.contrib.syndication.feeds import Feed, FeedDoesNotExist
 from django.contrib.sites.models import Site
+from django.db.models import Sum
 from django.shortcuts import get_object_or_404
 from django.utils.translation import ugettext_lazy as _
 
 from transifex.languages.models import Language
 from transifex.projects.models import Project
-from transifex.resources.models import RLStats
+from transifex.resources.models import Resource, RLStats, \
+        ReleaseLanguageStats
 from transifex.releases.models import Release
 
 current_site = Site.objects.get_current()
@@ -43,7 +45,10 @@ class ReleaseFeed(Feed):
         return obj.get_absolute_url()
 
     def items(self, obj):
-        return RLStats.objects.by_release_aggregated(self.release)
+        total = Resource.objects.filter(releases=self.release).aggregate(
+            total=Sum('total_entities'))['total']
+        return ReleaseLanguageStats.objects.by_release(self.release
+            ).aggregated(total)
 
     def item_link(self, obj):
         return self.release.get_absolute_url()
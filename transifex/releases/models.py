@@ -5,16 +5,14 @@ import markdown
 
 from django.conf import settings
 from django.core.cache import cache
-from django.db.models import get_model
 from django.utils.translation import ugettext_lazy as _
 from django.db import models, IntegrityError
 from django.db.models import permalink
 from django.utils.html import escape
 
 from transifex.txcommon.log import log_model
-from transifex.resources.utils import invalidate_template_cache
+from transifex.txcommon.cache import bump_generation
 
-RLStats = get_model('resources', 'RLStats')
 
 class Release(models.Model):
 
@@ -98,9 +96,7 @@ class Release(models.Model):
         #TODO: Find way to update the object accordingly if *_date fields change
         rn = ReleaseNotifications.objects.get_or_create(release=self)[0]
 
-        for stat in RLStats.objects.by_release_aggregated(self):
-            invalidate_template_cache("release_details",
-                self.pk, stat.object.id)
+        bump_generation('release', self.pk)
 
     @permalink
     def get_absolute_url(self):
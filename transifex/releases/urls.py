@@ -40,6 +40,10 @@ urlpatterns += patterns('',
         regex = RELEASE_URL_PARTIAL + r'edit/$',
         view = release_create_update,
         name = 'release_edit',),
+    url(
+        regex = RELEASE_URL_PARTIAL + r'download/$',
+        view = release_download,
+        name = 'release_download',),
     url(
         regex = RELEASE_URL_PARTIAL + r'delete/$',
         view = release_delete,
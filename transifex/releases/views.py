@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from django.core.urlresolvers import reverse
-from django.http import Http404, HttpResponseRedirect, HttpResponse
+from django.http import Http404, HttpResponseRedirect, HttpResponse, \
+        HttpResponseBadRequest
 from django.shortcuts import render_to_response, get_object_or_404
 from django.template import RequestContext
 from django.utils.translation import ugettext as _
@@ -8,7 +9,7 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import AnonymousUser
-from django.db.models import F
+from django.db.models import F, Sum
 
 from actionlog.models import action_logging
 from transifex.languages.models import Language
@@ -18,7 +19,10 @@ from transifex.projects.permissions import *
 from transifex.releases import RELEASE_ALL_DATA
 from transifex.releases.models import Release
 from transifex.releases.forms import ReleaseForm
-from transifex.resources.models import Resource, RLStats
+from transifex.resources.models import Resource, RLStats, \
+        ReleaseLanguageStats
+from transifex.resources.export import export_archive, export_options, \
+        archive_response
 
 # Temporary
 from transifex.txcommon import notifications as txnotification
@@ -91,8 +95,10 @@ def release_detail(request, project_slug, release_slug):
     if not len(source_languages) == 1:
         source_languages = ()
 
-    statslist = RLStats.objects.select_related('language', 'last_committer'
-        ).for_user(request.user).by_release_aggregated(release)
+    total = Resource.objects.filter(releases=release).aggregate(
+        total=Sum('total_entities'))['total']
+    statslist = ReleaseLanguageStats.objects.for_user(request.user
+        ).by_release(release).aggregated(total)
 
     return render_to_response('projects/release_detail.html', {
         'release': release,
@@ -104,6 +110,33 @@ def release_detail(request, project_slug, release_slug):
         'statslist': statslist,
     }, context_instance=RequestContext(request))
 
+
+@login_required
+@one_perm_required_or_403(pr_project_private_perm,
+    (Project, 'slug__exact', 'project_slug'))
+def release_download(request, project_slug, release_slug):
+    """Download the translation files of the resources of a release as a
+    zip archive.
+
+    Only the resources the user has access to are included. The languages
+    are given as a comma separated list of codes in the 'languages' GET
+    parameter.
+    """
+    release = get_object_or_404(Release, slug=release_slug,
+        project__slug=project_slug)
+    try:
+        languages, mode = export_options(request.GET)
+    except ValueError, e:
+        return HttpResponseBadRequest(unicode(e))
+    resources = Resource.objects.select_related('project').for_user(
+        request.user).filter(releases=release).order_by(
+        'project__slug', 'slug').distinct()
+    return archive_response(
+        export_archive(resources, languages, mode=mode),
+        "%s_%s.zip" % (release.project.slug, release.slug)
+    )
+
+
 @one_perm_required_or_403(pr_project_private_perm,
     (Project, 'slug__exact', 'project_slug'), anonymous_access=True)
 def release_language_detail(request, project_slug, release_slug, language_code):
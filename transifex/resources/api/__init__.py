@@ -6,15 +6,17 @@ import tempfile
 import urllib
 from itertools import ifilter
 from django.db import transaction, IntegrityError, DatabaseError
+from django.db.models import Sum
 from django.conf import settings
 from django.forms import ValidationError
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseNotModified
 from django.core.urlresolvers import reverse
 from django.core.exceptions import ObjectDoesNotExist
 from django.template.defaultfilters import slugify
 from django.contrib.auth.models import User
 from django.utils import simplejson
 from django.utils.encoding import smart_unicode
+from django.utils.http import parse_etags, quote_etag
 from django.utils.translation import ugettext_lazy as _
 
 from piston.handler import BaseHandler, AnonymousBaseHandler
@@ -27,15 +29,17 @@ from transifex.txcommon.utils import paginate
 from transifex.projects.permissions import *
 from transifex.languages.models import Language
 from transifex.projects.models import Project
-from transifex.projects.permissions.project import ProjectPermission
+from transifex.projects.permissions.project import ProjectPermission, \
+        permission_snapshot
 from transifex.projects.signals import post_submit_translation, post_resource_save
 
 from transifex.resources.decorators import method_decorator
 from transifex.resources.models import Resource, SourceEntity, \
-        Translation as TranslationModel, RLStats
+        Translation as TranslationModel, RLStats, ImportJob, \
+        ProjectLanguageStats, ReleaseLanguageStats, ProjectStats
 from transifex.resources.backends import ResourceBackend, FormatsBackend, \
-        ResourceBackendError, content_from_uploaded_file, \
-        filename_of_uploaded_file
+        ResourceBackendError, FormatsBackendError, \
+        content_from_uploaded_file, filename_of_uploaded_file, uploaded_file
 from transifex.resources.formats import Mode
 from transifex.resources.formats.registry import registry
 from transifex.resources.formats.core import ParseError
@@ -50,6 +54,25 @@ from .translation_object import *
 from .exceptions import BadRequestError, NoContentError, NotFoundError, \
         ForbiddenError
 
+
+def _job_accepted(job):
+    """Return the response to a request that started an ImportJob.
+
+    The Location header points to the job, which clients can poll.
+    """
+    url = reverse('apiv2_import_job', kwargs={
+        'project_slug': job.resource.project.slug,
+        'resource_slug': job.resource.slug,
+        'job_id': job.id,
+    })
+    response = HttpResponse(
+        simplejson.dumps(job.to_dict()), status=202,
+        mimetype='application/json'
+    )
+    response['Location'] = url
+    return response
+
+
 class ResourceHandler(BaseHandler):
     """
     Resource Handler for CRUD operations.
@@ -133,6 +156,8 @@ class ResourceHandler(BaseHandler):
             return BAD_REQUEST(unicode(e))
         except NotFoundError, e:
             return rc.NOT_FOUND
+        if isinstance(res, ImportJob):
+            return _job_accepted(res)
         t = Translation.get_object("create", request)
         res = t.__class__.to_http_for_create(t, res)
         if res.status_code == 200:
@@ -233,7 +258,14 @@ class ResourceHandler(BaseHandler):
             )
 
         try:
-            content = self._get_content(request, data)
+            if request.GET.get('async') and \
+                    'multipart/form-data' in request.content_type:
+                # Copied to the disk in chunks, instead of being read.
+                content = uploaded_file(request.FILES)
+                if content is None:
+                    raise NoContentError("No file has been uploaded.")
+            else:
+                content = self._get_content(request, data)
             filename = self._get_filename(request, data)
         except NoContentError, e:
             raise BadRequestError(unicode(e))
@@ -242,7 +274,9 @@ class ResourceHandler(BaseHandler):
             rb = ResourceBackend()
             rb_create =  rb.create(
                 project, slug, name, method, project.source_language, content,
-                extra_data={'filename': filename}
+                extra_data={'filename': filename},
+                in_background=bool(request.GET.get('async')),
+                callback=request.GET.get('callback')
             )
             post_resource_save.send(sender=None, instance=Resource.objects.get(
                 slug=slug, project=project),
@@ -411,6 +445,87 @@ class StatsHandler(BaseHandler):
         return res
 
 
+class ProjectStatsHandler(BaseHandler):
+    allowed_methods = ('GET', )
+
+    def read(self, request, project_slug, release_slug=None,
+             lang_code=None, api_version=1):
+        """
+        This is an API handler to display the translation statistics of all
+        the resources of a project or a release, per language.
+        """
+        if api_version != 2:
+            return BAD_REQUEST('Wrong API version called.')
+        return self._get_stats(request, project_slug, release_slug, lang_code)
+
+    def _get_stats(self, request, pslug, rslug, lang_code):
+        try:
+            project = Project.objects.for_user(request.user).get(slug=pslug)
+        except Project.DoesNotExist, e:
+            logger.debug(
+                "Project %s requested, but it does not exist" % pslug,
+                exc_info=True
+            )
+            return rc.NOT_FOUND
+        if rslug is None:
+            rollups = ProjectLanguageStats.objects.by_project(project)
+            total = ProjectStats.objects.by_project(project).total_entities()
+        else:
+            try:
+                release = project.releases.get(slug=rslug)
+            except ObjectDoesNotExist, e:
+                logger.debug(
+                    "Release %s.%s requested, but it does not exist" % (
+                        pslug, rslug
+                    ), exc_info=True
+                )
+                return rc.NOT_FOUND
+            rollups = ReleaseLanguageStats.objects.by_release(release)
+            total = Resource.objects.filter(releases=release).aggregate(
+                total=Sum('total_entities'))['total'] or 0
+        rollups = rollups.for_user(request.user)
+
+        if lang_code is not None:
+            try:
+                language = Language.objects.by_code_or_alias(lang_code)
+            except Language.DoesNotExist, e:
+                logger.debug(
+                    "Language %s was requested, but it does not exist." % lang_code,
+                    exc_info=True
+                )
+                return BAD_REQUEST("Unknown language code %s" % lang_code)
+            stats = rollups.by_language(language).aggregated(total)
+            if not stats:
+                return {
+                    'completed': '0%',
+                    'translated_entities': 0,
+                    'translated_words': 0,
+                    'untranslated_entities': total,
+                    'last_update': None,
+                    'last_commiter': '',
+                    'reviewed': 0,
+                    'resources': 0,
+                }
+            return self._stats_dict(stats[0])
+        # statistics requested for all languages
+        res = {}
+        for stat in rollups.aggregated(total):
+            res[stat.object.code] = self._stats_dict(stat)
+        return res
+
+    def _stats_dict(self, stat):
+        return {
+            'completed': '%s%%' % stat.translated_perc,
+            'translated_entities': stat.translated,
+            'translated_words': stat.translated_wordcount,
+            'untranslated_entities': max(stat.total - stat.translated, 0),
+            'last_update': stat.last_update,
+            'last_commiter': stat.last_committer.username if stat.last_committer else '',
+            'reviewed': stat.reviewed,
+            'resources': stat.number_resources,
+        }
+
+
 class TranslationHandler(BaseHandler):
     allowed_methods = ('GET', 'PUT', 'DELETE',)
 
@@ -471,15 +586,37 @@ class TranslationHandler(BaseHandler):
                 return BAD_REQUEST(unicode(e))
 
         translation = Translation.get_object("get", request, r, language)
+        etag = translation.cached_etag(pseudo_type=pseudo_type, mode=mode)
+        if etag is not None and self._etag_matches(request, etag):
+            return self._not_modified(etag)
         try:
             res = translation.get(pseudo_type=pseudo_type, mode=mode)
         except BadRequestError, e:
             return BAD_REQUEST(unicode(e))
         except FormatsBackendError, e:
             return BAD_REQUEST(unicode(e))
-        return translation.__class__.to_http_for_get(
+        if translation.etag is not None and \
+                self._etag_matches(request, translation.etag):
+            return self._not_modified(translation.etag)
+        response = translation.__class__.to_http_for_get(
             translation, res
         )
+        if translation.etag is not None:
+            response['ETag'] = translation.etag
+        return response
+
+    def _etag_matches(self, request, etag):
+        """Check whether the ETag matches the If-None-Match header."""
+        header = request.META.get('HTTP_IF_NONE_MATCH')
+        if not header:
+            return False
+        etags = parse_etags(header)
+        return '*' in etags or etag in [quote_etag(e) for e in etags]
+
+    def _not_modified(self, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
 
     def _update(self, request, project_slug, resource_slug, lang_code=None):
         # Permissions handling
@@ -506,7 +643,7 @@ class TranslationHandler(BaseHandler):
                 )
 
         team = Team.objects.get_or_none(resource.project, lang_code)
-        check = ProjectPermission(request.user)
+        check = permission_snapshot(request)
         if source_push and not check.maintain(resource.project):
             return rc.FORBIDDEN
         elif (not check.submit_translations(team or resource.project) or\
@@ -516,6 +653,8 @@ class TranslationHandler(BaseHandler):
 
         try:
             t = Translation.get_object("create", request, resource, language)
+            if request.GET.get('async'):
+                return _job_accepted(t.schedule())
             res = t.create()
         except BadRequestError, e:
             return BAD_REQUEST(unicode(e))
@@ -558,6 +697,10 @@ class Translation(object):
     Handle a translation for a resource.
     """
 
+    # Distinguishes the ETags of the different representations of the
+    # same compiled file.
+    etag_suffix = ''
+
     @staticmethod
     def get_object(type_, request, *args):
         """
@@ -625,6 +768,35 @@ class Translation(object):
         self.data = getattr(request, 'data', 'None')
         self.resource = resource
         self.language = language
+        self.etag = None
+
+    def _quote_etag(self, etag):
+        return quote_etag(etag + self.etag_suffix)
+
+    def cached_etag(self, pseudo_type, mode=None):
+        """Return the ETag of the requested translation, if the compiled
+        file is up-to-date in the cache, else None.
+
+        Args:
+            pseudo_type: The pseudo_type to use, if any.
+            mode: The mode of compilation, if any.
+        """
+        fb = FormatsBackend(self.resource, self.language)
+        etag = fb.compiled_etag(pseudo_type, mode=mode)
+        if etag is None:
+            return None
+        return self._quote_etag(etag)
+
+    def _compile(self, pseudo_type, mode=None):
+        """Compile the requested translation and set its ETag.
+
+        Returns:
+            The compiled template.
+        """
+        fb = FormatsBackend(self.resource, self.language)
+        content, etag = fb.compile_translation_cached(pseudo_type, mode=mode)
+        self.etag = self._quote_etag(etag)
+        return content
 
     def create(self):
         """
@@ -632,6 +804,31 @@ class Translation(object):
         """
         raise NotImplementedError
 
+    def schedule(self):
+        """
+        Import a new translation in the background.
+
+        Returns:
+            The ImportJob of the import.
+        """
+        raise NotImplementedError
+
+    def _schedule(self, content, filename=None):
+        """
+        Start an ImportJob for the content of the request.
+        """
+        fb = FormatsBackend(self.resource, self.language, self.request.user)
+        try:
+            return fb.schedule_import(
+                content,
+                is_source=self.resource.source_language == self.language,
+                filename=filename,
+                validation=self.request.GET.get('validation'),
+                callback=self.request.GET.get('callback')
+            )
+        except FormatsBackendError, e:
+            raise BadRequestError(unicode(e))
+
     @transaction.commit_on_success
     def delete(self):
         """
@@ -672,7 +869,8 @@ class Translation(object):
         try:
             parser.parse_file(is_source)
             strings_added, strings_updated = parser.save2db(
-                is_source, user=self.request.user
+                is_source, user=self.request.user,
+                validation=self.request.GET.get('validation')
             )
         except Exception, e:
             raise BadRequestError("Could not import file: %s" % e)
@@ -690,6 +888,8 @@ class Translation(object):
                 args=[self.resource.project.slug, self.resource.slug]
             )
         }
+        if parser.validation_report is not None:
+            retval['validation'] = parser.validation_report.to_dict()
         logger.debug("Extraction successful, returning: %s" % retval)
 
         # If any string added/updated
@@ -739,8 +939,7 @@ class FileTranslation(Translation):
             BadRequestError: There was a problem with the request.
         """
         try:
-            fb = FormatsBackend(self.resource, self.language)
-            return fb.compile_translation(pseudo_type, mode=mode)
+            return self._compile(pseudo_type, mode=mode)
         except Exception, e:
             logger.error(unicode(e), exc_info=True)
             raise BadRequestError("Error compiling the translation file: %s" %e )
@@ -778,11 +977,12 @@ class FileTranslation(Translation):
                 language=self.language,
                 filename=name
             )
-            parser.bind_file(file_.name)
             if parser is None:
                 raise BadRequestError("Unknown file type")
             if size == 0:
                 raise BadRequestError("Empty file")
+            stream = size >= settings.STREAMING_IMPORT_MIN_SIZE
+            parser.bind_file(file_.name, stream=stream)
 
             try:
                 parser.is_content_valid()
@@ -793,18 +993,38 @@ class FileTranslation(Translation):
                 logger.error(unicode(e), exc_info=True)
                 raise BadRequestError("A strange error happened.")
 
-            parser.bind_file(file_.name)
+            parser.bind_file(file_.name, stream=stream)
             res = self._parse_translation(parser)
         finally:
             os.unlink(file_.name)
         return res
 
+    def schedule(self):
+        """
+        Import a translation file in the background.
+
+        Returns:
+            The ImportJob of the import.
+
+        Raises:
+            BadRequestError: There was a problem with the request.
+            NoContentError: There was no file in the request.
+        """
+        submitted_file = uploaded_file(self.request.FILES)
+        if submitted_file is None:
+            raise NoContentError("No file has been uploaded.")
+        if submitted_file.size == 0:
+            raise BadRequestError("Empty file")
+        return self._schedule(submitted_file, filename=submitted_file.name)
+
 
 class StringTranslation(Translation):
     """
     Handle requests for translation as strings.
     """
 
+    etag_suffix = '-json'
+
     def get(self, start=None, end=None, pseudo_type=None, mode=None):
         """
         Return the requested translation in a json string.
@@ -822,8 +1042,7 @@ class StringTranslation(Translation):
             BadRequestError: There was a problem with the request.
         """
         try:
-            fb = FormatsBackend(self.resource, self.language)
-            template = fb.compile_translation(pseudo_type, mode=mode)
+            template = self._compile(pseudo_type, mode=mode)
         except Exception, e:
             logger.error(unicode(e), exc_info=True)
             raise BadRequestError(
@@ -879,6 +1098,47 @@ class StringTranslation(Translation):
             os.unlink(file_.name)
         return res
 
+    def schedule(self):
+        """
+        Import a translation supplied as a string in the background.
+
+        Returns:
+            The ImportJob of the import.
+
+        Raises:
+            BadRequestError: There was a problem with the request.
+            NoContentError: There was no content string in the request.
+        """
+        if 'content' not in self.data:
+            raise NoContentError("No content found.")
+        return self._schedule(self.data['content'])
+
+class ImportJobHandler(BaseHandler):
+    """
+    Handler for the state of the background imports.
+    """
+
+    allowed_methods = ('GET', )
+
+    def read(self, request, project_slug, resource_slug, job_id,
+             api_version=2):
+        """
+        Return the status and the progress of an import job.
+        """
+        try:
+            job = ImportJob.objects.select_related(
+                'resource__project', 'language'
+            ).get(
+                pk=job_id, resource__slug=resource_slug,
+                resource__project__slug=project_slug
+            )
+        except ImportJob.DoesNotExist:
+            return rc.NOT_FOUND
+        if not permission_snapshot(request).private(job.resource.project):
+            return rc.FORBIDDEN
+        return job.to_dict()
+
+
 class FormatsHandler(BaseHandler):
     """
     Formats Handler for READ operation.
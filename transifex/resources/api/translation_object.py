@@ -16,12 +16,13 @@ from transifex.txcommon.log import logger
 from transifex.projects.permissions import *
 from transifex.languages.models import Language
 from transifex.projects.models import Project
-from transifex.projects.permissions.project import ProjectPermission
+from transifex.projects.permissions.project import permission_snapshot
 from transifex.resources.decorators import method_decorator
 from transifex.resources.models import Resource, SourceEntity, Translation
 from transifex.resources.formats.utils.hash_tag import hash_tag
 from transifex.teams.models import Team
-from transifex.resources.handlers import invalidate_stats_cache
+from transifex.resources.handlers import invalidate_stats_cache, \
+        coalesce_invalidations
 from transifex.api.utils import BAD_REQUEST, FORBIDDEN_REQUEST,\
         NOT_FOUND_REQUEST
 from .exceptions import BadRequestError, NoContentError, NotFoundError, \
@@ -474,7 +475,7 @@ class BaseTranslationHandler(BaseHandler):
 
         Args:
             project: A Project instance
-            check: A ProjectPermission instance for request_user
+            check: A ProjectPermissionSnapshot instance for request_user
             request_user: A User instance, request.user
             author_name: A string, username for translation author
             is_maintainer: A boolean, True if user is a maintainer
@@ -490,13 +491,15 @@ class BaseTranslationHandler(BaseHandler):
             user = request_user
         return user
 
-    def _get_user_perms(self, user, project, resource, language,
+    def _get_user_perms(self, user, check, project, resource, language,
             team, checksum, is_maintainer):
         """
         Get permissions for a user.
 
         Args:
             user: A User instance
+            check: A ProjectPermissionSnapshot instance for the user issuing
+                the request
             project: A Project instance
             resource: A Resource instance
             language: A Language instance
@@ -506,7 +509,7 @@ class BaseTranslationHandler(BaseHandler):
         Returns:
             A dictionary containing various user permissions
         """
-        check = ProjectPermission(user)
+        check = check.for_user(user)
         can_review = check.proofread(project, language)
         can_submit_translations = check.submit_translations(
                 team or resource.project)
@@ -533,7 +536,7 @@ class BaseTranslationHandler(BaseHandler):
             resource: A Resource instance
             language: A Language instance
             team: A Team instance
-            check: A ProjectPermission instance for user
+            check: A ProjectPermissionSnapshot instance for request_user
             request_user: A User instance issuing this request
             se_ids: A list containing all the SourceEntity ids whose
                 translations have been updated.
@@ -554,7 +557,7 @@ class BaseTranslationHandler(BaseHandler):
                 check, request_user, translation.get('user'),
                 is_maintainer)
         # Get user permissions for the project
-        user_perms = self._get_user_perms(user, project, resource,
+        user_perms = self._get_user_perms(user, check, project, resource,
                 language, team, checksum, is_maintainer)
         # Check if user is allowed to updated the translation. This also takes
         # into account if a user is allowed to review a translation or modify
@@ -639,6 +642,7 @@ class SingleTranslationHandler(BaseTranslationHandler):
             pr_project_private_perm,
             (Project, 'slug__exact', 'project_slug')
     ))
+    @coalesce_invalidations
     def update(self, request, project_slug, resource_slug,
             language_code, source_hash, api_version=2):
         """
@@ -660,7 +664,7 @@ class SingleTranslationHandler(BaseTranslationHandler):
             data = request.data
             # This is a hack to use the methods from TranslationObjectsHandler
             data['source_entity_hash'] = source_hash
-            check = ProjectPermission(request.user)
+            check = permission_snapshot(request)
             is_maintainer = check.maintain(project)
             # Allow only project members to issue this update request
             if not is_maintainer and  not (check.submit_translations(
@@ -681,6 +685,8 @@ class SingleTranslationHandler(BaseTranslationHandler):
                     se_ids, updated_translations, trans_obj_dict)
             # Updated translations are saved to db
             self._update_translations(updated_translations)
+            if updated_translations:
+                invalidate_stats_cache(resource, language, user=request.user)
 
             translations = Translation.objects.filter(
                     source_entity=source_entity, language=language)
@@ -738,6 +744,7 @@ class TranslationObjectsHandler(BaseTranslationHandler):
             pr_project_private_perm,
             (Project, 'slug__exact', 'project_slug')
     ))
+    @coalesce_invalidations
     def update(self, request, project_slug, resource_slug,
             language_code, api_version=2):
         """
@@ -754,7 +761,7 @@ class TranslationObjectsHandler(BaseTranslationHandler):
             self._validate_translations_json_data(translations)
             team = Team.objects.get_or_none(project, language.code)
 
-            check = ProjectPermission(request.user)
+            check = permission_snapshot(request)
             # User must be a member of the project
             is_maintainer = check.maintain(project)
             # Allow only project members to issue this update request
@@ -777,6 +784,8 @@ class TranslationObjectsHandler(BaseTranslationHandler):
                         se_ids, updated_translations, trans_obj_dict)
 
             self._update_translations(updated_translations)
+            if updated_translations:
+                invalidate_stats_cache(resource, language, user=request.user)
 
             keys = ['key', 'context', 'translation',
                     'reviewed', 'pluralized', 'wordcount',
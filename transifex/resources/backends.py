@@ -6,15 +6,22 @@ Various backend commands for resource models.
 These are used by views and the API.
 """
 
+import os
+import tempfile
 from itertools import ifilter
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.hashcompat import md5_constructor
 from django.utils.translation import ugettext as _
 from django.db import IntegrityError, DatabaseError
 from transifex.txcommon.log import logger
-from transifex.resources.models import Resource
+from transifex.resources.models import Resource, ImportJob
+from transifex.resources.utils import resource_revision
 from transifex.resources.formats.exceptions import FormatError
 from transifex.resources.formats.registry import registry
 from transifex.resources.formats.compilation import Mode
 from transifex.resources.formats.utils.decorators import need_language
+from transifex.resources.tasks import run_import_job
 
 
 class BackendError(Exception):
@@ -36,7 +43,8 @@ class ResourceBackend(object):
     """
 
     def create(self, project, slug, name, method, source_language,
-               content, user=None, extra_data={}):
+               content, user=None, extra_data={}, in_background=False,
+               callback=None):
         """Create a new resource.
 
         Any extra arguments will be passed to the Resource initialization
@@ -53,9 +61,13 @@ class ResourceBackend(object):
             content: The content of the resource's source file.
             user: The user that creates the resource.
             extra_data: Any extra info for the Resource constructor.
+            in_background: If True, the source file is imported by an
+                ImportJob.
+            callback: The callback URL of the ImportJob.
         Returns:
             A two-elements tuple. The first element is the number of added
-            strings and the second the number of updated strings.
+            strings and the second the number of updated strings. If the
+            file is imported in the background, the ImportJob instead.
         """
         # save resource
         try:
@@ -91,6 +103,11 @@ class ResourceBackend(object):
                 "The content type of the request is not valid."
             ))
         try:
+            if in_background:
+                return fb.schedule_import(
+                    content, is_source=True,
+                    filename=extra_data.get('filename'), callback=callback
+                )
             return fb.import_source(
                 content, filename=extra_data.get('filename')
             )
@@ -116,6 +133,8 @@ class FormatsBackend(object):
         self.resource = resource
         self.language = language
         self.user = user
+        # The ValidationReport of the last imported translation file
+        self.validation_report = None
 
     def import_source(self, content, filename=None):
         """Parse some content which is of a particular i18n type and save
@@ -142,11 +161,16 @@ class FormatsBackend(object):
         return self._import_content(handler, content, True)
 
     @need_language
-    def import_translation(self, content):
+    def import_translation(self, content, validation=None):
         """Parse a translation file for a resource.
 
+        The report of the validation of the translations, if any, is kept
+        in ``validation_report``.
+
         Args:
             content: The content to parse.
+            validation: The validation mode of the translations (see
+                ``Handler.save2db``).
         Returns:
             A two element tuple(pair). The first element is the number of
             strings added and the second one is the number of those upadted.
@@ -156,7 +180,96 @@ class FormatsBackend(object):
             msg = "Files of type %s are not supported."
             logger.error(msg % self.resource.i18n_method)
             raise FormatsBackendError(msg % self.resource.i18n_method)
-        return self._import_content(handler, content, False)
+        return self._import_content(handler, content, False, validation)
+
+    def schedule_import(self, content, is_source=False, filename=None,
+                        validation=None, callback=None):
+        """Store a source or translation file and import it in the
+        background.
+
+        A worker parses the file and saves it to the database, in batches
+        if the format supports streaming (see ``run_import``).
+
+        Args:
+            content: The content to import, either as a string or as an
+                uploaded file.
+            is_source: A flag to indicate a source or a translation file.
+            filename: The filename of the uploaded content (if any).
+            validation: The validation mode of the translations.
+            callback: A URL to POST the result of the import to.
+        Returns:
+            The ImportJob of the import.
+        """
+        if self.language is None:
+            msg = _("No language specified, when importing a file.")
+            logger.error(msg)
+            raise FormatsBackendError(msg)
+        handler = self._get_handler(
+            self.resource, self.language, filename=filename
+        )
+        if handler is None:
+            msg = "Files of type %s are not supported."
+            logger.error(msg % self.resource.i18n_method)
+            raise FormatsBackendError(msg % self.resource.i18n_method)
+        if isinstance(content, unicode):
+            try:
+                content = content.encode(handler.format_encoding)
+            except UnicodeEncodeError, e:
+                raise FormatsBackendError(unicode(e))
+        suffix = ''
+        if filename is not None:
+            suffix = os.path.splitext(filename)[1]
+        path = store_upload(content, suffix=suffix)
+        job = ImportJob.objects.create(
+            resource=self.resource, language=self.language, user=self.user,
+            is_source=is_source, filename=filename or '', path=path,
+            validation=validation, callback=callback or None
+        )
+        run_import_job.delay(job.id)
+        return job
+
+    def run_import(self, job):
+        """Import the file of an ImportJob.
+
+        The number of strings saved so far is published through
+        ``ImportJob.set_progress`` after each batch.
+
+        Args:
+            job: The ImportJob.
+        Returns:
+            A three element tuple with the number of strings added, updated
+            and deleted.
+        """
+        handler = self._get_handler(
+            self.resource, self.language, filename=job.filename or None
+        )
+        if handler is None:
+            msg = "Files of type %s are not supported."
+            logger.error(msg % self.resource.i18n_method)
+            raise FormatsBackendError(msg % self.resource.i18n_method)
+        stream = os.path.getsize(job.path) >= \
+                settings.STREAMING_IMPORT_MIN_SIZE
+        try:
+            handler.bind_resource(self.resource)
+            handler.set_language(self.language)
+            handler.bind_file(job.path, stream=stream)
+            handler.parse_file(is_source=job.is_source)
+            if handler.stream_filename is None:
+                job.strings_total = len(handler.stringset)
+                job.save()
+            handler.progress = job.set_progress
+            added, updated = handler.save2db(
+                is_source=job.is_source, user=self.user,
+                validation=job.validation
+            )
+        except FormatError, e:
+            raise FormatsBackendError(unicode(e))
+        finally:
+            self.validation_report = handler.validation_report
+        deleted = 0
+        if job.is_source and handler.source_changes is not None:
+            deleted = handler.source_changes.strings_deleted
+        return added, updated, deleted
 
     def _get_handler(self, resource, language, filename=None):
         """Get the appropriate hanlder for the resource."""
@@ -164,12 +277,13 @@ class FormatsBackend(object):
             resource, language, filename=filename
         )
 
-    def _import_content(self, handler, content, is_source):
+    def _import_content(self, handler, content, is_source, validation=None):
         """Import content to the database.
 
         Args:
             content: The content to save.
             is_source: A flag to indicate a source or a translation file.
+            validation: The validation mode of the translations.
         Returns:
             A two element tuple(pair). The first element is the number of
             strings added and the second one is the number of those upadted.
@@ -179,11 +293,16 @@ class FormatsBackend(object):
             handler.set_language(self.language)
             handler.bind_content(content)
             handler.parse_file(is_source=is_source)
-            return handler.save2db(is_source=is_source, user=self.user)
+            return handler.save2db(
+                is_source=is_source, user=self.user, validation=validation
+            )
         except FormatError, e:
             raise FormatsBackendError(unicode(e))
+        finally:
+            self.validation_report = handler.validation_report
 
-    def compile_translation(self, pseudo_type=None, mode=None):
+    def compile_translation(self, pseudo_type=None, mode=None,
+                            prefetched=None):
         """Compile the translation for a resource in a specified language.
 
         There is some extra care for PO/POT resources. If there is no
@@ -197,6 +316,8 @@ class FormatsBackend(object):
         Args:
             pseudo_type: The pseudo_type (if any).
             mode: The mode for compiling this translation.
+            prefetched: The PrefetchedStrings of the resource, when the
+                translations of many languages are compiled in a row.
         Returns:
             The compiled template.
         """
@@ -207,9 +328,90 @@ class FormatsBackend(object):
         )
         handler.bind_resource(self.resource)
         handler.set_language(self.language)
-        content = handler.compile(pseudo=pseudo_type, mode=mode)
+        content = handler.compile(
+            pseudo=pseudo_type, mode=mode, prefetched=prefetched
+        )
         return content if isinstance(content, basestring) else ''
 
+    def _compiled_key(self, pseudo_type, mode):
+        """Return the cache key for the ETag of a compiled translation.
+
+        The key includes the revision of the resource, so that it changes,
+        whenever the template or a translation of the resource changes.
+        """
+        if mode is None:
+            mode = Mode.DEFAULT
+        return 'compiled.etag.%s.%s.%s.%s.%s' % (
+            self.resource.id, getattr(self.language, 'code', ''),
+            mode._value, pseudo_type and pseudo_type.__class__.__name__,
+            resource_revision(self.resource.id)
+        )
+
+    def compiled_etag(self, pseudo_type=None, mode=None):
+        """Return the ETag of the compiled translation, if it has been
+        compiled since the resource last changed, else None.
+        """
+        return cache.get(self._compiled_key(pseudo_type, mode))
+
+    def compile_translation_cached(self, pseudo_type=None, mode=None):
+        """Compile the translation, unless it is in the cache of compiled
+        files already.
+
+        The compiled files are stored by the md5 hash of their content,
+        which is also their ETag.
+
+        Args:
+            pseudo_type: The pseudo_type (if any).
+            mode: The mode for compiling this translation.
+        Returns:
+            A tuple with the compiled template and its ETag.
+        """
+        key = self._compiled_key(pseudo_type, mode)
+        etag = cache.get(key)
+        if etag is not None:
+            content = cache.get('compiled.content.%s' % etag)
+            if content is not None:
+                return content, etag
+        content = self.compile_translation(pseudo_type, mode=mode)
+        etag = md5_constructor(content).hexdigest()
+        timeout = settings.COMPILED_CACHE_TIMEOUT
+        cache.set('compiled.content.%s' % etag, content, timeout)
+        cache.set(key, etag, timeout)
+        return content, etag
+
+
+def store_upload(content, suffix=''):
+    """Store the content of an upload in IMPORT_JOBS_DIR.
+
+    Args:
+        content: A string or an uploaded file, which is copied in chunks.
+        suffix: The suffix of the name of the file.
+    Returns:
+        The path of the stored file.
+    """
+    directory = settings.IMPORT_JOBS_DIR
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    f = os.fdopen(fd, 'wb')
+    try:
+        if hasattr(content, 'chunks'):
+            for chunk in content.chunks():
+                f.write(chunk)
+        else:
+            f.write(content)
+    finally:
+        f.close()
+    return path
+
+
+def uploaded_file(files):
+    """Get the first of the uploaded files, or None."""
+    files = files.values()
+    if not files:
+        return None
+    return files[0]
+
 
 def content_from_uploaded_file(files, encoding='UTF-8'):
     """Get the content of an uploaded file.
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+"""
+Export of the translation files of many resources and languages at once.
+
+The translation files are compiled resource by resource. The template and
+the source strings of each resource are loaded once, and the translations
+are fetched for EXPORT_LANGUAGES_PER_QUERY languages at a time (see
+``PrefetchedStrings``). The files are written to a zip archive, which is
+yielded in chunks as it is produced, so that it can be streamed to the
+client or to a file.
+"""
+
+import time
+import zipfile
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.encoding import smart_unicode
+from transifex.txcommon.log import logger
+from transifex.languages.models import Language
+from transifex.resources.backends import FormatsBackend
+from transifex.resources.formats.compilation import PrefetchedStrings, Mode
+from transifex.resources.formats.registry import registry
+
+
+class ZipStream(object):
+    """A write-only file object, which keeps the data written to it until
+    they are popped.
+
+    ``zipfile.ZipFile`` writes an archive without seeking, so it only needs
+    the ``write``, ``tell`` and ``flush`` methods.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(data)
+        self._offset += len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        """Return the data written since the last call."""
+        data, self._chunks = ''.join(self._chunks), []
+        return data
+
+
+def translation_filename(resource, language, mode=None):
+    """Return the name of the file of a translation, as the download views
+    name it.
+    """
+    filename = u"%(proj)s_%(res)s_%(lang)s%(type)s" % {
+        'proj': smart_unicode(resource.project.slug),
+        'res': smart_unicode(resource.slug),
+        'lang': language.code,
+        'type': registry.file_extension_for(resource, language)
+    }
+    if mode is not None:
+        filename = u"%s_%s" % (mode.label, filename)
+    return filename
+
+
+def compile_translations(resource, languages, mode=None):
+    """Compile the translation files of a resource in many languages.
+
+    Args:
+        resource: The resource.
+        languages: The languages of the translations.
+        mode: The mode of the compilation.
+    Returns:
+        An iterator over (language, content) tuples. The languages the
+        compilation of which failed are skipped.
+    """
+    prefetched = PrefetchedStrings(resource)
+    size = settings.EXPORT_LANGUAGES_PER_QUERY
+    for start in xrange(0, len(languages), size):
+        group = languages[start:start + size]
+        prefetched.fetch(group)
+        for language in group:
+            fb = FormatsBackend(resource, language)
+            try:
+                content = fb.compile_translation(
+                    mode=mode, prefetched=prefetched
+                )
+            except Exception, e:
+                logger.error("Error compiling '%s' file for '%s': %s" % (
+                    language, resource, e
+                ), exc_info=True)
+                continue
+            yield language, content
+
+
+def export_archive(resources, languages=None, mode=None):
+    """Export the translation files of some resources as a zip archive.
+
+    Args:
+        resources: The resources to export.
+        languages: The languages to export. If None, the languages each
+            resource has translations in are exported.
+        mode: The mode of the compilation.
+    Returns:
+        An iterator over the chunks of the archive.
+    """
+    stream = ZipStream()
+    archive = zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED)
+    date_time = time.localtime(time.time())[:6]
+    for resource in resources:
+        if languages is None:
+            resource_languages = list(
+                resource.available_languages_without_teams
+            )
+        else:
+            resource_languages = list(languages)
+        for language, content in compile_translations(
+                resource, resource_languages, mode=mode):
+            # Unicode names are stored in UTF-8 and flagged as such.
+            info = zipfile.ZipInfo(
+                translation_filename(resource, language, mode), date_time
+            )
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0644 << 16
+            archive.writestr(info, content)
+            yield stream.pop()
+    archive.close()
+    yield stream.pop()
+
+
+def export_options(data):
+    """Get the languages and the mode of an export from the parameters of a
+    request.
+
+    Args:
+        data: A dictionary with the optional 'languages' parameter, a comma
+            separated list of language codes, and the 'mode' parameter, the
+            name of a Mode (e.g. 'reviewed').
+    Returns:
+        A tuple with the list of languages, or None for all languages, and
+        the mode, or None.
+    Raises:
+        ValueError: A language or the mode is unknown.
+    """
+    languages = None
+    codes = data.get('languages')
+    if codes:
+        codes = set(code.strip() for code in codes.split(',') if code.strip())
+        languages = list(Language.objects.filter(code__in=codes))
+        unknown = codes - set(l.code for l in languages)
+        if unknown:
+            raise ValueError(
+                "Unknown languages: %s" % ', '.join(sorted(unknown))
+            )
+    mode = data.get('mode')
+    if mode is not None:
+        try:
+            mode = getattr(Mode, mode.upper())
+        except AttributeError:
+            raise ValueError("Unknown mode: %s" % mode)
+    return languages, mode
+
+
+def archive_response(chunks, filename):
+    """Return a response that streams the chunks of an archive."""
+    response = HttpResponse(chunks, mimetype='application/zip')
+    response['Content-Disposition'] = 'attachment; filename=%s' % filename
+    return response
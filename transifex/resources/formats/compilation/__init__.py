@@ -9,6 +9,8 @@ a translation file.
 
 from __future__ import absolute_import
 from .compilers import Compiler, PluralCompiler
+from .plans import CompilationPlan
+from .prefetch import PrefetchedStrings
 from .decorators import NormalDecoratorBuilder, PseudoDecoratorBuilder, \
         EmptyDecoratorBuilder
 from .builders import AllTranslationsBuilder, EmptyTranslationsBuilder, \
@@ -24,6 +24,8 @@ class TranslationsBuilder(object):
         self.resource = resource
         self.language = language
         self.pluralized = False
+        # The PrefetchedStrings to use instead of querying the database
+        self.prefetched = None
 
     def __call__(self):
         """Get the translation strings for the resource.
@@ -44,10 +46,48 @@ class TranslationsBuilder(object):
         Args:
             The ids to fetch source strings for.
         """
+        if self.prefetched is not None:
+            return self._select_fields(
+                t for t in self.prefetched.source_translations()
+                if t[0] in ids
+            )
         return Translation.objects.filter(
             source_entity__in=ids, language=self.resource.source_language
         ).values_list(*self._fields).order_by()
 
+    def _get_translations(self, reviewed=False):
+        """Get the translations of the language.
+
+        Args:
+            reviewed: If True, only the reviewed translations are returned.
+        Returns:
+            An iterable over tuples with the values of ``_fields``.
+        """
+        if self.prefetched is not None:
+            return self._select_fields(
+                t for t in self.prefetched.translations(self.language)
+                if t[3] or not reviewed
+            )
+        translations = Translation.objects.filter(
+            resource=self.resource, language=self.language
+        )
+        if reviewed:
+            translations = translations.filter(reviewed=True)
+        return translations.values_list(*self._fields).order_by().iterator()
+
+    def _get_source_entity_ids(self):
+        """Get the set of the ids of the source entities of the resource."""
+        if self.prefetched is not None:
+            return self.prefetched.source_entity_ids
+        return set(SourceEntity.objects.filter(
+                resource=self.resource
+        ).values_list('id', flat=True).order_by())
+
+    def _select_fields(self, translations):
+        """Keep the values of ``_fields`` of prefetched translations."""
+        size = len(self._fields)
+        return [t[:size] for t in translations]
+
     def _single_output(self, iterable):
         """Output of builder for non-pluralized formats."""
         return dict(iterable)
@@ -77,10 +117,7 @@ class AllTranslationsBuilder(TranslationsBuilder):
         """Get the translation strings that match the specified
         source_entities.
         """
-        translations = Translation.objects.filter(
-            resource=self.resource, language=self.language
-        ).values_list(*self._fields).order_by().iterator()
-        return self._output(translations)
+        return self._output(self._get_translations())
 
 
 class EmptyTranslationsBuilder(TranslationsBuilder):
@@ -101,10 +138,7 @@ class ReviewedTranslationsBuilder(TranslationsBuilder):
         """Get the translation strings that match the specified source_entities
         and have been reviewed.
         """
-        translations = Translation.objects.filter(
-            reviewed=True, resource=self.resource, language=self.language
-        ).values_list(*self._fields).order_by().iterator()
-        return self._output(translations)
+        return self._output(self._get_translations(reviewed=True))
 
 
 class SourceTranslationsBuilder(TranslationsBuilder):
@@ -115,12 +149,8 @@ class SourceTranslationsBuilder(TranslationsBuilder):
         source entities. Use the source strings for the missing
         ones.
         """
-        translations = Translation.objects.filter(
-            resource=self.resource, language=self.language
-        ).values_list(*self._fields).order_by()
-        source_entities = set(SourceEntity.objects.filter(
-                resource=self.resource
-        ).values_list('id', flat=True).order_by())
+        translations = list(self._get_translations())
+        source_entities = self._get_source_entity_ids()
         missing_ids = source_entities - set(map(lambda x: x[0], translations))
         if not missing_ids:
             iterable = translations
@@ -140,12 +170,8 @@ class ReviewedSourceTranslationsBuilder(TranslationsBuilder):
         source entities. Use the source strings for the missing
         ones.
         """
-        translations = Translation.objects.filter(
-            reviewed=True, resource=self.resource, language=self.language
-        ).values_list(*self._fields).order_by()
-        source_entities = set(SourceEntity.objects.filter(
-                resource=self.resource
-        ).values_list('id', flat=True).order_by())
+        translations = list(self._get_translations(reviewed=True))
+        source_entities = self._get_source_entity_ids()
         missing_ids = source_entities - set(map(lambda x: x[0], translations))
         if not missing_ids:
             iterable = translations
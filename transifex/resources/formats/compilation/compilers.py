@@ -11,6 +11,7 @@ import re
 from transifex.resources.models import SourceEntity
 from ..exceptions import UninitializedCompilerError
 from ..utils.hash_tag import hash_regex, pluralized_hash_regex
+from .plans import get_plan
 
 
 class Compiler(object):
@@ -26,6 +27,10 @@ class Compiler(object):
     http://en.wikipedia.org/wiki/Builder_pattern.
     """
 
+    # Whether the compiler applies the translations to the template with
+    # its compilation plan (see ``_cached_plan``).
+    uses_plans = True
+
     def __init__(self, resource, **kwargs):
         """Set the variables of the object.
 
@@ -38,11 +43,14 @@ class Compiler(object):
             resource: The resource which the compilation is for.
         """
         self.resource = resource
+        # The PrefetchedStrings to use instead of querying the database
+        self.prefetched = None
         for arg, value in kwargs.items():
             setattr(self, arg, value)
         self._initialized = False
         self._translations = None
         self._tdecorator = None
+        self._template = None
 
     def _set_tset(self, t):
         self._tset = t
@@ -73,13 +81,30 @@ class Compiler(object):
         if self._tset is None or self._tdecorator is None:
             msg = "One of the builders has not been set."
             raise UninitializedCompilerError(msg)
-        self._pre_compile(template)
-        content = self._examine_content(template)
-        self._compile(content)
-        self._post_compile()
+        self._template = template
+        try:
+            self._pre_compile(template)
+            content = self._examine_content(template)
+            self._compile(content)
+            self._post_compile()
+        finally:
+            self._template = None
         del self.language
         return self.compiled_template
 
+    def _cached_plan(self, text):
+        """Return the cached compilation plan for the text, if the text is
+        the unmodified template of the resource.
+
+        Text that has been modified during the compilation has no plan.
+        """
+        if self.uses_plans and self._template is not None and \
+                text is self._template:
+            if self.prefetched is not None:
+                return self.prefetched.plan(text)
+            return get_plan(self.resource, text)
+        return None
+
     def _apply_translations(self, translations, text):
         """Apply the translations to the text.
 
@@ -89,6 +114,9 @@ class Compiler(object):
         Returns:
             The text with the translations applied.
         """
+        plan = self._cached_plan(text)
+        if plan is not None:
+            return plan.render(translations)
         regex = hash_regex()
         return regex.sub(
             lambda m: translations.get(m.group(0), m.group(0)), text
@@ -121,6 +149,8 @@ class Compiler(object):
 
     def _get_source_strings(self):
         """Return the source strings of the resource."""
+        if self.prefetched is not None:
+            return self.prefetched.source_entities
         return SourceEntity.objects.filter(
             resource=self.resource
         ).values_list(
@@ -141,7 +171,14 @@ class Compiler(object):
 
 
 class PluralCompiler(Compiler):
-    """Compiler that handles plurals, too."""
+    """Compiler that handles plurals, too.
+
+    The translations are applied to the output of ``_update_plural_hashes``,
+    which depends on the translations and the headers of the file besides
+    the template, so there is no compilation plan to reuse.
+    """
+
+    uses_plans = False
 
     def _apply_translations(self, translations, text):
         """Apply the translations to the text.
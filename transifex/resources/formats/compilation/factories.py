@@ -20,19 +20,24 @@ class CompilerFactory(object):
     This should be used as a mixin.
     """
 
-    def construct_compiler(self, language, pseudo_type, mode):
+    def construct_compiler(self, language, pseudo_type, mode,
+                           prefetched=None):
         """Construct a compiler.
 
         Args:
             language: The language to use.
             pseudo_type: The pseudo_type to use.
             mode: The mode of the compilation.
+            prefetched: The PrefetchedStrings of the resource, if the
+                strings have been fetched already.
         Returns:
             A suitable compiler.
         """
         tdec = self._get_translation_decorator(pseudo_type)
         tset = self._get_translation_setter(language, mode)
+        tset.prefetched = prefetched
         compiler = self._get_compiler(mode)
+        compiler.prefetched = prefetched
         compiler.translation_decorator = tdec
         compiler.translation_set = tset
         return compiler
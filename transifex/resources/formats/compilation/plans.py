@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compilation plans.
+
+A compilation plan is a template split at the hash placeholders of its
+strings. The plan of a template is calculated once, when the template is
+saved, and cached per resource and template revision, so that compiling
+a translation file is a join of the segments of the plan and the
+translations, instead of a regular expression substitution over the whole
+template.
+"""
+
+from __future__ import absolute_import
+from django.core.cache import cache
+from django.utils.hashcompat import md5_constructor
+from ..utils.hash_tag import pluralized_hash_regex
+
+
+# How long a plan is kept in the cache, in seconds.
+PLAN_TIMEOUT = 24 * 60 * 60
+
+
+class CompilationPlan(object):
+    """A template split into literal text and hash placeholders.
+
+    The segments alternate between literal text and placeholders, so the
+    placeholders are the segments at the odd positions.
+    """
+
+    def __init__(self, segments):
+        self.segments = segments
+
+    @classmethod
+    def from_content(cls, content):
+        """Construct the plan of a template.
+
+        The regular expression used matches the placeholders of both the
+        singular and the plural strings, so the same plan can be used by
+        all compilers.
+
+        Args:
+            content: The template as a unicode string.
+        Returns:
+            A CompilationPlan object.
+        """
+        segments = []
+        offset = 0
+        for m in pluralized_hash_regex().finditer(content):
+            segments.append(content[offset:m.start()])
+            segments.append(m.group(0))
+            offset = m.end()
+        segments.append(content[offset:])
+        return cls(segments)
+
+    def render(self, translations):
+        """Replace the placeholders with the translations.
+
+        Placeholders that have no translation are left intact, like
+        ``Compiler._apply_translations`` does.
+
+        Args:
+            translations: A dictionary from placeholders to translations.
+        Returns:
+            The compiled template as a unicode string.
+        """
+        parts = self.segments[:]
+        for index in xrange(1, len(parts), 2):
+            parts[index] = translations.get(parts[index], parts[index])
+        return u''.join(parts)
+
+
+def template_revision(content):
+    """Return the revision of a template, which is the md5 hash of its
+    content.
+    """
+    return md5_constructor(content.encode('utf-8')).hexdigest()
+
+
+def _plan_key(resource, content):
+    return 'compilation_plan.%s.%s' % (resource.id, template_revision(content))
+
+
+def store_plan(resource, content):
+    """Calculate the plan of the template of a resource and cache it.
+
+    Args:
+        resource: The resource the template belongs to.
+        content: The template as a unicode string.
+    Returns:
+        The CompilationPlan object.
+    """
+    plan = CompilationPlan.from_content(content)
+    cache.set(_plan_key(resource, content), plan.segments, PLAN_TIMEOUT)
+    return plan
+
+
+def get_plan(resource, content):
+    """Return the plan of the template of a resource.
+
+    The plan is fetched from the cache, if the template has not changed
+    since it was calculated. Otherwise, it is calculated and stored.
+
+    Args:
+        resource: The resource the template belongs to.
+        content: The template as a unicode string.
+    Returns:
+        The CompilationPlan object.
+    """
+    segments = cache.get(_plan_key(resource, content))
+    if segments is None:
+        return store_plan(resource, content)
+    return CompilationPlan(segments)
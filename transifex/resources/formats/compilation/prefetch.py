@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+"""
+Strings shared by the compilations of many languages.
+
+Compiling the translation files of a resource in many languages, one at a
+time, loads the template and the source strings of the resource again for
+each language and fetches the translations of each language with a query
+of its own. A PrefetchedStrings object holds what the compilations share
+instead, and fetches the translations of a group of languages at once.
+"""
+
+from __future__ import absolute_import
+from transifex.resources.models import SourceEntity, Translation, Template
+from .plans import get_plan
+
+
+class PrefetchedStrings(object):
+    """The template and the strings of a resource, fetched once for the
+    compilation of the translation files of many languages.
+
+    The translations are fetched with ``fetch`` for a group of languages at
+    a time and are kept until the next group is fetched, so that only the
+    translations of one group are in memory. Those of the source language
+    are kept for the whole export, since the builders that fill missing
+    translations use them for every language.
+
+    Attributes:
+        source_entities: The (id, string_hash, pluralized) tuples of the
+            source entities, as ``Compiler._get_source_strings`` returns
+            them.
+        source_entity_ids: The set of the ids of the source entities.
+    """
+
+    def __init__(self, resource):
+        self.resource = resource
+        self.source_entities = list(SourceEntity.objects.filter(
+            resource=resource
+        ).values_list('id', 'string_hash', 'pluralized').order_by())
+        self.source_entity_ids = set(se[0] for se in self.source_entities)
+        self._template = None
+        self._contents = {}
+        self._plan = None
+        self._source = None
+        self._translations = {}
+
+    def content(self, encoding):
+        """Return the template of the resource decoded with the specified
+        encoding.
+
+        The same unicode object is returned for all languages, so that the
+        compilation plan of the template is looked up once (see ``plan``).
+        """
+        if self._template is None:
+            self._template = Template.objects.get(
+                resource=self.resource
+            ).content
+        if encoding not in self._contents:
+            self._contents[encoding] = self._template.decode(encoding)
+        return self._contents[encoding]
+
+    def plan(self, content):
+        """Return the compilation plan of the template."""
+        if self._plan is None or self._plan[0] is not content:
+            self._plan = (content, get_plan(self.resource, content))
+        return self._plan[1]
+
+    def _query(self, languages):
+        return Translation.objects.filter(
+            resource=self.resource, language__in=languages
+        ).values_list(
+            'language', 'source_entity', 'string', 'rule', 'reviewed'
+        ).order_by().iterator()
+
+    def fetch(self, languages):
+        """Fetch the translations of a group of languages with one query.
+
+        The translations of the previous group are dropped.
+        """
+        ids = [l.id for l in languages]
+        self._translations = dict((id_, []) for id_ in ids)
+        for row in self._query(ids):
+            self._translations[row[0]].append(row[1:])
+        source_id = self.resource.source_language_id
+        if self._source is None and source_id in self._translations:
+            self._source = self._translations[source_id]
+
+    def translations(self, language):
+        """Return the translations of a language, as (source entity id,
+        string, rule, reviewed) tuples.
+
+        The translations of a language outside the fetched group are
+        fetched on their own.
+        """
+        if language.id == self.resource.source_language_id:
+            return self.source_translations()
+        if language.id not in self._translations:
+            self.fetch([language])
+        return self._translations[language.id]
+
+    def source_translations(self):
+        """Return the translations in the source language, as (source
+        entity id, string, rule, reviewed) tuples.
+        """
+        if self._source is None:
+            self._source = [
+                row[1:] for row in
+                self._query([self.resource.source_language_id])
+            ]
+        return self._source
@@ -3,6 +3,7 @@
 from __future__ import absolute_import
 import codecs, copy, os, re
 import gc
+import itertools
 from django.utils import simplejson as json
 from django.conf import settings
 from django.db import transaction
@@ -11,21 +12,29 @@ from django.utils.datastructures import SortedDict
 from django.utils.translation import ugettext as _
 from transifex.txcommon.log import logger
 from transifex.languages.models import Language
-from transifex.projects.permissions.project import ProjectPermission
+from transifex.projects.permissions.project import \
+        ProjectPermissionSnapshot
 from suggestions.models import Suggestion
 from suggestions.formats import ContentSuggestionFormat
 from transifex.actionlog.models import action_logging
 from transifex.resources.handlers import invalidate_stats_cache
 from transifex.resources.formats.exceptions import FormatError, ParseError, \
         CompileError
+from .compilation.plans import store_plan
 from .compilation import Compiler, NormalDecoratorBuilder, \
         PseudoDecoratorBuilder, AllTranslationsBuilder, \
         SourceTranslationsBuilder, ReviewedTranslationsBuilder, Mode
 from transifex.resources.formats.pseudo import PseudoTypeMixin
 from transifex.resources.formats.utils.decorators import *
 from transifex.resources.signals import post_save_translation
+from transifex.resources.formats.validators import ValidatorPipeline, \
+        ValidationReport, ValidationError
 from transifex.resources.formats.resource_collections import StringSet, \
-        GenericTranslation, SourceEntityCollection, TranslationCollection
+        StreamingStringSet, GenericTranslation, SourceEntityCollection, \
+        TranslationCollection
+from transifex.resources.formats.diff import SourceEntityDiff
+from transifex.resources.stats import StatsDelta
+from transifex.resources.utils import bump_resource_revision
 from transifex.teams.models import Team
 from transifex.resources.tasks import send_notices_for_formats
 
@@ -101,6 +110,8 @@ class Handler(object):
         self.filename = filename
         # The content of the translation file
         self.content = self._get_content(filename=filename, content=content)
+        # The file to parse incrementally, if the content is streamed
+        self.stream_filename = None
         self.stringset = None # Stringset to extract entries from files
 
         self.resource = None # Associated resource
@@ -117,6 +128,17 @@ class Handler(object):
 
         self.key_dict = {}
 
+        # The SourceChangeReport of the last import of a source file
+        self.source_changes = None
+        # The changes to the statistics of the resource by the last import
+        self.stats_delta = None
+        # The ValidationReport of the last import of a translation file
+        self.validation_report = None
+        self._validator = None
+        # A function called with the number of entries saved so far, after
+        # each batch of an import
+        self.progress = None
+
         # Hold warning messages from the parser in a sorted dict way to avoid
         # duplicated messages and keep them in the order they were added.
         self.warning_messages = SortedDict()
@@ -149,6 +171,10 @@ class Handler(object):
             errors.
         """
         if content is None:
+            if self.stream_filename is not None:
+                # A streamed file is checked by the parser, while it is
+                # being read.
+                return (True, None)
             content = self.content
         return self._check_content(content)
 
@@ -229,12 +255,25 @@ class Handler(object):
     def bind_content(self, content):
         """Bind some content to the handler."""
         self.content = self._get_content(content=content)
+        self.stream_filename = None
+
+    def bind_file(self, filename, stream=False):
+        """Bind a file to an initialized POHandler.
 
-    def bind_file(self, filename):
-        """Bind a file to an initialized POHandler."""
+        Args:
+            filename: The name of the file.
+            stream: If True and the handler supports it, the file is not
+                read in memory; it is parsed incrementally instead, while
+                its entries are saved to the database.
+        """
         if os.path.isfile(filename):
             self.filename = filename
-            self.content = self._get_content(filename=filename)
+            if stream and self.supports_streaming:
+                self.content = None
+                self.stream_filename = filename
+            else:
+                self.content = self._get_content(filename=filename)
+                self.stream_filename = None
         else:
             msg = _("Specified file %s does not exist." % filename)
             logger.error(msg)
@@ -296,7 +335,8 @@ class Handler(object):
         self.suggestions.add(GenericTranslation(*args, **kwargs))
 
     @need_resource
-    def compile(self, language=None, pseudo=None, mode=Mode.DEFAULT):
+    def compile(self, language=None, pseudo=None, mode=Mode.DEFAULT,
+                prefetched=None):
         """Compile the translation for the specified language.
 
         The actual output of the compilation depends on the arguments.
@@ -305,13 +345,20 @@ class Handler(object):
             language: The language of the translation.
             pseudo: The pseudo type to use (if any).
             mode: The mode of the translation.
+            prefetched: The PrefetchedStrings of the resource, when many
+                languages are compiled in a row.
         Returns:
             The compiled template in the correct encoding.
         """
         if language is None:
             language = self.language
-        content = self._content_from_template(self.resource)
-        compiler = self.construct_compiler(language, pseudo, mode)
+        if prefetched is None:
+            content = self._content_from_template(self.resource)
+        else:
+            content = prefetched.content(self.default_encoding)
+        compiler = self.construct_compiler(
+            language, pseudo, mode, prefetched=prefetched
+        )
         try:
             return compiler.compile(
                 content, language
@@ -446,82 +493,65 @@ class Handler(object):
                 should be overrided.
 
         Returns:
-            A tuple of number of strings added, updted and deleted.
+            A tuple of number of strings added, updted and deleted. The
+            full SourceChangeReport is kept in ``self.source_changes``.
 
         Raises:
             Any exception.
         """
-        qs = SourceEntity.objects.filter(resource=self.resource).iterator()
-        original_sources = list(qs) # TODO Use set() instead? Hash by pk
-        updated_entities = set([])
-        new_entities = []
-        source_entities = self._init_source_entity_collection(original_sources)
-        translations = self._init_translation_collection(source_entities.se_ids)
-
-        strings_added = 0
-        strings_updated = 0
-        strings_deleted = 0
+        diff = SourceEntityDiff(
+            self.resource,
+            SourceEntity.objects.filter(resource=self.resource).iterator(),
+            self._context_value
+        )
+        report = diff.report
+        delta = self.stats_delta = StatsDelta(self.resource)
         try:
-            for j in self.stringset:
-                if j in source_entities:
-                    se = source_entities.get(j)
-                    if se in new_entities:
+            for batch in self._stringset_batches():
+                first_added = len(report.added)
+                pairs = diff.match(batch)
+                added = report.added[first_added:]
+                SourceEntity.objects.bulk_insert(added)
+                diff.resolve_added(added)
+                translations = self._init_translation_collection(
+                    set(se.id for j, se in pairs)
+                )
+                new_translations = []
+                updated_translations = set([])
+                wordcount_changes = {}
+                for j, se in pairs:
+                    if self._should_skip_translation(se, j):
                         continue
-                    # update source string attributes.
-                    se.flags = j.flags or ""
-                    se.pluralized = j.pluralized
-                    se.developer_comment = j.comment or ""
-                    se.occurrences = j.occurrences
-                    se.order = j.order
-                    # se.save()
-                    updated_entities.add(se)
-                else:
-                    # Create the new SE
-                    se = SourceEntity(
-                        string = j.source_entity,
-                        context = self._context_value(j.context),
-                        resource = self.resource, pluralized = j.pluralized,
-                        position = 1,
-                        # FIXME: this has been tested with pofiles only
-                        flags = j.flags or "",
-                        developer_comment = j.comment or "",
-                        occurrences = j.occurrences,
-                        order = j.order
-                    )
-                    # Add it to list with new entities
-                    new_entities.append(se)
-                    source_entities.add(se)
-
-            SourceEntity.objects.bulk_insert(new_entities)
-            SourceEntity.objects.bulk_update(updated_entities)
-            qs = SourceEntity.objects.filter(resource=self.resource).iterator()
-            new_sources = list(qs) # TODO Use set() instead? Hash by pk
-            source_entities = self._init_source_entity_collection(new_sources)
-            new_translations = []
-            updated_translations = set([])
-            for j in self.stringset:
-                se = source_entities.get(j)
-                if self._should_skip_translation(se, j):
-                    continue
-                if (se, j) in translations:
-                    tr = translations.get((se, j))
-                    if overwrite_translations and tr.string != j.translation:
-                        tr.string = j.translation
-                        tr.user = user
-                        updated_translations.add(tr)
-                        strings_updated += 1
-                else:
-                    tr = Translation(
-                        source_entity=se, language=self.language, rule=j.rule,
-                        string=j.translation, user=user,
-                        resource = self.resource
-                    )
-                    new_translations.append(tr)
-                    # translations.add(tr)
-                    if j.rule==5:
-                        strings_added += 1
-            Translation.objects.bulk_insert(new_translations)
-            Translation.objects.bulk_update(updated_translations)
+                    if (se, j) in translations:
+                        tr = translations.get((se, j))
+                        if overwrite_translations and tr.string != j.translation:
+                            wordcount_changes[se.id] = wordcount_changes.get(
+                                se.id, 0
+                            ) + len(j.translation.split(None)) - tr.wordcount
+                            tr.string = j.translation
+                            tr.user = user
+                            updated_translations.add(tr)
+                            report.strings_updated += 1
+                    else:
+                        tr = Translation(
+                            source_entity=se, language=self.language,
+                            rule=j.rule, string=j.translation, user=user,
+                            resource = self.resource
+                        )
+                        new_translations.append(tr)
+                        wordcount_changes[se.id] = wordcount_changes.get(
+                            se.id, 0
+                        ) + len(j.translation.split(None))
+                        if j.rule==5:
+                            report.strings_added += 1
+                            delta.add(self.language.id, translated=1)
+                Translation.objects.bulk_insert(new_translations)
+                Translation.objects.bulk_update(updated_translations)
+                delta.change_source_wordcounts(wordcount_changes)
+                del batch, pairs, added, translations
+                del new_translations, updated_translations, wordcount_changes
+            diff.finish()
+            SourceEntity.objects.bulk_update(report.changed)
         except Exception, e:
             msg = "Error importing the entries into the database: %s"
             logger.error(msg % e)
@@ -529,21 +559,100 @@ class Handler(object):
 
         sg_handler = self.SuggestionFormat(self.resource, self.language, user)
         sg_handler.add_from_strings(self.suggestions)
-        new_entities = SourceEntity.objects.exclude(
-            pk__in=[s.pk for s in original_sources]
-        ).filter(
-            resource=self.resource
-        ).iterator()
-        untouched_ses = set(original_sources) - updated_entities
-        sg_handler.create_suggestions(untouched_ses, list(new_entities))
-        for se in untouched_ses:
-            se.delete()
+        sg_handler.create_suggestions(report.removed, report.added)
+        removed_ids = [se.id for se in report.removed]
+        delta.total += len(report.added)
+        delta.remove_entities(removed_ids)
+        SourceEntity.objects.bulk_delete(removed_ids)
+        if isinstance(self.stringset, StreamingStringSet):
+            self.template = self._generate_template(
+                self._template_from_chunks(self.stringset.template)
+            )
         self._update_template(self.template)
 
-        strings_deleted = len(untouched_ses)
-        del new_entities, original_sources, updated_entities, untouched_ses
-        del new_sources
-        return strings_added, strings_updated, strings_deleted
+        self.source_changes = report
+        del removed_ids
+        return (
+            report.strings_added, report.strings_updated,
+            report.strings_deleted
+        )
+
+    def _init_validation(self, validation):
+        """Set up the validation of the translations of an import.
+
+        Args:
+            validation: The validation mode, either 'flag' or 'reject'. If
+                None, the IMPORT_VALIDATION setting is used. A false value
+                or 'off' disables the validation.
+        """
+        if validation is None:
+            validation = getattr(settings, 'IMPORT_VALIDATION', None)
+        if not validation or validation == 'off':
+            self.validation_report = self._validator = None
+            return
+        try:
+            self.validation_report = ValidationReport(validation)
+        except ValueError, e:
+            raise FormatError(unicode(e))
+        self._validator = ValidatorPipeline(
+            self.resource.i18n_method, self.resource.source_language,
+            self.language
+        )
+
+    def _init_source_strings(self, se_ids):
+        """Return the source strings of a batch of source entities to
+        validate the translations against, if validation is enabled.
+
+        Returns:
+            A dictionary from (source entity id, rule) tuples to the source
+            strings.
+        """
+        if self._validator is None:
+            return {}
+        return dict(
+            ((se_id, rule), string) for se_id, rule, string in
+            Translation.objects.filter(
+                source_entity__in=se_ids,
+                language=self.resource.source_language
+            ).values_list('source_entity_id', 'rule', 'string').iterator()
+        )
+
+    def _validate_translation(self, se, trans, source_strings):
+        """Validate a translation against its source string.
+
+        Failures are recorded in the validation report.
+
+        Args:
+            se: The source entity of the translation.
+            trans: The GenericTranslation object of the translation.
+            source_strings: The dictionary ``_init_source_strings``
+                returned for the batch.
+        Returns:
+            False, if the translation must not be saved.
+        """
+        if self._validator is None:
+            return True
+        # Target languages may have more plural forms than the source one.
+        rule = trans.rule
+        if (se.id, rule) not in source_strings:
+            rule = 5
+        source = source_strings.get((se.id, rule))
+        if source is None:
+            return True
+        report = self.validation_report
+        report.checked += 1
+        try:
+            warnings = self._validator.validate(
+                source, trans.translation, trans.rule, key=(se.id, rule)
+            )
+        except ValidationError, e:
+            report.add(
+                'error', se.string, se.context, trans.rule, unicode(e)
+            )
+            return report.mode != 'reject'
+        for message in warnings:
+            report.add('warning', se.string, se.context, trans.rule, message)
+        return True
 
     def _save_translation(self, user, overwrite_translations):
         """Save other language translations to the database.
@@ -565,62 +674,86 @@ class Handler(object):
         Raises:
             Any exception.
         """
-        qs = SourceEntity.objects.filter(resource=self.resource).iterator()
-        source_entities = self._init_source_entity_collection(qs)
-        translations = self._init_translation_collection(source_entities.se_ids)
-        new_translations = []
-        updated_translations = set([])
-
         strings_added = 0
         strings_updated = 0
         strings_deleted = 0
+        self.stats_delta = StatsDelta(self.resource)
+        # FIXME: This check shouldn't be needed but save2db is called with
+        # user=None all over the place, so do this for now to avoid
+        # breaking everything.
+        check = None
+        if user:
+            check = ProjectPermissionSnapshot(user)
         try:
-            for j in self.stringset:
-                if j not in source_entities:
-                    continue
-                else:
-                    se = source_entities.get(j)
-
-                if self._should_skip_translation(se, j):
-                    continue
-                if (se, j) in translations:
-                    tr = translations.get((se, j))
-
-                    # We also check if the user submitting the translation
-                    # has reviewing privileges. Regular users shouldn't be
-                    # able to modify a reviewed string.
-
-                    # FIXME: This check shouldn't be needed but save2db is
-                    # called with user=None all over the place, so do this
-                    # for now to avoid breaking everything.
-                    if user:
-                        check = ProjectPermission(user)
-                        review_perm = check.proofread(self.resource.project,
-                            self.language)
-                        if overwrite_translations and tr.string != j.translation:
-                            if tr.reviewed:
-                                if not review_perm:
+            for batch in self._stringset_batches():
+                source_entities = self._init_source_entity_collection(
+                    self._source_entities_of(batch)
+                )
+                translations = self._init_translation_collection(
+                    source_entities.se_ids
+                )
+                source_strings = self._init_source_strings(
+                    source_entities.se_ids
+                )
+                new_translations = []
+                updated_translations = set([])
+                for j in batch:
+                    if j not in source_entities:
+                        continue
+                    else:
+                        se = source_entities.get(j)
+
+                    if self._should_skip_translation(se, j):
+                        continue
+                    if (se, j) in translations:
+                        tr = translations.get((se, j))
+
+                        # We also check if the user submitting the translation
+                        # has reviewing privileges. Regular users shouldn't be
+                        # able to modify a reviewed string.
+                        if check is not None:
+                            if overwrite_translations and tr.string != j.translation:
+                                if tr.reviewed:
+                                    if not check.proofread(
+                                            self.resource.project,
+                                            self.language):
+                                        continue
+                                if not self._validate_translation(
+                                        se, j, source_strings):
                                     continue
-                            tr.string = j.translation
-                            tr.user = user
-                            updated_translations.add(tr)
-                            strings_updated += 1
+                                tr.string = j.translation
+                                tr.user = user
+                                updated_translations.add(tr)
+                                strings_updated += 1
+                        else:
+                            if overwrite_translations and \
+                                    tr.string != j.translation and \
+                                    self._validate_translation(
+                                        se, j, source_strings):
+                                tr.string = j.translation
+                                tr.user = user
+                                updated_translations.add(tr)
+                                strings_updated += 1
                     else:
-                        if overwrite_translations and tr.string != j.translation:
-                            tr.string = j.translation
-                            tr.user = user
-                            updated_translations.add(tr)
-                            strings_updated += 1
-                else:
-                    tr = Translation(
-                        source_entity=se, language=self.language, rule=j.rule,
-                        string=j.translation, user=user, resource=self.resource
-                    )
-                    new_translations.append(tr)
-                    if j.rule==5:
-                        strings_added += 1
-            Translation.objects.bulk_insert(new_translations)
-            Translation.objects.bulk_update(updated_translations)
+                        if not self._validate_translation(
+                                se, j, source_strings):
+                            continue
+                        tr = Translation(
+                            source_entity=se, language=self.language,
+                            rule=j.rule, string=j.translation, user=user,
+                            resource=self.resource
+                        )
+                        new_translations.append(tr)
+                        if j.rule==5:
+                            strings_added += 1
+                Translation.objects.bulk_insert(new_translations)
+                Translation.objects.bulk_update(updated_translations)
+                self.stats_delta.add_translated(self.language.id, [
+                    tr.source_entity.id for tr in new_translations
+                    if tr.rule == 5
+                ])
+                del batch, source_entities, translations
+                del new_translations, updated_translations
         except Exception, e:
             logger.error(
                 "There was a problem while importing the entries into the "
@@ -631,15 +764,76 @@ class Handler(object):
             raise
         sg_handler = self.SuggestionFormat(self.resource, self.language, user)
         sg_handler.add_from_strings(self.suggestions)
-        del new_translations, updated_translations, source_entities, translations
         return strings_added, strings_updated, strings_deleted
 
+    def _stringset_batches(self):
+        """Return the stringset in batches.
+
+        A stringset that has been parsed in memory is a single batch. A
+        streamed one is read in batches of ``STREAMING_BATCH_SIZE`` entries,
+        so that only one batch is in memory at a time.
+        """
+        if not isinstance(self.stringset, StreamingStringSet):
+            batches = [self.stringset]
+        else:
+            batches = self._iter_batches(
+                self.stringset, settings.STREAMING_BATCH_SIZE
+            )
+        if self.progress is None:
+            return batches
+        return self._report_progress(batches)
+
+    def _report_progress(self, batches):
+        """Call ``progress`` with the number of entries saved so far, after
+        each batch.
+        """
+        processed = 0
+        for batch in batches:
+            yield batch
+            # The batch has been saved, when the next one is asked for.
+            processed += len(batch)
+            self.progress(processed)
+
+    def _iter_batches(self, items, size):
+        """Iterate over the items in lists of ``size`` items."""
+        items = iter(items)
+        while True:
+            batch = list(itertools.islice(items, size))
+            if not batch:
+                return
+            yield batch
+
+    def _source_entities_of(self, batch):
+        """Return the source entities the entries of a batch may be
+        translations of.
+
+        For a stringset in memory, these are all source entities of the
+        resource. For a batch of a streamed stringset, only the source
+        entities with the same hash as an entry are fetched.
+        """
+        if batch is self.stringset:
+            return SourceEntity.objects.filter(
+                resource=self.resource
+            ).iterator()
+        hashes = set()
+        for j in batch:
+            se = SourceEntity(
+                string=j.source_entity, context=self._context_value(j.context)
+            )
+            se.presave()
+            hashes.add(se.string_hash)
+        return SourceEntity.objects.filter(
+            resource=self.resource, string_hash__in=hashes
+        ).iterator()
+
     def _update_stats_of_resource(self, resource, language, user):
         """Update the statistics for the resource.
 
         Also, invalidate any caches.
         """
-        invalidate_stats_cache(resource, language, user=user)
+        invalidate_stats_cache(
+            resource, language, user=user, delta=self.stats_delta
+        )
 
     def _update_template(self, content):
         """Update the template of the resource.
@@ -650,15 +844,29 @@ class Handler(object):
         t, created = Template.objects.get_or_create(resource=self.resource)
         t.content = content
         t.save()
+        if not self.CompilerClass.uses_plans:
+            return
+        if isinstance(content, str):
+            content = content.decode(self.default_encoding)
+        store_plan(self.resource, content)
 
     @need_resource
     @need_language
     @need_stringset
     @transaction.commit_manually
-    def save2db(self, is_source=False, user=None, overwrite_translations=True):
+    def save2db(self, is_source=False, user=None, overwrite_translations=True,
+                validation=None):
         """
         Saves parsed file contents to the database. duh
+
+        The translations of a translation file are validated, if a
+        ``validation`` mode or the IMPORT_VALIDATION setting is given. The
+        results are kept in ``validation_report``.
         """
+        if is_source:
+            self.validation_report = self._validator = None
+        else:
+            self._init_validation(validation)
         self._pre_save2db(is_source, user, overwrite_translations)
         try:
             if is_source:
@@ -669,6 +877,16 @@ class Handler(object):
                 (added, updated, deleted) = self._save_translation(
                     user, overwrite_translations
                 )
+        except FormatError, e:
+            # A streamed file is parsed while it is saved, so its parse
+            # errors are raised here and the import must fail.
+            logger.error(
+                "Error when parsing file for resource %s: %s" % (
+                    self.resource, e
+                ), exc_info=True
+            )
+            transaction.rollback()
+            raise
         except Exception, e:
             logger.warning(
                 "Failed to save translations for language %s and resource %s."
@@ -678,6 +896,8 @@ class Handler(object):
             transaction.rollback()
             return (0, 0)
         finally:
+            if isinstance(self.stringset, StreamingStringSet):
+                self.stringset.close()
             gc.collect()
         try:
             self._post_save2db(
@@ -693,6 +913,10 @@ class Handler(object):
         finally:
             gc.collect()
         transaction.commit()
+        if added + updated + deleted > 0:
+            # The revision was changed before the commit, so a compiled
+            # file may have been cached from the old strings meanwhile.
+            bump_resource_revision(self.resource.id)
         return (added, updated)
 
     ####################
@@ -714,6 +938,76 @@ class Handler(object):
         for line in content.split(self.linesep):
             yield line
 
+    def _iter_stream_by_line(self, stream):
+        """Iterate a file opened in binary mode by line.
+
+        Like ``_iter_by_line``, the lines are unicode strings without the
+        line separator, which is found from the first line. If the file
+        ends with a line separator, an empty line is yielded last.
+        """
+        line = None
+        for line in stream:
+            if line.endswith('\r\n'):
+                if self.linesep is None:
+                    self.linesep = '\r\n'
+                raw = line[:-2]
+            elif line.endswith('\n'):
+                if self.linesep is None:
+                    self.linesep = '\n'
+                raw = line[:-1]
+            else:
+                if self.linesep is None:
+                    self.linesep = '\n'
+                raw = line
+            try:
+                yield raw.decode(self.format_encoding)
+            except UnicodeDecodeError, e:
+                raise FormatError(unicode(e))
+        if line is None or line.endswith('\n'):
+            yield u''
+
+    def _iter_joined_lines(self, lines):
+        """Iterate the lines prefixed with the line separator of the
+        previous one, so that they can be joined back to the content.
+        """
+        sep = u''
+        for line in lines:
+            yield sep + line
+            sep = self.linesep
+
+    @property
+    def supports_streaming(self):
+        """Whether the handler can parse a file incrementally."""
+        return self.__class__._iter_parse.im_func is not \
+                Handler._iter_parse.im_func
+
+    def _iter_parse(self, lines, is_source, lang_rules):
+        """Parse a file incrementally.
+
+        Formats that can be parsed line by line override this to support
+        streaming.
+
+        Args:
+            lines: An iterator over the lines of the file, as returned by
+                ``_iter_stream_by_line``.
+            is_source: Flag to determine if this is a source file or not.
+            lang_rules: rules for the language
+        Returns:
+            An iterator over the GenericTranslation objects of the file and
+            the chunks of the template, in the order they appear in the
+            file.
+        """
+        raise NotImplementedError
+
+    def _template_from_chunks(self, template):
+        """Return the object the template is generated from, when the
+        file is streamed.
+
+        Args:
+            template: The chunks of the template joined in a unicode string.
+        """
+        return template
+
     def _parse(self, is_source, lang_rules):
         """The actual functions that parses the content.
 
@@ -735,10 +1029,46 @@ class Handler(object):
         """
         raise NotImplementedError
 
-    @need_content
     @need_language
     def parse_file(self, is_source=False, lang_rules=None):
-        """Parse the content."""
+        """Parse the content.
+
+        If a file has been bound for streaming, the stringset is read
+        from it later, while it is saved to the database.
+        """
+        if self.stream_filename is not None:
+            return self._parse_stream(is_source, lang_rules)
+        return self._parse_content(is_source, lang_rules)
+
+    def _parse_stream(self, is_source, lang_rules):
+        """Set up the incremental parsing of the bound file."""
+        self.suggestions = StringSet()
+        self.linesep = None
+        stream = open(self.stream_filename, 'rb')
+        self.stringset = StreamingStringSet(
+            self._iter_parse(
+                self._iter_stream_by_line(stream), is_source, lang_rules
+            ), stream
+        )
+        try:
+            has_strings = bool(self.stringset)
+        except self.HandlerParseError, e:
+            self.stringset.close()
+            msg = "Error when parsing file for resource %s: %s"
+            logger.error(msg % (self.resource, e), exc_info=True)
+            raise
+        if self.resource and not has_strings:
+            msg = _("We're not able to extract any string from the file "
+                    "uploaded for language %(language)s in resource "
+                    "%(resource)s." % {'language': self.language,
+                    'resource': self.resource})
+            logger.error("Error during parsing for resource %s -> %s" % (
+                self.resource, msg), exc_info=True)
+            raise self.HandlerParseError(msg)
+
+    @need_content
+    def _parse_content(self, is_source, lang_rules):
+        """Parse the content in memory."""
         self.stringset = StringSet()
         self.suggestions = StringSet()
         self.is_content_valid()
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+"""
+Diffing of the source entities of a resource against a parsed source file.
+
+The engine is keyed on the ``string_hash`` of the source entities, which
+is unique within a resource, so that the added, changed and removed
+entities can be found in a single pass over the stringset.
+"""
+
+from transifex.resources.models import SourceEntity
+
+
+class SourceChangeReport(object):
+    """The changes a source file import makes to the entities of a resource.
+
+    Attributes:
+        added: A list of the new SourceEntity objects.
+        changed: A list of the existing SourceEntity objects, the attributes
+            of which have been changed.
+        unchanged: A list of the existing SourceEntity objects which are
+            still in the source file, but have not been changed.
+        removed: A list of the SourceEntity objects which are not in the
+            source file anymore.
+        strings_added: The number of source strings added.
+        strings_updated: The number of source strings updated.
+    """
+
+    def __init__(self):
+        self.added = []
+        self.changed = []
+        self.unchanged = []
+        self.removed = []
+        self.strings_added = 0
+        self.strings_updated = 0
+
+    @property
+    def strings_deleted(self):
+        """The number of source strings deleted."""
+        return len(self.removed)
+
+    @property
+    def kept(self):
+        """The existing entities that are still part of the resource."""
+        return self.changed + self.unchanged
+
+    def as_dict(self):
+        """Return a summary of the report, suitable for serialization."""
+        return {
+            'strings_added': self.strings_added,
+            'strings_updated': self.strings_updated,
+            'strings_deleted': self.strings_deleted,
+            'entities_added': len(self.added),
+            'entities_changed': len(self.changed),
+            'entities_removed': len(self.removed),
+        }
+
+
+class SourceEntityDiff(object):
+    """Compute the differences between the stored source entities of a
+    resource and the entries of a stringset.
+    """
+
+    # The attributes of a source entity a source file can change.
+    attributes = (
+        'flags', 'pluralized', 'developer_comment', 'occurrences', 'order',
+    )
+
+    def __init__(self, resource, source_entities, context_value):
+        """Initializer.
+
+        Args:
+            resource: The resource the source entities belong to.
+            source_entities: An iterable of the stored source entities
+                of the resource.
+            context_value: A function that converts the context of a
+                parsed entry to the value stored in the database.
+        """
+        self.resource = resource
+        self._context_value = context_value
+        self._existing = {}
+        for se in source_entities:
+            self._existing[se.string_hash] = se
+        self._entities = {}
+        self._changed = set()
+        self.report = SourceChangeReport()
+
+    def _candidate(self, entry):
+        """Construct the source entity that corresponds to a parsed entry.
+
+        Args:
+            entry: A GenericTranslation object.
+        Returns:
+            An unsaved SourceEntity object with its ``string_hash`` set.
+        """
+        se = SourceEntity(
+            string=entry.source_entity,
+            context=self._context_value(entry.context),
+            resource=self.resource, pluralized=entry.pluralized,
+            position=1,
+            flags=entry.flags or "",
+            developer_comment=entry.comment or "",
+            occurrences=entry.occurrences,
+            order=entry.order
+        )
+        se.presave()
+        return se
+
+    def _update_attributes(self, se, candidate):
+        """Copy the attributes of the candidate to the existing entity.
+
+        Returns:
+            True, if any of the attributes have been changed.
+        """
+        changed = False
+        for attr in self.attributes:
+            value = getattr(candidate, attr)
+            if getattr(se, attr) != value:
+                setattr(se, attr, value)
+                changed = True
+        return changed
+
+    def compare(self, stringset):
+        """Compare the stringset to the stored source entities.
+
+        The entities of the resource are updated in place, but nothing is
+        saved to the database.
+
+        Args:
+            stringset: An iterable of GenericTranslation objects.
+        Returns:
+            A list of (entry, source entity) pairs, one for each entry in
+            the stringset.
+        """
+        pairs = self.match(stringset)
+        self.finish()
+        return pairs
+
+    def match(self, entries):
+        """Match some entries of the stringset to source entities.
+
+        This can be called many times, with consecutive batches of the
+        stringset. Entities that are new are appended to the ``added``
+        list of the report, as they are found.
+
+        Args:
+            entries: An iterable of GenericTranslation objects.
+        Returns:
+            A list of (entry, source entity) pairs, one for each entry.
+        """
+        pairs = []
+        for entry in entries:
+            candidate = self._candidate(entry)
+            key = candidate.string_hash
+            se = self._entities.get(key)
+            if se is None:
+                # The first entry of a (pluralized) string defines the
+                # attributes of the source entity.
+                se = self._existing.get(key)
+                if se is None:
+                    se = candidate
+                    self.report.added.append(se)
+                elif self._update_attributes(se, candidate):
+                    self._changed.add(key)
+                self._entities[key] = se
+            pairs.append((entry, se))
+        return pairs
+
+    def finish(self):
+        """Find the changed, unchanged and removed entities, after all
+        entries of the stringset have been matched.
+        """
+        report = self.report
+        for key, se in self._existing.iteritems():
+            if key not in self._entities:
+                report.removed.append(se)
+            elif key in self._changed:
+                report.changed.append(se)
+            else:
+                report.unchanged.append(se)
+
+    def resolve_added(self, entities=None, chunk_size=500):
+        """Set the primary keys of the added entities, after they have been
+        inserted to the database.
+
+        Only the new entities are fetched, instead of all entities of the
+        resource.
+
+        Args:
+            entities: The added entities to resolve. Defaults to all of
+                them.
+        """
+        if entities is None:
+            entities = self.report.added
+        added = dict((se.string_hash, se) for se in entities)
+        hashes = added.keys()
+        for offset in xrange(0, len(hashes), chunk_size):
+            qs = SourceEntity.objects.filter(
+                resource=self.resource,
+                string_hash__in=hashes[offset:offset + chunk_size]
+            ).values_list('string_hash', 'id')
+            for string_hash, se_id in qs.iterator():
+                added[string_hash].id = se_id
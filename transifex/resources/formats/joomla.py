@@ -100,15 +100,32 @@ class JoomlaINIHandler(MarkedSourceCompilerFactory, Handler):
         """
         content = self.content
         self._find_linesep(content)
-        comment = ""
+        buf = []
+        for item in self._iter_parse(
+                self._iter_by_line(content), is_source, lang_rules):
+            if isinstance(item, basestring):
+                buf.append(item)
+            else:
+                self.stringset.add(item)
+        return u''.join(buf)
+
+    def _iter_parse(self, lines, is_source, lang_rules):
+        """
+        Parse the lines of an INI file incrementally.
 
-        buf = ''
+        Each line of the template is yielded prefixed with the line
+        separator of the previous one, so that the template does not end
+        with a line separator.
+        """
+        comment = ""
+        sep = ""
         initialized = False
-        for line in self._iter_by_line(content):
+        for line in lines:
             # Skip empty lines and comments
             if not line or line.startswith(self.comment_chars):
                 if is_source:
-                    buf += line + self.linesep
+                    yield sep + line
+                    sep = self.linesep
                     if line.startswith(self.comment_chars):
                         comment = line[1:] + self.linesep
                     else:
@@ -138,7 +155,8 @@ class JoomlaINIHandler(MarkedSourceCompilerFactory, Handler):
 
             if is_source:
                 if not trans.strip():
-                    buf += line + self.linesep
+                    yield sep + line
+                    sep = self.linesep
                     continue
                 source_len = len(source)
                 new_line = line[:source_len] + re.sub(
@@ -146,18 +164,18 @@ class JoomlaINIHandler(MarkedSourceCompilerFactory, Handler):
                     "%(hash)s_tr" % {'hash': hash_tag(source, context)},
                     line[source_len:]
                 )
-                buf += new_line + self.linesep
+                yield sep + new_line
+                sep = self.linesep
             elif not SourceEntity.objects.filter(resource=self.resource, string=source).exists()\
                     or not escaped_trans.strip():
                 #ignore keys with no translation
                 context=""
                 continue
-            self.stringset.add(GenericTranslation(
+            yield GenericTranslation(
                     source, self._unescape(escaped_trans),
                     context=context, comment=comment
-            ))
+            )
             comment = ""
-        return buf[:buf.rfind(self.linesep)]
 
 
 class JoomlaIniVersion(object):
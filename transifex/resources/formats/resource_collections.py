@@ -2,6 +2,7 @@
 """A series of classes that hold collections of the resources' app objects."""
 
 from django.utils import simplejson as json
+from django.utils.hashcompat import md5_constructor
 from transifex.resources.models import SourceEntity, Translation
 from transifex.resources.formats.utils.hash_tag import hash_tag
 from transifex.txcommon.log import logger
@@ -42,6 +43,79 @@ class StringSet(object):
         return json.dumps(self, cls=CustomSerializer)
 
 
+class StreamingStringSet(object):
+    """A stringset that is read from a parser incrementally.
+
+    The parser is a generator, which yields GenericTranslation objects
+    and the chunks of the template (as unicode strings) in the order they
+    appear in the file. The stringset can only be iterated over once; the
+    chunks of the template are collected while iterating.
+
+    Like StringSet, duplicates are ignored. Only a digest of each entry is
+    kept to find them, not the entry itself.
+    """
+
+    def __init__(self, items, stream=None):
+        """Initializer.
+
+        Args:
+            items: The iterable the parser returned.
+            stream: The file the parser reads from, if any. It is closed,
+                when the iteration is over.
+        """
+        self._items = iter(items)
+        self._stream = stream
+        self._seen = set()
+        self._order = 0
+        self._peeked = None
+        self._chunks = []
+        self.target_language = None
+
+    def _next(self):
+        """Return the next translation of the parser, or None at the end."""
+        for item in self._items:
+            if isinstance(item, basestring):
+                self._chunks.append(item)
+                continue
+            key = md5_constructor(repr(
+                (item.source_entity, item.context, item.rule)
+            )).digest()
+            if key in self._seen:
+                continue
+            self._seen.add(key)
+            item.order = self._order
+            self._order += 1
+            return item
+        self.close()
+        return None
+
+    def __nonzero__(self):
+        if self._peeked is None:
+            self._peeked = self._next()
+        return self._peeked is not None
+
+    def __iter__(self):
+        if self._peeked is not None:
+            item, self._peeked = self._peeked, None
+            yield item
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            yield item
+
+    def close(self):
+        """Close the stream of the parser."""
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    @property
+    def template(self):
+        """The template of the file, available after the iteration."""
+        return u''.join(self._chunks)
+
+
 class GenericTranslation(object):
     """Store translations of any kind of I18N type (POT, Qt, etc...).
 
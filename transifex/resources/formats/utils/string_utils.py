@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+from bisect import bisect_left
+from collections import defaultdict
 from Levenshtein import distance
 
 def percent_diff(a, b):
@@ -10,6 +12,103 @@ def percent_diff(a, b):
         else: return 100
 
 
+def _trigrams(s):
+    """Return the trigrams of a string with their number of occurrences.
+
+    The string is padded, so that a string of length n has n + 2
+    trigrams.
+    """
+    s = u'\0\0%s\0\0' % s
+    grams = defaultdict(int)
+    for i in xrange(len(s) - 2):
+        grams[s[i:i + 3]] += 1
+    return grams
+
+
+class SimilarityIndex(object):
+    """An index to find the strings similar to a given one.
+
+    Two strings are similar, if their ``percent_diff`` is less than
+    ``max_diff``. Instead of comparing a string with every indexed one,
+    the candidates are found with an inverted index of trigrams: each edit
+    changes at most three trigrams of a string, so two strings within an
+    edit distance k share at least max(n1, n2) - 3k trigrams, where n1
+    and n2 are their numbers of trigrams. Their lengths cannot differ by
+    more than k either. Only the candidates that pass both filters are
+    compared with ``percent_diff``.
+    """
+
+    def __init__(self, strings, max_diff):
+        """Index the strings.
+
+        Args:
+            strings: A list of unicode strings.
+            max_diff: The maximum percent_diff of similar strings.
+        """
+        self.strings = strings
+        self.max_diff = max_diff
+        self._postings = defaultdict(list)
+        self._by_length = defaultdict(list)
+        for i, s in enumerate(strings):
+            self._by_length[len(s)].append(i)
+            for gram, count in _trigrams(s).iteritems():
+                self._postings[gram].append((i, count))
+        self._lengths = sorted(self._by_length)
+
+    def _max_distance(self, length):
+        """Return an upper bound of the edit distance of similar strings,
+        the longest of which has the specified length.
+        """
+        return int(self.max_diff * length / 100.0)
+
+    def candidates(self, s):
+        """Return the indices of the strings which may be similar to s,
+        in ascending order.
+        """
+        shared = defaultdict(int)
+        for gram, count in _trigrams(s).iteritems():
+            for i, c in self._postings.get(gram, ()):
+                shared[i] += min(count, c)
+        result = []
+        start = bisect_left(
+            self._lengths, len(s) - self._max_distance(len(s))
+        )
+        for length in self._lengths[start:]:
+            longest = max(len(s), length)
+            k = self._max_distance(longest)
+            if length - len(s) > k:
+                break
+            required = longest + 2 - 3 * k
+            if required <= 0:
+                result.extend(self._by_length[length])
+            else:
+                result.extend(
+                    i for i in self._by_length[length]
+                    if shared.get(i, 0) >= required
+                )
+        result.sort()
+        return result
+
+    def find(self, s, limit=None):
+        """Find the first of the strings that is similar to s.
+
+        Args:
+            s: The string to look for.
+            limit: The maximum number of comparisons to make.
+        Returns:
+            A tuple with the index of the string (or None) and the number of
+            comparisons made.
+        """
+        compared = 0
+        for i in self.candidates(s):
+            if limit is not None and compared >= limit:
+                break
+            compared += 1
+            if percent_diff(s, self.strings[i]) < self.max_diff:
+                return i, compared
+        return None, compared
+
+
 def split_by_newline(text, start=0):
     """Generator to split the text in newlines.
 
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+
+"""
+Incremental parsing of XML files.
+
+The XmlStreamParser reads a document with expat and writes it back out
+in the same serialization as ``xml.dom.minidom``'s ``toxml()``, without
+building a DOM tree for the whole document. Only the elements a handler
+is interested in (e.g. the trans-unit elements of a XLIFF file) are built
+as small minidom subtrees. These are passed to the handler, which may
+modify them, before they are serialized and thrown away.
+"""
+
+import xml.dom.minidom
+import xml.parsers.expat
+
+
+def _escape(data):
+    """Escape character data the way minidom does."""
+    return data.replace("&", "&amp;").replace("<", "&lt;").replace(
+        "\"", "&quot;").replace(">", "&gt;")
+
+
+def local_name(name):
+    """Return the local part of a qualified name."""
+    return name.split(':', 1)[-1]
+
+
+class XmlStreamParser(object):
+    """Event-driven XML parser that builds DOM subtrees on demand.
+
+    The document is fed in chunks of bytes. The elements outside the
+    selected subtrees are streamed to the output as they are parsed; the
+    names of the ones that are currently open are kept in ``path``.
+
+    Args:
+        select: A function called with the name and the attributes of each
+            element that is about to be streamed. If it returns True, the
+            element is built as a minidom subtree instead.
+        handle: A function called with each selected subtree, when it is
+            complete.
+        start: A function called with the name and the attributes of each
+            streamed element, after it has been added to ``path``.
+        end: A function called with the name of each streamed element,
+            before it is removed from ``path``.
+        serialize: If False, no output is produced.
+    """
+
+    def __init__(self, select=None, handle=None, start=None, end=None,
+                 serialize=True):
+        self._select = select
+        self._handle = handle
+        self._start = start
+        self._end = end
+        self.serialize = serialize
+        # Used as the factory of the nodes of the subtrees.
+        self.doc = xml.dom.minidom.Document()
+        self.path = []
+        self.doctype_name = None
+        self._nodes = []
+        self._open_tag = False
+        self._in_cdata = False
+        self._cdata = None
+        self._doctype = None
+        self._subset = None
+        self._output = [u'<?xml version="1.0" ?>']
+
+        p = self._parser = xml.parsers.expat.ParserCreate()
+        p.buffer_text = True
+        p.StartElementHandler = self._start_element
+        p.EndElementHandler = self._end_element
+        p.CharacterDataHandler = self._character_data
+        p.StartCdataSectionHandler = self._start_cdata
+        p.EndCdataSectionHandler = self._end_cdata
+        p.CommentHandler = self._comment
+        p.ProcessingInstructionHandler = self._processing_instruction
+        p.StartDoctypeDeclHandler = self._start_doctype
+        p.EndDoctypeDeclHandler = self._end_doctype
+        p.DefaultHandlerExpand = self._default
+
+    def feed(self, data, final=False):
+        """Parse a chunk of the document."""
+        self._parser.Parse(data, final)
+
+    def close(self):
+        """Finish parsing the document."""
+        self._parser.Parse('', True)
+
+    def pop_output(self):
+        """Return the output produced since the last call."""
+        output, self._output = self._output, []
+        return output
+
+    def _write(self, data):
+        if self.serialize:
+            self._output.append(data)
+
+    def _close_start_tag(self):
+        if self._open_tag:
+            self._write(u'>')
+            self._open_tag = False
+
+    def _start_element(self, name, attrs):
+        if self._nodes:
+            self._append_element(name, attrs)
+            return
+        if self._select is not None and self._select(name, attrs):
+            self._close_start_tag()
+            self._append_element(name, attrs)
+            return
+        self._close_start_tag()
+        parts = [u'<', name]
+        for key in sorted(attrs):
+            parts.extend([u' ', key, u'="', _escape(attrs[key]), u'"'])
+        self._write(u''.join(parts))
+        self._open_tag = True
+        self.path.append(name)
+        if self._start is not None:
+            self._start(name, attrs)
+
+    def _append_element(self, name, attrs):
+        element = self.doc.createElement(name)
+        for key, value in attrs.iteritems():
+            element.setAttribute(key, value)
+        if self._nodes:
+            self._nodes[-1].appendChild(element)
+        self._nodes.append(element)
+
+    def _end_element(self, name):
+        if self._nodes:
+            node = self._nodes.pop()
+            if not self._nodes:
+                if self._handle is not None:
+                    self._handle(node)
+                if self.serialize:
+                    self._write(node.toxml())
+                node.unlink()
+            return
+        if self._end is not None:
+            self._end(name)
+        self.path.pop()
+        if self._open_tag:
+            self._write(u'/>')
+            self._open_tag = False
+        else:
+            self._write(u'</%s>' % name)
+
+    def _character_data(self, data):
+        if self._nodes:
+            parent = self._nodes[-1]
+            if self._in_cdata:
+                if self._cdata is None:
+                    self._cdata = self.doc.createCDATASection(data)
+                    parent.appendChild(self._cdata)
+                else:
+                    self._cdata.data = self._cdata.data + data
+            else:
+                last = parent.lastChild
+                if last is not None and last.nodeType == last.TEXT_NODE:
+                    last.data = last.data + data
+                else:
+                    parent.appendChild(self.doc.createTextNode(data))
+            return
+        if not self.path:
+            return
+        self._close_start_tag()
+        if self._in_cdata:
+            # Empty sections are dropped, like minidom does.
+            if self._cdata is None:
+                self._cdata = True
+                self._write(u'<![CDATA[')
+            self._write(data)
+        else:
+            self._write(_escape(data))
+
+    def _start_cdata(self):
+        self._in_cdata = True
+        self._cdata = None
+
+    def _end_cdata(self):
+        if self._cdata is True:
+            self._write(u']]>')
+        self._in_cdata = False
+        self._cdata = None
+
+    def _comment(self, data):
+        if self._subset is not None:
+            self._subset.append(u'<!--%s-->' % data)
+        elif self._nodes:
+            self._nodes[-1].appendChild(self.doc.createComment(data))
+        else:
+            self._close_start_tag()
+            self._write(u'<!--%s-->' % data)
+
+    def _processing_instruction(self, target, data):
+        if self._subset is not None:
+            self._subset.append(u'<?%s %s?>' % (target, data))
+        elif self._nodes:
+            self._nodes[-1].appendChild(
+                self.doc.createProcessingInstruction(target, data)
+            )
+        else:
+            self._close_start_tag()
+            self._write(u'<?%s %s?>' % (target, data))
+
+    def _start_doctype(self, name, system_id, public_id, has_internal_subset):
+        self.doctype_name = name
+        parts = [u'<!DOCTYPE ', name]
+        if public_id:
+            parts.append(u"  PUBLIC '%s'  '%s'" % (public_id, system_id))
+        elif system_id:
+            parts.append(u"  SYSTEM '%s'" % system_id)
+        self._doctype = parts
+        self._subset = [] if has_internal_subset else None
+
+    def _end_doctype(self):
+        if self._subset is not None:
+            self._doctype.extend([u' [', u''.join(self._subset), u']'])
+        self._doctype.append(u'>')
+        self._write(u''.join(self._doctype))
+        self._doctype = self._subset = None
+
+    def _default(self, data):
+        # Only the markup of the internal subset of the doctype is kept.
+        if self._subset is not None:
+            self._subset.append(data)
+
+
+def iter_stream(parser, chunks, encoding, found):
+    """Feed a file to a parser incrementally.
+
+    After each chunk, the output of the parser and the items the handler
+    has appended to ``found`` so far are yielded, in the format the
+    ``Handler._iter_parse`` methods use.
+
+    Args:
+        parser: The XmlStreamParser object.
+        chunks: An iterator over the content of the file, as unicode
+            strings.
+        encoding: The encoding of the bytes the parser is fed with.
+        found: The list the handler appends the GenericTranslation objects
+            to.
+    """
+    for chunk in chunks:
+        parser.feed(chunk.encode(encoding))
+        for item in _drain(parser, found):
+            yield item
+    parser.close()
+    for item in _drain(parser, found):
+        yield item
+
+
+def _drain(parser, found):
+    for chunk in parser.pop_output():
+        yield chunk
+    items = found[:]
+    del found[:]
+    for item in items:
+        yield item
@@ -10,10 +10,105 @@ from django.utils.translation import ugettext as _
 from transifex.txcommon import import_to_python
 
 
+printf_re = re.compile(
+    '%((?:(?P<ord>\d+)\$|\((?P<key>\w+)\))?(?P<fullvar>[+#-]*(?:\d+)?'\
+        '(?:\.\d+)?(hh\|h\|l\|ll)?(?P<type>[\w%])))'
+)
+
+
 class ValidationError(Exception):
     pass
 
 
+class _feature(object):
+    """Decorator for a feature of a string, that is extracted on first
+    access and then stored as an instance attribute.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = instance.__dict__[self.func.__name__] = self.func(instance)
+        return value
+
+
+class StringFeatures(object):
+    """The features of a string that the validators check.
+
+    Each feature is extracted the first time a validator asks for it and
+    is kept for the rest, so that a string is unescaped and scanned by each
+    regular expression once, no matter how many validators check it.
+    """
+
+    bracket_chars = '[{()}]'
+    urls_re = re.compile('http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|'
+                         '(?:%[0-9a-fA-F][0-9a-fA-F]))+'
+    )
+    emails_re = re.compile("([\w\-\.+]+@[\w\w\-]+\.+[\w\-]+)")
+    numbers_re = re.compile("[-+]?[0-9]*\.?[0-9]+")
+
+    def __init__(self, string):
+        self.string = string
+
+    def __nonzero__(self):
+        return bool(self.string)
+
+    @_feature
+    def unescaped(self):
+        return unescape(self.string)
+
+    @_feature
+    def brackets(self):
+        """A dictionary with the number of each bracket character."""
+        unescaped = self.unescaped
+        return dict([(c, unescaped.count(c)) for c in self.bracket_chars])
+
+    @_feature
+    def urls(self):
+        return self.urls_re.findall(self.unescaped)
+
+    @_feature
+    def emails(self):
+        return self.emails_re.findall(self.unescaped)
+
+    @_feature
+    def numbers(self):
+        return self.numbers_re.findall(self.unescaped)
+
+    @_feature
+    def printf(self):
+        """The (expression, key, conversion specifier) tuples of the printf
+        format specifiers of the unescaped string.
+        """
+        return [
+            (m.group(0), m.group('key'), m.group('type'))
+            for m in printf_re.finditer(self.unescaped)
+        ]
+
+    @_feature
+    def raw_printf(self):
+        """The printf format specifiers of the string as is."""
+        if self.unescaped == self.string:
+            return self.printf
+        return [
+            (m.group(0), m.group('key'), m.group('type'))
+            for m in printf_re.finditer(self.string)
+        ]
+
+
+def string_features(string):
+    """Return the StringFeatures object of a string, unless it is one
+    already.
+    """
+    if isinstance(string, StringFeatures):
+        return string
+    return StringFeatures(string)
+
+
 class BaseValidator(object):
     """Base class for validators.
 
@@ -31,14 +126,29 @@ class BaseValidator(object):
         No checks are needed for deleted translations
 
         Args:
-            old: The old translation.
-            new: The new translation.
+            old: The old translation, as a string or a StringFeatures object.
+            new: The new translation, as a string or a StringFeatures object.
         Raises:
             A ValidationError with an appropriate message.
         """
         if not new or not self.precondition():
             return
-        self.validate(old, new)
+        self.check(string_features(old), string_features(new))
+
+    def check(self, old, new):
+        """Validate the features of the `new` translation against the ones
+        of the `old` one.
+
+        The built-in validators override this method. By default, it calls
+        ``validate`` with the strings.
+
+        Args:
+            old: The StringFeatures object of the old translation.
+            new: The StringFeatures object of the new translation.
+        Raises:
+            A ValidationError with an appropriate message.
+        """
+        self.validate(old.string, new.string)
 
     def precondition(self):
         """Check whether this validator is applicable to the situation."""
@@ -47,7 +157,7 @@ class BaseValidator(object):
     def validate(self, old, new):
         """Actual validation method.
 
-        Subclasses must override this method.
+        Subclasses must override either this method or ``check``.
 
         Args:
             old: The old translation.
@@ -72,9 +182,8 @@ class PluralOnlyValidator(BaseValidator):
 class SpaceValidator(BaseValidator):
     """Validator that checks if the translation is just spaces."""
 
-    def validate(self, old, new):
-        new = unescape(new)
-        if len(new.strip()) == 0:
+    def check(self, old, new):
+        if len(new.unescaped.strip()) == 0:
             raise ValidationError(
                 _("Translation string only contains whitespaces.")
             )
@@ -84,13 +193,11 @@ class MatchingBracketsValidator(BaseValidator):
     """Validator that checks if the number of brackets match between
     the two translations.
     """
-    bracket_chars = '[{()}]'
+    bracket_chars = StringFeatures.bracket_chars
 
-    def validate(self, old, new):
-        old = unescape(old)
-        new = unescape(new)
+    def check(self, old, new):
         for c in self.bracket_chars:
-            if new.count(c) != old.count(c):
+            if new.brackets[c] != old.brackets[c]:
                 raise ValidationError(
                     _("Translation string doesn't contain the same "
                       "number of '%s' as the source string." % c)
@@ -102,15 +209,11 @@ class UrlsValidator(BaseValidator):
     translation.
     """
 
-    urls = re.compile('http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|'
-                      '(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-    )
+    urls = StringFeatures.urls_re
 
-    def validate(self, old, new):
-        old = unescape(old)
-        new = unescape(new)
-        for url in self.urls.findall(old):
-            if url not in new:
+    def check(self, old, new):
+        for url in old.urls:
+            if url not in new.unescaped:
                 raise ValidationError(
                     _("The following url is either missing from the"
                       " translation or has been translated: '%s'." % url)
@@ -122,13 +225,11 @@ class EmailAddressesValidator(BaseValidator):
     the translation.
     """
 
-    emails = re.compile("([\w\-\.+]+@[\w\w\-]+\.+[\w\-]+)")
+    emails = StringFeatures.emails_re
 
-    def validate(self, old, new):
-        old = unescape(old)
-        new = unescape(new)
-        for email in self.emails.findall(old):
-            if email not in new:
+    def check(self, old, new):
+        for email in old.emails:
+            if email not in new.unescaped:
                 raise ValidationError(
                     _("The following email is either missing from the"
                       " translation or has been translated: '%s'." % email)
@@ -140,10 +241,9 @@ class NewLineAtBeginningValidator(BaseValidator):
     has been preserved.
     """
 
-    def validate(self, old, new):
-        old = unescape(old)
-        old_has_newline = old[0] == '\n'
-        new_has_newline = new[0] == '\n'
+    def check(self, old, new):
+        old_has_newline = old.unescaped[0] == '\n'
+        new_has_newline = new.string[0] == '\n'
         if old_has_newline != new_has_newline:
             if old_has_newline:
                 msg = _("Translation must start with a newline (\\n)")
@@ -157,11 +257,9 @@ class NewLineAtEndValidator(BaseValidator):
     preserved.
     """
 
-    def validate(self, old, new):
-        old = unescape(old)
-        new = unescape(new)
-        old_has_newline = old[-1] == '\n'
-        new_has_newline = new[-1] == '\n'
+    def check(self, old, new):
+        old_has_newline = old.unescaped[-1] == '\n'
+        new_has_newline = new.unescaped[-1] == '\n'
         if old_has_newline != new_has_newline:
             if old_has_newline:
                 msg = _("Translation must end with a newline (\\n)")
@@ -175,15 +273,13 @@ class NumbersValidator(BaseValidator):
     translation.
     """
 
-    numbers = re.compile("[-+]?[0-9]*\.?[0-9]+")
+    numbers = StringFeatures.numbers_re
 
-    def validate(self, old, new):
-        old = unescape(old)
-        new = unescape(new)
-        for num in self.numbers.findall(old):
-            if num not in new:
+    def check(self, old, new):
+        for num in old.numbers:
+            if num not in new.unescaped:
                 num = num.replace('.', ',', 1)
-                if num not in new:
+                if num not in new.unescaped:
                     raise ValidationError(
                         _("Number %s is in the source string but not "
                           "in the translation." % num)
@@ -197,22 +293,15 @@ class PrintfFormatNumberValidator(BaseValidator):
     This is valid only if the plurals in the two languages are the same.
     """
 
-    printf_re = re.compile(
-        '%((?:(?P<ord>\d+)\$|\((?P<key>\w+)\))?(?P<fullvar>[+#-]*(?:\d+)?'\
-            '(?:\.\d+)?(hh\|h\|l\|ll)?(?P<type>[\w%])))'
-    )
+    printf_re = printf_re
 
     def precondition(self):
         """Check if the number of plurals in the two languages is the same."""
         return self.tlang.nplurals == self.slang.nplurals and \
                 super(PrintfFormatNumberValidator, self).precondition()
 
-    def validate(self, old, new):
-        old = unescape(old)
-        new = unescape(new)
-        old_matches = list(self.printf_re.finditer(old))
-        new_matches = list(self.printf_re.finditer(new))
-        if len(old_matches) != len(new_matches):
+    def check(self, old, new):
+        if len(old.printf) != len(new.printf):
             raise ValidationError(
                 _('The number of arguments seems to differ '
                   'between the source string and the translation.')
@@ -234,12 +323,9 @@ class PrintfFormatSourceValidator(BaseValidator):
     are preserved in the translation.
     """
 
-    printf_re = re.compile(
-        '%((?:(?P<ord>\d+)\$|\((?P<key>\w+)\))?(?P<fullvar>[+#-]*(?:\d+)?'\
-            '(?:\.\d+)?(hh\|h\|l\|ll)?(?P<type>[\w%])))'
-    )
+    printf_re = printf_re
 
-    def validate(self, source_trans, target_trans):
+    def check(self, source_trans, target_trans):
         """Check, if all printf-format expressions in the source translation
         are in the target translation, too.
 
@@ -256,44 +342,26 @@ class PrintfFormatSourceValidator(BaseValidator):
         conditions is not met.
 
         Args:
-            source_trans: The source translation.
-            target_trans: The target translation.
+            source_trans: The StringFeatures object of the source
+                translation.
+            target_trans: The StringFeatures object of the target
+                translation.
         Raises:
             ValidationError, in case the translation is not valid.
         """
-        source_trans = unescape(source_trans)
-        target_trans = unescape(target_trans)
-        source_matches = list(self.printf_re.finditer(source_trans))
-        target_matches = list(self.printf_re.finditer(target_trans))
-
-        # We could use just one list comprehension:
-        #
-        # target_data = [
-        #     (pattern.group('type'), pattern.group('key'))
-        #     for pattern in target_matches
-        # ]
-        # target_specifiers, target_keys = map(
-        #     list, zip(*target_data)
-        # ) or [[], []]
-        #
-        # but that would probably be less efficient, since target_matches
-        # should ususally have 0 - 5 elements, and much less readable.
-        # So, we do it in two steps.
-        target_specifiers = [pat.group('type') for pat in target_matches]
-        target_keys = [pattern.group('key') for pattern in target_matches]
-
-        for pattern in source_matches:
-            key = pattern.group('key')
+        target_specifiers = [t for (e, k, t) in target_trans.printf]
+        target_keys = [k for (e, k, t) in target_trans.printf]
+
+        for expression, key, conversion_specifier in source_trans.printf:
             if key not in target_keys:
                 msg = "The expression '%s' is not present in the translation."
-                raise ValidationError( _(msg  % pattern.group(0)))
+                raise ValidationError( _(msg  % expression))
 
-            conversion_specifier = pattern.group('type')
             try:
                 target_specifiers.remove(conversion_specifier)
             except ValueError:
                 msg = "The expression '%s' is not present in the translation."
-                raise ValidationError( _(msg  % pattern.group(0)))
+                raise ValidationError( _(msg  % expression))
 
 
 class PrintfFormatPluralizedSourceValidator(PluralOnlyValidator, \
@@ -311,12 +379,9 @@ class PrintfFormatTranslationValidator(BaseValidator):
     string show up in the source string.
     """
 
-    printf_re = re.compile(
-        '%((?:(?P<ord>\d+)\$|\((?P<key>\w+)\))?(?P<fullvar>[+#-]*(?:\d+)?'\
-            '(?:\.\d+)?(hh\|h\|l\|ll)?(?P<type>[\w%])))'
-    )
+    printf_re = printf_re
 
-    def validate(self, source_trans, target_trans):
+    def check(self, source_trans, target_trans):
         """Check, if all printf-format expressions in the target translation
         are in the source translation, too.
 
@@ -333,31 +398,26 @@ class PrintfFormatTranslationValidator(BaseValidator):
         conditions is not met.
 
         Args:
-            source_trans: The source translation.
-            target_trans: The target translation.
+            source_trans: The StringFeatures object of the source
+                translation.
+            target_trans: The StringFeatures object of the target
+                translation.
         Raises:
             ValidationError, in case the translation is not valid.
         """
-        source_matches = list(self.printf_re.finditer(source_trans))
-        target_trans_matches = list(self.printf_re.finditer(target_trans))
+        source_conv_specifiers = [t for (e, k, t) in source_trans.raw_printf]
+        source_keys = [k for (e, k, t) in source_trans.raw_printf]
 
-
-        # Look at PrintfFormatSourceValidator for a comment on optimizing this
-        source_conv_specifiers = [pat.group('type') for pat in source_matches]
-        source_keys = [pattern.group('key') for pattern in source_matches]
-
-        for pattern in target_trans_matches:
-            key = pattern.group('key')
+        for expression, key, conversion_specifier in target_trans.raw_printf:
             if key not in source_keys:
                 msg = "The expression '%s' is not present in the source_string."
-                raise ValidationError( _(msg  % pattern.group(0)))
+                raise ValidationError( _(msg  % expression))
 
-            conversion_specifier = pattern.group('type')
             try:
                 source_conv_specifiers.remove(conversion_specifier)
             except ValueError:
                 msg = "The expression '%s' is not present in the source string."
-                raise ValidationError( _(msg  % pattern.group(0)))
+                raise ValidationError( _(msg  % expression))
 
 
 def create_error_validators(i18n_type):
@@ -387,3 +447,160 @@ def _create_validators(i18n_type, type_):
     else:
         key = 'DEFAULT'
     return (import_to_python(klass) for klass in type_validators[key])
+
+
+# The maximum number of source strings the features of which are memoized.
+SOURCE_FEATURES_CACHE_SIZE = 10000
+
+_source_features = {}
+
+
+def source_features(source, key=None):
+    """Return the features of a source string.
+
+    Args:
+        source: The source string.
+        key: A key the features are memoized with, like the id of the
+            source entity and the rule of the string. If None, the features
+            are not memoized.
+    Returns:
+        A StringFeatures object.
+    """
+    if key is None:
+        return StringFeatures(source)
+    features = _source_features.get(key)
+    if features is None or features.string != source:
+        if len(_source_features) >= SOURCE_FEATURES_CACHE_SIZE:
+            _source_features.clear()
+        features = _source_features[key] = StringFeatures(source)
+    return features
+
+
+class ValidatorPipeline(object):
+    """Run the error and warning validators of an i18n type over many
+    strings.
+
+    The validator classes are imported once and instantiated once per
+    plural rule, and the ones whose preconditions do not hold are dropped
+    right away. The features of each string are extracted once for all
+    validators. The ones of source strings are memoized per source entity
+    and rule, so that other rules, languages or uploads of the same source
+    string do not extract them again.
+
+    Args:
+        i18n_type: The i18n type of the resource.
+        source_language: The source language of the resource.
+        target_language: The language of the translations.
+    """
+
+    def __init__(self, i18n_type, source_language, target_language):
+        self.slang = source_language
+        self.tlang = target_language
+        self._classes = {
+            'errors': list(create_error_validators(i18n_type)),
+            'warnings': list(create_warning_validators(i18n_type)),
+        }
+        self._checks = {}
+
+    def _checks_for(self, kind, rule):
+        """Return the check methods of the applicable validators of a kind
+        for a rule.
+        """
+        key = (kind, rule)
+        if key not in self._checks:
+            validators = [
+                klass(self.slang, self.tlang, rule)
+                for klass in self._classes[kind]
+            ]
+            self._checks[key] = [v.check for v in validators if v.precondition()]
+        return self._checks[key]
+
+    def validate(self, source, translation, rule, key=None):
+        """Validate a translation against its source string.
+
+        Args:
+            source: The source string.
+            translation: The translation.
+            rule: The plural rule of the translation.
+            key: The key to memoize the features of the source string with,
+                usually a (source entity id, rule) tuple.
+        Returns:
+            A list with the messages of the warnings.
+        Raises:
+            ValidationError, if the translation has an error.
+        """
+        if not translation:
+            return []
+        old = source_features(source, key)
+        new = StringFeatures(translation)
+        for check in self._checks_for('errors', rule):
+            check(old, new)
+        warnings = []
+        for check in self._checks_for('warnings', rule):
+            try:
+                check(old, new)
+            except ValidationError, e:
+                warnings.append(e.message)
+        return warnings
+
+
+class ValidationReport(object):
+    """The results of validating the translations of an imported file.
+
+    In the ``reject`` mode, the translations with errors are not saved. In
+    the ``flag`` mode, they are saved and only reported. The report keeps
+    the counters of all checks, but only the first ``limit`` failures.
+    """
+
+    modes = ('flag', 'reject', )
+
+    def __init__(self, mode, limit=None):
+        if mode not in self.modes:
+            raise ValueError("Invalid validation mode: %s" % mode)
+        if limit is None:
+            limit = getattr(settings, 'IMPORT_VALIDATION_REPORT_LIMIT', 100)
+        self.mode = mode
+        self.limit = limit
+        self.checked = 0
+        self.errors = 0
+        self.warnings = 0
+        self.failures = []
+
+    @property
+    def rejected(self):
+        """The number of translations that have not been saved."""
+        return self.errors if self.mode == 'reject' else 0
+
+    def add(self, level, string, context, rule, message):
+        """Record a failed check of a translation.
+
+        Args:
+            level: Either 'error' or 'warning'.
+            string: The source string of the translation.
+            context: The context of the source string.
+            rule: The plural rule of the translation.
+            message: The message of the validator.
+        """
+        if level == 'error':
+            self.errors += 1
+        else:
+            self.warnings += 1
+        if len(self.failures) < self.limit:
+            self.failures.append({
+                'level': level, 'source_entity': string, 'context': context,
+                'rule': rule, 'message': message,
+            })
+
+    def to_dict(self):
+        """Return the report as a dictionary that can be serialized to
+        JSON.
+        """
+        return {
+            'mode': self.mode,
+            'checked': self.checked,
+            'errors': self.errors,
+            'warnings': self.warnings,
+            'rejected': self.rejected,
+            'failures': self.failures,
+            'truncated': self.errors + self.warnings > len(self.failures),
+        }
@@ -24,6 +24,7 @@ from .resource_collections import StringSet, GenericTranslation
 from .utils.decorators import *
 from .utils.hash_tag import hash_tag, escape_context, hash_regex,\
         pluralized_hash_regex, _HashRegex
+from .utils.xmlstream import XmlStreamParser, iter_stream, local_name
 
 # Resources models
 Resource = get_model('resources', 'Resource')
@@ -43,6 +44,17 @@ class XliffCompileError(CompileError):
 
 plural_id_regex = re.compile(r'.+\[\d\]')
 
+
+class _Frame(object):
+    """An element of a XLIFF file, which is being parsed."""
+
+    def __init__(self, kind, context=[], comment=[], occurrence=[]):
+        self.kind = kind
+        self.context = copy(context)
+        self.comment = copy(comment)
+        self.occurrence = copy(occurrence)
+
+
 class XliffCompiler(PluralCompiler):
     """Compiler for xliff files."""
 
@@ -178,43 +190,111 @@ class XliffHandler(SimpleCompilerFactory, Handler):
             [':'.join([i for i in t ]) for t in occurrences]
         )
 
+    def _add_translation_string(self, *args, **kwargs):
+        """Collects a new translation string, until it is yielded by the
+        parser.
+        """
+        self._found.append(GenericTranslation(*args, **kwargs))
+
     def _parse(self, is_source, lang_rules):
         """
         Parses XLIFF file and exports all entries as GenericTranslations.
         """
-        resource = self.resource
+        template = []
+        for item in self._iter_parse([self.content], is_source, lang_rules):
+            if isinstance(item, basestring):
+                template.append(item)
+            else:
+                self.stringset.add(item)
+        return u''.join(template)
+
+    def _iter_parse(self, lines, is_source, lang_rules):
+        """
+        Parse a XLIFF file incrementally.
+
+        Only the trans-unit elements (and the groups of plural forms) are
+        built as DOM trees, one at a time. The rest of the file is written
+        to the template as it is read.
+        """
+        frames = []
+        self._found = []
+
+        def start(name, attrs):
+            parent = frames and frames[-1]
+            frame = None
+            if not frames:
+                if name != "xliff":
+                    raise XliffParseError(_("Root element is not 'xliff'"))
+                if not attrs.get('version', None):
+                    raise self.HandlerParseError(_("Root element 'xliff' "\
+                            "does not have a 'version' attribute"))
+                frame = _Frame('xliff')
+            elif parent:
+                tag = local_name(name)
+                if parent.kind == 'xliff' and tag == 'file':
+                    frame = _Frame('file', self._file_context(attrs))
+                elif parent.kind == 'file' and tag == 'body':
+                    frame = _Frame('body', parent.context)
+                elif parent.kind in ('body', 'group') and tag == 'group':
+                    frame = _Frame('group', parent.context, parent.comment,
+                            parent.occurrence)
+            frames.append(frame)
+
+        def end(name):
+            frames.pop()
+
+        def select(name, attrs):
+            parent = frames and frames[-1]
+            if not parent or parent.kind not in ('body', 'group'):
+                return False
+            tag = local_name(name)
+            if tag == 'trans-unit':
+                return True
+            if tag == 'group':
+                return attrs.get('restype', None) == "x-gettext-plurals"
+            # context-group and note elements have to be in XML before
+            # the trans-units of the group they refer to.
+            return is_source and parent.kind == 'group' and\
+                    tag in ('context-group', 'note')
+
+        def handle(node):
+            parent = frames[-1]
+            if node.localName == 'context-group':
+                parent.occurrence.extend(self.parse_tag_context_group(node))
+            elif node.localName == 'note':
+                parent.comment.extend(self.parse_tag_note(node))
+            elif node.localName == 'group':
+                self.parse_tag_group(node, is_source,
+                        context=copy(parent.context),
+                        comment=copy(parent.comment),
+                        occurrence=copy(parent.occurrence))
+            else:
+                self.parse_tag_trans_unit(node, is_source,
+                        context=copy(parent.context),
+                        comment=copy(parent.comment),
+                        occurrence=copy(parent.occurrence))
 
-        context = []
-        content = self.content.encode('utf-8')
+        parser = XmlStreamParser(select=select, handle=handle, start=start,
+                end=end, serialize=is_source)
+        self.doc = parser.doc
         try:
-            self.doc = xml.dom.minidom.parseString(content)
-            root = self.doc.documentElement
-
-            if root.tagName != "xliff":
-                raise XliffParseError(_("Root element is not 'xliff'"))
-            if not root.attributes.get('version', None):
-                raise self.HandlerParseError(_("Root element 'xliff' "\
-                        "does not have a 'version' attribute"))
-            for node in root.childNodes:
-                if node.nodeType == node.ELEMENT_NODE and \
-                        node.localName == "file":
-                    self.parse_tag_file(node, is_source)
+            for item in iter_stream(parser, self._iter_joined_lines(lines),
+                    'utf-8', self._found):
+                yield item
         except Exception, e:
             raise self.HandlerParseError(e.message)
 
-        return self.doc.toxml()
-
-    def parse_tag_file(self, file_node, is_source=False):
-        self.trans_unit_id_list = []
-        xliff_source_language_code = file_node.attributes.get(
-                'source-language').value
+    def _file_context(self, attrs):
+        """Check the attributes of a file element and return the context
+        of its strings.
+        """
+        self.trans_unit_id_list = set()
+        xliff_source_language_code = attrs.get('source-language')
         source_language = Language.objects.by_code_or_alias_or_none(
                 xliff_source_language_code)
-        original = file_node.attributes.get('original').value
-        datatype = file_node.attributes.get('datatype').value
-        target_language_node = file_node.attributes.get('target-language')
-        xliff_target_language_code = target_language_node and\
-                target_language_node.value or ''
+        original = attrs.get('original')
+        datatype = attrs.get('datatype')
+        xliff_target_language_code = attrs.get('target-language', '')
         target_language = Language.objects.by_code_or_alias_or_none(
                 xliff_target_language_code)
         if self.resource and source_language != self.resource.source_language:
@@ -233,20 +313,7 @@ class XliffHandler(SimpleCompilerFactory, Handler):
                     'target_lang_code': xliff_target_language_code,
                     'translation_language': self.language
                 })
-        context = [original, source_language, datatype]
-        for node in file_node.childNodes:
-            if node.nodeType == node.ELEMENT_NODE and node.localName == "body":
-                self.parse_tag_body(node, is_source, context=copy(context))
-
-    def parse_tag_body(self, body_node, is_source=False, context=[]):
-        for node in body_node.childNodes:
-            if node.nodeType == node.ELEMENT_NODE and node.localName == "group":
-                self.parse_tag_group(node, is_source, context=copy(context),
-                        occurrence=[])
-            if node.nodeType == node.ELEMENT_NODE and node.localName == "trans-unit":
-                self.parse_tag_trans_unit(node, is_source, context=copy(context),
-                        occurrence=[])
-            # there is no way to handle bin-unit in transifex
+        return [original, source_language, datatype]
 
     def parse_tag_group(self, group_node, is_source=False, context=[],
             comment=[], occurrence=[]):
@@ -321,7 +388,7 @@ class XliffHandler(SimpleCompilerFactory, Handler):
         if trans_unit_id in self.trans_unit_id_list:
             return
         else:
-            self.trans_unit_id_list.append(trans_unit_id)
+            self.trans_unit_id_list.add(trans_unit_id)
         source_node = trans_unit_node.getElementsByTagName("source")[0]
         if len(source_node.childNodes)>1:
             for i in source_node.childNodes:
@@ -405,18 +472,18 @@ class XliffHandler(SimpleCompilerFactory, Handler):
                )
                return
         if pluralized:
-            self.stringset.add(GenericTranslation(
+            self._add_translation_string(
                     source, translation, context=context,
                     rule=rule, pluralized=True,
                     occurrences=self._serialize_occurrences(occurrence),
                     comment='\n'.join(comment)
-             ))
+            )
         else:
-            self.stringset.add(GenericTranslation(
+            self._add_translation_string(
                     source, translation, context=context,
                     occurrences=self._serialize_occurrences(occurrence),
                     comment='\n'.join(comment)
-             ))
+            )
 
     def parse_tag_context_group(self, context_group_node, is_source=False):
         result = []
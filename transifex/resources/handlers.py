@@ -1,14 +1,21 @@
 # -*- coding: utf-8 -*-
+import threading
+from functools import wraps
 from django.conf import settings
+from django.core.cache import cache
 from django.db.models import get_model
-from django.db.models.signals import pre_save
+from django.db.models.signals import pre_save, post_save
 from transifex.actionlog.models import action_logging
 from transifex.projects.signals import post_resource_save, post_resource_delete
 from transifex.txcommon import notifications as txnotification
-from transifex.resources.utils import invalidate_template_cache
+from transifex.resources.signals import post_save_translation
+from transifex.resources.rollups import defer_rollups, rollups_changed
+from transifex.resources.utils import bump_resource_revision
+from transifex.txcommon.cache import bump_generation
 from transifex.teams.models import Team
 
 RLStats = get_model('resources', 'RLStats')
+Template = get_model('resources', 'Template')
 Translation = get_model('resources', 'Translation')
 
 def get_project_teams(project):
@@ -17,12 +24,121 @@ def get_project_teams(project):
     else:
         return project.team_set.all()
 
+_local = threading.local()
+
+
+class StatsInvalidationCoalescer(object):
+    """Collect the (resource, language) pairs the statistics of which
+    have to be invalidated and invalidate each of them once.
+
+    While a coalescer is active in a thread (see ``coalesce_invalidations``),
+    ``invalidate_stats_cache`` only records the pair it is called for. When
+    the coalescer is flushed, the statistics of each pair are updated once,
+    with the last user and all the StatsDelta objects that were passed for
+    it. If the STATS_INVALIDATION_DELAY setting is positive, the updates
+    that need a recount are left to the ``invalidate_stats`` task instead,
+    which runs once per pair in that window.
+    """
+
+    def __init__(self):
+        self._pending = {}
+
+    def add(self, resource, language, user=None, delta=None):
+        """Record that the statistics of a pair have to be invalidated."""
+        if not language:
+            language = resource.source_language
+        key = (resource.id, language.id)
+        if key not in self._pending:
+            self._pending[key] = [resource, language, user, []]
+        entry = self._pending[key]
+        if user is not None:
+            entry[2] = user
+        # The same delta may be passed many times, while it still changes.
+        if delta is not None and not any(d is delta for d in entry[3]):
+            entry[3].append(delta)
+
+    @defer_rollups
+    def flush(self):
+        """Invalidate the statistics of the recorded pairs."""
+        pending, self._pending = self._pending, {}
+        delay = getattr(settings, 'STATS_INVALIDATION_DELAY', 0)
+        for resource, language, user, deltas in pending.itervalues():
+            delta = None
+            if deltas:
+                delta = deltas[0]
+                for other in deltas[1:]:
+                    delta.merge(other)
+            if delay and not (delta is not None and delta.enabled):
+                _schedule_invalidation(resource, language, user, delay)
+            else:
+                _invalidate_stats_cache(
+                    resource, language, user=user, delta=delta
+                )
+
+
+def _schedule_invalidation(resource, language, user, delay):
+    """Schedule the invalidation of the statistics of a pair, unless it
+    is already scheduled.
+
+    The revision of the resource is changed right away, so that the caches
+    derived from its strings (e.g. the state indexes) are not used.
+    """
+    from transifex.resources.tasks import invalidate_stats
+    bump_resource_revision(resource.id)
+    key = 'stats_invalidation.%s.%s' % (resource.id, language.id)
+    if cache.add(key, True, delay * 2):
+        invalidate_stats.apply_async(
+            args=[resource.id, language.id, user and user.id],
+            countdown=delay
+        )
+
+
+def coalesce_invalidations(func):
+    """Decorator to coalesce the stats invalidations of a function (e.g. a
+    view) and flush them when it returns.
+
+    Nested calls are coalesced by the outermost one. If the function
+    raises, the invalidations are discarded, since its changes are
+    usually rolled back, and the exception is propagated.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(_local, 'coalescer', None) is not None:
+            return func(*args, **kwargs)
+        _local.coalescer = StatsInvalidationCoalescer()
+        try:
+            result = func(*args, **kwargs)
+        except:
+            _local.coalescer = None
+            raise
+        coalescer, _local.coalescer = _local.coalescer, None
+        coalescer.flush()
+        return result
+    return wrapper
+
+
 def invalidate_stats_cache(resource, language, **kwargs):
     """
     Invalidate template caches and handle the updating of the persistent
     stats.
+
+    If a StatsDelta object is passed as the ``delta`` keyword argument and
+    incremental statistics are enabled, the changes it holds are applied
+    to the stats, instead of recounting them.
+
+    Inside ``coalesce_invalidations``, the invalidation is postponed until
+    the decorated function returns.
     """
+    coalescer = getattr(_local, 'coalescer', None)
+    if coalescer is not None:
+        coalescer.add(
+            resource, language, kwargs.get('user'), kwargs.get('delta')
+        )
+        return
+    _invalidate_stats_cache(resource, language, **kwargs)
 
+@defer_rollups
+def _invalidate_stats_cache(resource, language, **kwargs):
     is_source = False
     if not language or language == resource.source_language:
         is_source = True
@@ -31,7 +147,17 @@ def invalidate_stats_cache(resource, language, **kwargs):
     team_languages = get_project_teams(resource.project).values_list(
             'language', flat=True)
 
-    if not is_source:
+    delta = kwargs.get('delta')
+    if delta is not None and delta.enabled:
+        delta.touch(language.id)
+        for rl in delta.apply(kwargs.get('user')):
+            if rl.translated == 0 and rl.language_id not in team_languages \
+              and rl.language_id != resource.source_language_id:
+                rl.delete()
+        if is_source:
+            resource.update_total_entities(save=False)
+            resource.update_wordcount(save=True)
+    elif not is_source:
         # Get or create new RLStat object
         rl, created = RLStats.objects.get_or_create(resource=resource,
             language=language)
@@ -56,39 +182,29 @@ def invalidate_stats_cache(resource, language, **kwargs):
         resource.update_total_entities(save=False)
         resource.update_wordcount(save=True)
 
+    # The incremental updates of the RLStats objects send no signals.
+    rollups_changed([resource.id], None if is_source else [language.id])
+    bump_resource_revision(resource.id)
     invalidate_object_templates(resource, language, **kwargs)
 
 def invalidate_object_templates(resource, language, **kwargs):
     """
-    Invalidate all template level caches related to a specific object
-    """
+    Invalidate all template level caches related to a specific object.
 
-    if language == resource.source_language:
-        langs = resource.available_languages
+    The fragments embed the generations of the scopes they depend on in
+    their keys, so only the generations are bumped, regardless of the
+    number of languages and releases.
+    """
+    # Resource rows in the project details
+    bump_generation('resource', resource.id)
+    if not language or language == resource.source_language:
+        # The rows of every language in the resource, team and release
+        # details
+        bump_generation('resource_source', resource.id)
+        bump_generation('project_source', resource.project_id)
     else:
-        langs = [language]
-
-    # Template lvl cache for resource details
-    invalidate_template_cache("resource_details",
-        resource.project.slug, resource.slug)
-
-    invalidate_template_cache("project_resource_details",
-        resource.project.slug, resource.slug)
-
-    # Number of source strings in resource
-    for lang in langs:
-        invalidate_template_cache("team_details",
-            resource.project.slug, lang.code, resource.id)
-
-        for rel in resource.project.releases.all():
-            # Template lvl cache for release details
-            invalidate_template_cache("release_details",
-                rel.id, lang.id)
-
-        # Template lvl cache for resource details
-        invalidate_template_cache("resource_details_lang",
-            resource.project.slug, resource.slug,
-             lang.code)
+        bump_generation('resource_language', resource.id, language.id)
+        bump_generation('project_language', resource.project_id, language.id)
 
 def on_resource_save(sender, instance, created, user, **kwargs):
     """
@@ -122,6 +238,23 @@ def on_resource_delete(sender, instance, user, **kwargs):
         txnotification.send_observation_notices_for(instance.project,
                 signal=nt, extra_context=context)
 
+def on_save_translation(sender, resource, language, **kwargs):
+    """
+    Called after a file has been imported to a resource. Changes the
+    revision of the resource, so that cached compiled files are not used.
+    """
+    bump_resource_revision(resource.id)
+
+def on_template_save(sender, instance, **kwargs):
+    """
+    Called when the template of a resource is saved. Changes the revision
+    of the resource, so that cached compiled files are not used.
+    """
+    bump_resource_revision(instance.resource_id)
+
+post_save_translation.connect(on_save_translation)
+post_save.connect(on_template_save, sender=Template)
+
 # Resource signal handlers for logging
 post_resource_save.connect(on_resource_save)
 post_resource_delete.connect(on_resource_delete)
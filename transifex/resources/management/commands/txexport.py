@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from optparse import make_option
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import get_model
+
+
+class Command(BaseCommand):
+    """
+    Management command to export the translation files of many resources
+    and languages as a zip archive.
+    """
+    help = "Export the translations of resources, or of the resources of a "\
+           "release, in many languages as a zip archive."
+    args = "<project_slug.resource_slug project_slug.resource_slug ...>"
+    option_list = BaseCommand.option_list + (
+        make_option('--release', action='store', dest='release',
+            default=None,
+            help='Export the resources of a release, given as '
+                 'project_slug.release_slug.'),
+        make_option('--languages', action='store', dest='languages',
+            default=None,
+            help='Comma separated list of the codes of the languages to '
+                 'export. By default, all languages with translations.'),
+        make_option('--mode', action='store', dest='mode', default=None,
+            help='The mode of the compilation (default, translated or '
+                 'reviewed).'),
+        make_option('--output', action='store', dest='output',
+            default=None,
+            help='The file to write the archive to. By default, the '
+                 'standard output.'),
+    )
+
+    can_import_settings = True
+
+    def handle(self, *args, **options):
+        from transifex.resources.export import export_archive, \
+                export_options
+        Resource = get_model('resources', 'Resource')
+        Release = get_model('releases', 'Release')
+
+        if options['release']:
+            try:
+                project_slug, release_slug = options['release'].split('.', 1)
+                release = Release.objects.get(
+                    project__slug=project_slug, slug=release_slug
+                )
+            except (ValueError, Release.DoesNotExist):
+                raise CommandError(
+                    "No release %s found." % options['release']
+                )
+            resources = list(Resource.objects.select_related(
+                'project'
+            ).filter(releases=release).order_by('project__slug', 'slug'))
+        elif args:
+            resources = []
+            for label in args:
+                try:
+                    project_slug, resource_slug = label.split('.', 1)
+                    resources.append(Resource.objects.select_related(
+                        'project'
+                    ).get(project__slug=project_slug, slug=resource_slug))
+                except (ValueError, Resource.DoesNotExist):
+                    raise CommandError("No resource %s found." % label)
+        else:
+            raise CommandError("Specify some resources or a release.")
+
+        try:
+            languages, mode = export_options(options)
+        except ValueError, e:
+            raise CommandError(unicode(e))
+
+        if options['output']:
+            output = open(options['output'], 'wb')
+        else:
+            output = sys.stdout
+        start = time.time()
+        size = 0
+        try:
+            for chunk in export_archive(resources, languages, mode=mode):
+                output.write(chunk)
+                size += len(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        sys.stderr.write("Exported %d resources (%d KB) in %.2f s.\n" % (
+            len(resources), size / 1024, time.time() - start
+        ))
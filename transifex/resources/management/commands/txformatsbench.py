@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+from optparse import make_option
+import os
+import resource
+import shutil
+import tempfile
+import time
+from multiprocessing import Pool
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from transifex.languages.models import Language
+from transifex.resources.formats.qt import LinguistHandler
+from transifex.resources.formats.xliff import XliffHandler
+
+
+XLIFF_HEADER = u"""<?xml version="1.0" encoding="UTF-8"?>
+<xliff version="1.2" xmlns="urn:oasis:names:tc:xliff:document:1.2">
+  <file datatype="po" original="bench.po" source-language="%(language)s">
+    <body>
+"""
+
+XLIFF_UNIT = u"""      <trans-unit id="unit_%(n)d">
+        <source>Source string number %(n)d &amp; some &lt;markup&gt;</source>
+        <note from="developer">Comment of string %(n)d</note>
+      </trans-unit>
+"""
+
+XLIFF_FOOTER = u"""    </body>
+  </file>
+</xliff>
+"""
+
+QT_HEADER = u"""<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE TS>
+<TS version="2.0" language="%(language)s">
+<context>
+    <name>Bench</name>
+"""
+
+QT_UNIT = u"""    <message>
+        <location filename="bench.cpp" line="%(n)d"/>
+        <source>Source string number %(n)d &amp; some &lt;markup&gt;</source>
+        <comment>Comment of string %(n)d</comment>
+        <translation>Source string number %(n)d &amp; some &lt;markup&gt;</translation>
+    </message>
+"""
+
+QT_FOOTER = u"""</context>
+</TS>
+"""
+
+# The handler, the extension and the parts of the generated files of each
+# format.
+FORMATS = {
+    'qt': (LinguistHandler, 'ts', QT_HEADER, QT_UNIT, QT_FOOTER),
+    'xliff': (XliffHandler, 'xlf', XLIFF_HEADER, XLIFF_UNIT, XLIFF_FOOTER),
+}
+
+# The language of the generated files.
+LANGUAGE = 'en'
+
+
+def _generate(path, fmt, units):
+    """Write a file of a format with the specified number of strings."""
+    header, unit, footer = FORMATS[fmt][2:]
+    f = open(path, 'wb')
+    try:
+        f.write((header % {'language': LANGUAGE}).encode('utf-8'))
+        for n in xrange(units):
+            f.write((unit % {'n': n}).encode('utf-8'))
+        f.write(footer.encode('utf-8'))
+    finally:
+        f.close()
+
+
+def _parse_content(handler, path):
+    handler.bind_file(path)
+    handler.parse_file(is_source=True)
+    return len(handler.stringset), handler.template
+
+
+def _parse_stream(handler, path):
+    handler.bind_file(path, stream=True)
+    handler.parse_file(is_source=True)
+    strings = 0
+    for string in handler.stringset:
+        strings += 1
+    template = handler._generate_template(
+        handler._template_from_chunks(handler.stringset.template)
+    )
+    return strings, template
+
+
+MODES = {
+    'content': _parse_content,
+    'stream': _parse_stream,
+}
+
+
+def _measure(args):
+    """Parse a source file with the handler of its format in a fresh
+    process and return the number of strings, the size of the template,
+    the time spent and the peak memory the parsing added, in kilobytes.
+    """
+    fmt, mode, path = args
+    handler = FORMATS[fmt][0]()
+    handler.set_language(Language.objects.by_code_or_alias(LANGUAGE))
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    strings, template = MODES[mode](handler, path)
+    elapsed = time.time() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return strings, len(template), elapsed, peak - baseline
+
+
+class Command(BaseCommand):
+    """
+    Management command to benchmark the parsing of XML translation files.
+    """
+    help = "Compare the time and peak memory of the parsing of generated "\
+           "Qt and XLIFF source files by their handlers, with the content "\
+           "in memory and streamed from the file."
+    option_list = BaseCommand.option_list + (
+        make_option('--units', action='store', dest='units',
+            default='10000,100000',
+            help='Comma separated list of the number of strings of the '
+                 'generated files.'),
+        make_option('--formats', action='store', dest='formats',
+            default='qt,xliff',
+            help='Comma separated list of the formats to benchmark.'),
+    )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(n) for n in options['units'].split(',')]
+        except ValueError:
+            raise CommandError("The --units option must be a comma "
+                               "separated list of numbers.")
+        formats = options['formats'].split(',')
+        for fmt in formats:
+            if fmt not in FORMATS:
+                raise CommandError("Unknown format %s." % fmt)
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for fmt in formats:
+                for units in sizes:
+                    path = os.path.join(
+                        tmpdir, 'bench_%d.%s' % (units, FORMATS[fmt][1])
+                    )
+                    _generate(path, fmt, units)
+                    self._run(fmt, path, units)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def _run(self, fmt, path, units):
+        # The processes must not share the database connection.
+        connection.close()
+        results = {}
+        for mode in sorted(MODES):
+            # A new process for each measurement, so that the peak memory
+            # of one does not hide the other.
+            pool = Pool(1, maxtasksperchild=1)
+            try:
+                results[mode] = pool.apply(_measure, ((fmt, mode, path), ))
+            finally:
+                pool.close()
+                pool.join()
+        if results['content'][:2] != results['stream'][:2]:
+            raise CommandError("The modes disagree on %s." % path)
+        self.stdout.write("%s, %d strings (%d KB):\n" % (
+            fmt, units, os.path.getsize(path) / 1024
+        ))
+        for mode in sorted(results):
+            strings, size, elapsed, peak = results[mode]
+            self.stdout.write("  %-8s %8.2f s %10d KB peak\n" % (
+                mode, elapsed, peak
+            ))
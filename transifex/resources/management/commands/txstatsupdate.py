@@ -2,10 +2,32 @@
 from optparse import make_option, OptionParser
 import os.path
 import sys
+import time
+from multiprocessing import Pool
 from django.core.management.base import (BaseCommand, LabelCommand, CommandError)
+from django.db import connection
 from django.db.models import get_model
 from django.conf import settings
 
+
+def _recount_projects(project_ids, batch_size):
+    """Recalculate the statistics of the resources of some projects.
+
+    This runs in a worker process, so it needs its own database connection.
+    """
+    from transifex.resources.stats import recount_resources
+    connection.close()
+    Resource = get_model('resources', 'Resource')
+    resources = Resource.objects.filter(
+        project__in=project_ids
+    ).select_related('project')
+    return len(resources), recount_resources(resources, batch_size)
+
+
+def _recount_projects_star(args):
+    return _recount_projects(*args)
+
+
 class Command(LabelCommand):
     """
     Management Command Class about resource source file updating
@@ -13,6 +35,21 @@ class Command(LabelCommand):
     help = "This command creates the necessary objects for every resource"\
            " and forces statistics to be recalculated."
     args = "<project_slug1.resource_slug1 project_slug1.resource_slug2>"
+    option_list = LabelCommand.option_list + (
+        make_option('--bulk', action='store_true',
+            dest='bulk', default=False,
+            help='Recalculate the statistics of many resources at once '
+                 'with grouped queries. No signals are sent for the '
+                 'updated statistics.'),
+        make_option('--parallel', action='store', type='int',
+            dest='parallel', default=0,
+            help='Recalculate the statistics in bulk mode with that many '
+                 'worker processes. The work is split by project.'),
+        make_option('--batch-size', action='store', type='int',
+            dest='batch_size', default=100,
+            help='The number of resources to recalculate at once in bulk '
+                 'mode.'),
+    )
 
     can_import_settings = True
 
@@ -25,6 +62,12 @@ class Command(LabelCommand):
         Team = get_model('teams', 'Team')
 
         verbosity = int(options.get('verbosity',1))
+        parallel = options.get('parallel')
+        batch_size = options.get('batch_size')
+
+        if parallel and not args:
+            self._recount_parallel(parallel, batch_size, verbosity)
+            return
 
         if not args:
             resources = Resource.objects.all()
@@ -51,6 +94,19 @@ class Command(LabelCommand):
         if verbosity:
             sys.stdout.write("A total of %s resources are listed for updating.\n" % num)
 
+        if options.get('bulk') or parallel:
+            from transifex.resources.stats import recount_resources
+            start = time.time()
+            pairs = 0
+            for offset in xrange(0, num, batch_size):
+                batch = resources[offset:offset + batch_size]
+                pairs += recount_resources(batch, batch_size)
+                if verbosity:
+                    sys.stdout.write("Updated %s of %s resources.\n" % (
+                        min(offset + batch_size, num), num))
+            self._report(num, pairs, time.time() - start)
+            return
+
         for seq, r in enumerate(resources):
             if verbosity:
                 sys.stdout.write((u"Updating resource %s.%s (%s of %s)\n" %
@@ -99,3 +155,50 @@ class Command(LabelCommand):
             for stat in rlstats:
                 if not stat.language.id in langs:
                     stat.delete()
+
+    def _recount_parallel(self, workers, batch_size, verbosity):
+        """Recalculate the statistics of all resources in bulk mode, with
+        a pool of worker processes.
+        """
+        Project = get_model('projects', 'Project')
+        project_ids = list(Project.objects.values_list('id', flat=True))
+        if not project_ids:
+            sys.stderr.write("No resources suitable for updating found. Exiting...\n")
+            sys.exit()
+        # Smaller chunks than workers keep the pool busy until the end.
+        chunk_size = max(1, len(project_ids) / (workers * 4))
+        chunks = [
+            (project_ids[offset:offset + chunk_size], batch_size)
+            for offset in xrange(0, len(project_ids), chunk_size)
+        ]
+        if verbosity:
+            sys.stdout.write("Updating the resources of %s projects with %s "
+                "workers.\n" % (len(project_ids), workers))
+
+        # Workers must not share the connection of the parent process.
+        connection.close()
+        start = time.time()
+        resources = pairs = 0
+        pool = Pool(workers)
+        try:
+            for seq, (r, p) in enumerate(
+                    pool.imap_unordered(_recount_projects_star, chunks)):
+                resources += r
+                pairs += p
+                if verbosity:
+                    sys.stdout.write("Finished %s of %s chunks of projects.\n"
+                        % (seq + 1, len(chunks)))
+        finally:
+            pool.close()
+            pool.join()
+        self._report(resources, pairs, time.time() - start)
+
+    def _report(self, resources, pairs, elapsed):
+        """Report the throughput of a bulk update."""
+        elapsed = max(elapsed, 0.001)
+        sys.stdout.write(
+            "Recalculated the statistics of %s resource-language pairs of %s "
+            "resources in %.1f seconds (%.1f pairs/s, %.1f resources/s).\n" % (
+                pairs, resources, elapsed, pairs / elapsed, resources / elapsed
+            )
+        )
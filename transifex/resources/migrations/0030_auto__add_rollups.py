@@ -0,0 +1,347 @@
+# encoding: utf-8
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+class Migration(SchemaMigration):
+
+    depends_on = (
+        ("releases", "0004_add_unique_index_for_slug_project"),
+    )
+
+    def forwards(self, orm):
+        
+        # Adding model 'ProjectLanguageStats'
+        db.create_table('resources_projectlanguagestats', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('translated', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('untranslated', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('reviewed', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('translated_wordcount', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('resources', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('last_update', self.gf('django.db.models.fields.DateTimeField')(default=None, null=True)),
+            ('last_committer', self.gf('django.db.models.fields.related.ForeignKey')(default=None, related_name='projectlanguagestats_committed', null=True, to=orm['auth.User'])),
+            ('language', self.gf('django.db.models.fields.related.ForeignKey')(to=orm['languages.Language'])),
+            ('project', self.gf('django.db.models.fields.related.ForeignKey')(related_name='language_stats', to=orm['projects.Project'])),
+        ))
+        db.send_create_signal('resources', ['ProjectLanguageStats'])
+
+        # Adding unique constraint on 'ProjectLanguageStats', fields ['project', 'language']
+        db.create_unique('resources_projectlanguagestats', ['project_id', 'language_id'])
+
+        # Adding model 'ReleaseLanguageStats'
+        db.create_table('resources_releaselanguagestats', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('translated', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('untranslated', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('reviewed', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('translated_wordcount', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('resources', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('last_update', self.gf('django.db.models.fields.DateTimeField')(default=None, null=True)),
+            ('last_committer', self.gf('django.db.models.fields.related.ForeignKey')(default=None, related_name='releaselanguagestats_committed', null=True, to=orm['auth.User'])),
+            ('language', self.gf('django.db.models.fields.related.ForeignKey')(to=orm['languages.Language'])),
+            ('release', self.gf('django.db.models.fields.related.ForeignKey')(related_name='language_stats', to=orm['releases.Release'])),
+            ('project', self.gf('django.db.models.fields.related.ForeignKey')(related_name='release_language_stats', to=orm['projects.Project'])),
+        ))
+        db.send_create_signal('resources', ['ReleaseLanguageStats'])
+
+        # Adding unique constraint on 'ReleaseLanguageStats', fields ['release', 'project', 'language']
+        db.create_unique('resources_releaselanguagestats', ['release_id', 'project_id', 'language_id'])
+
+        # Adding model 'ProjectStats'
+        db.create_table('resources_projectstats', (
+            ('id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('project', self.gf('django.db.models.fields.related.OneToOneField')(related_name='stats', unique=True, to=orm['projects.Project'])),
+            ('resources', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('total_entities', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('wordcount', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('languages', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('translated', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('reviewed', self.gf('django.db.models.fields.PositiveIntegerField')(default=0)),
+            ('last_update', self.gf('django.db.models.fields.DateTimeField')(default=None, null=True)),
+            ('last_committer', self.gf('django.db.models.fields.related.ForeignKey')(default=None, related_name='projectstats_committed', null=True, to=orm['auth.User'])),
+        ))
+        db.send_create_signal('resources', ['ProjectStats'])
+
+
+    def backwards(self, orm):
+        
+        # Removing unique constraint on 'ReleaseLanguageStats', fields ['release', 'project', 'language']
+        db.delete_unique('resources_releaselanguagestats', ['release_id', 'project_id', 'language_id'])
+
+        # Removing unique constraint on 'ProjectLanguageStats', fields ['project', 'language']
+        db.delete_unique('resources_projectlanguagestats', ['project_id', 'language_id'])
+
+        # Deleting model 'ProjectLanguageStats'
+        db.delete_table('resources_projectlanguagestats')
+
+        # Deleting model 'ReleaseLanguageStats'
+        db.delete_table('resources_releaselanguagestats')
+
+        # Deleting model 'ProjectStats'
+        db.delete_table('resources_projectstats')
+
+
+    models = {
+        'actionlog.logentry': {
+            'Meta': {'ordering': "('-action_time',)", 'object_name': 'LogEntry'},
+            'action_time': ('django.db.models.fields.DateTimeField', [], {'db_index': 'True'}),
+            'action_type': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['notification.NoticeType']"}),
+            'content_type': ('django.db.models.fields.related.ForeignKey', [], {'blank': 'True', 'related_name': "'actionlogs'", 'null': 'True', 'to': "orm['contenttypes.ContentType']"}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'message': ('django.db.models.fields.TextField', [], {'null': 'True', 'blank': 'True'}),
+            'object_id': ('django.db.models.fields.IntegerField', [], {'db_index': 'True', 'null': 'True', 'blank': 'True'}),
+            'object_name': ('django.db.models.fields.CharField', [], {'max_length': '200', 'blank': 'True'}),
+            'user': ('django.db.models.fields.related.ForeignKey', [], {'blank': 'True', 'related_name': "'actionlogs'", 'null': 'True', 'to': "orm['auth.User']"})
+        },
+        'auth.group': {
+            'Meta': {'object_name': 'Group'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '80'}),
+            'permissions': ('django.db.models.fields.related.ManyToManyField', [], {'to': "orm['auth.Permission']", 'symmetrical': 'False', 'blank': 'True'})
+        },
+        'auth.permission': {
+            'Meta': {'ordering': "('content_type__app_label', 'content_type__model', 'codename')", 'unique_together': "(('content_type', 'codename'),)", 'object_name': 'Permission'},
+            'codename': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'content_type': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['contenttypes.ContentType']"}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '50'})
+        },
+        'auth.user': {
+            'Meta': {'object_name': 'User'},
+            'date_joined': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'email': ('django.db.models.fields.EmailField', [], {'max_length': '75', 'blank': 'True'}),
+            'first_name': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'}),
+            'groups': ('django.db.models.fields.related.ManyToManyField', [], {'to': "orm['auth.Group']", 'symmetrical': 'False', 'blank': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'is_active': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'is_staff': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'is_superuser': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'last_login': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'last_name': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'}),
+            'password': ('django.db.models.fields.CharField', [], {'max_length': '128'}),
+            'user_permissions': ('django.db.models.fields.related.ManyToManyField', [], {'to': "orm['auth.Permission']", 'symmetrical': 'False', 'blank': 'True'}),
+            'username': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '30'})
+        },
+        'contenttypes.contenttype': {
+            'Meta': {'ordering': "('name',)", 'unique_together': "(('app_label', 'model'),)", 'object_name': 'ContentType', 'db_table': "'django_content_type'"},
+            'app_label': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'model': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '100'})
+        },
+        'languages.language': {
+            'Meta': {'ordering': "('name',)", 'object_name': 'Language', 'db_table': "'translations_language'"},
+            'code': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '50'}),
+            'code_aliases': ('django.db.models.fields.CharField', [], {'default': "''", 'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'description': ('django.db.models.fields.CharField', [], {'max_length': '255', 'blank': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '50'}),
+            'nplurals': ('django.db.models.fields.SmallIntegerField', [], {'default': '0'}),
+            'pluralequation': ('django.db.models.fields.CharField', [], {'max_length': '255', 'blank': 'True'}),
+            'rule_few': ('django.db.models.fields.CharField', [], {'max_length': '255', 'null': 'True', 'blank': 'True'}),
+            'rule_many': ('django.db.models.fields.CharField', [], {'max_length': '255', 'null': 'True', 'blank': 'True'}),
+            'rule_one': ('django.db.models.fields.CharField', [], {'max_length': '255', 'null': 'True', 'blank': 'True'}),
+            'rule_other': ('django.db.models.fields.CharField', [], {'default': "'everything'", 'max_length': '255'}),
+            'rule_two': ('django.db.models.fields.CharField', [], {'max_length': '255', 'null': 'True', 'blank': 'True'}),
+            'rule_zero': ('django.db.models.fields.CharField', [], {'max_length': '255', 'null': 'True', 'blank': 'True'}),
+            'specialchars': ('django.db.models.fields.CharField', [], {'max_length': '255', 'blank': 'True'})
+        },
+        'notification.noticetype': {
+            'Meta': {'object_name': 'NoticeType'},
+            'default': ('django.db.models.fields.IntegerField', [], {}),
+            'description': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'display': ('django.db.models.fields.CharField', [], {'max_length': '50'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'label': ('django.db.models.fields.CharField', [], {'max_length': '40'})
+        },
+        'projects.project': {
+            'Meta': {'ordering': "('name',)", 'object_name': 'Project'},
+            'anyone_submit': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'bug_tracker': ('django.db.models.fields.URLField', [], {'max_length': '200', 'blank': 'True'}),
+            'created': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'blank': 'True'}),
+            'description': ('django.db.models.fields.CharField', [], {'max_length': '255'}),
+            'enabled': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'feed': ('django.db.models.fields.CharField', [], {'max_length': '255', 'blank': 'True'}),
+            'hidden': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'homepage': ('django.db.models.fields.URLField', [], {'max_length': '200', 'blank': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'is_hub': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'logo': ('django.db.models.fields.files.ImageField', [], {'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'long_description': ('django.db.models.fields.TextField', [], {'max_length': '1000', 'blank': 'True'}),
+            'long_description_html': ('django.db.models.fields.TextField', [], {'max_length': '1000', 'blank': 'True'}),
+            'maintainers': ('django.db.models.fields.related.ManyToManyField', [], {'symmetrical': 'False', 'related_name': "'projects_maintaining'", 'null': 'True', 'to': "orm['auth.User']"}),
+            'modified': ('django.db.models.fields.DateTimeField', [], {'auto_now': 'True', 'blank': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '50'}),
+            'outsource': ('django.db.models.fields.related.ForeignKey', [], {'blank': 'True', 'related_name': "'outsourcing'", 'null': 'True', 'to': "orm['projects.Project']"}),
+            'owner': ('django.db.models.fields.related.ForeignKey', [], {'blank': 'True', 'related_name': "'projects_owning'", 'null': 'True', 'to': "orm['auth.User']"}),
+            'private': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'slug': ('django.db.models.fields.SlugField', [], {'unique': 'True', 'max_length': '30', 'db_index': 'True'}),
+            'source_language': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['languages.Language']", 'db_index': 'False'}),
+            'tags': ('tagging_autocomplete.models.TagAutocompleteField', [], {'default': "''", 'null': 'True'}),
+            'trans_instructions': ('django.db.models.fields.URLField', [], {'max_length': '200', 'blank': 'True'})
+        },
+        'releases.release': {
+            'Meta': {'ordering': "('name',)", 'unique_together': "(('slug', 'project'),)", 'object_name': 'Release'},
+            'created': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'blank': 'True'}),
+            'description': ('django.db.models.fields.CharField', [], {'max_length': '255', 'blank': 'True'}),
+            'develfreeze_date': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'blank': 'True'}),
+            'homepage': ('django.db.models.fields.URLField', [], {'max_length': '200', 'blank': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'long_description': ('django.db.models.fields.TextField', [], {'max_length': '1000', 'blank': 'True'}),
+            'long_description_html': ('django.db.models.fields.TextField', [], {'max_length': '1000', 'blank': 'True'}),
+            'modified': ('django.db.models.fields.DateTimeField', [], {'auto_now': 'True', 'blank': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '50'}),
+            'project': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'releases'", 'to': "orm['projects.Project']"}),
+            'release_date': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'blank': 'True'}),
+            'resources': ('django.db.models.fields.related.ManyToManyField', [], {'related_name': "'releases'", 'symmetrical': 'False', 'to': "orm['resources.Resource']"}),
+            'slug': ('django.db.models.fields.SlugField', [], {'max_length': '30', 'db_index': 'True'}),
+            'stringfreeze_date': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'blank': 'True'})
+        },
+        'resources.importjob': {
+            'Meta': {'ordering': "['-created']", 'object_name': 'ImportJob'},
+            'callback': ('django.db.models.fields.URLField', [], {'max_length': '200', 'null': 'True', 'blank': 'True'}),
+            'created': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'blank': 'True'}),
+            'error': ('django.db.models.fields.TextField', [], {'null': 'True', 'blank': 'True'}),
+            'filename': ('django.db.models.fields.CharField', [], {'max_length': '255', 'blank': 'True'}),
+            'finished': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'blank': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'is_source': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'language': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['languages.Language']"}),
+            'path': ('django.db.models.fields.CharField', [], {'max_length': '255'}),
+            'resource': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'import_jobs'", 'to': "orm['resources.Resource']"}),
+            'status': ('django.db.models.fields.CharField', [], {'default': "'pending'", 'max_length': '10', 'db_index': 'True'}),
+            'strings_added': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'strings_deleted': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'strings_processed': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'strings_total': ('django.db.models.fields.PositiveIntegerField', [], {'null': 'True', 'blank': 'True'}),
+            'strings_updated': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'user': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['auth.User']", 'null': 'True', 'blank': 'True'}),
+            'validation': ('django.db.models.fields.CharField', [], {'max_length': '10', 'null': 'True', 'blank': 'True'}),
+            'validation_report': ('django.db.models.fields.TextField', [], {'null': 'True', 'blank': 'True'})
+        },
+        'resources.projectlanguagestats': {
+            'Meta': {'unique_together': "(('project', 'language'),)", 'object_name': 'ProjectLanguageStats'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'language': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['languages.Language']"}),
+            'last_committer': ('django.db.models.fields.related.ForeignKey', [], {'default': 'None', 'related_name': "'projectlanguagestats_committed'", 'null': 'True', 'to': "orm['auth.User']"}),
+            'last_update': ('django.db.models.fields.DateTimeField', [], {'default': 'None', 'null': 'True'}),
+            'project': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'language_stats'", 'to': "orm['projects.Project']"}),
+            'resources': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'reviewed': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'translated': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'translated_wordcount': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'untranslated': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'})
+        },
+        'resources.projectstats': {
+            'Meta': {'object_name': 'ProjectStats'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'languages': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'last_committer': ('django.db.models.fields.related.ForeignKey', [], {'default': 'None', 'related_name': "'projectstats_committed'", 'null': 'True', 'to': "orm['auth.User']"}),
+            'last_update': ('django.db.models.fields.DateTimeField', [], {'default': 'None', 'null': 'True'}),
+            'project': ('django.db.models.fields.related.OneToOneField', [], {'related_name': "'stats'", 'unique': 'True', 'to': "orm['projects.Project']"}),
+            'resources': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'reviewed': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'total_entities': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'translated': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'wordcount': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'})
+        },
+        'resources.releaselanguagestats': {
+            'Meta': {'unique_together': "(('release', 'project', 'language'),)", 'object_name': 'ReleaseLanguageStats'},
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'language': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['languages.Language']"}),
+            'last_committer': ('django.db.models.fields.related.ForeignKey', [], {'default': 'None', 'related_name': "'releaselanguagestats_committed'", 'null': 'True', 'to': "orm['auth.User']"}),
+            'last_update': ('django.db.models.fields.DateTimeField', [], {'default': 'None', 'null': 'True'}),
+            'project': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'release_language_stats'", 'to': "orm['projects.Project']"}),
+            'release': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'language_stats'", 'to': "orm['releases.Release']"}),
+            'resources': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'reviewed': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'translated': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'translated_wordcount': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'untranslated': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'})
+        },
+        'resources.resource': {
+            'Meta': {'ordering': "('_order',)", 'unique_together': "(('slug', 'project'),)", 'object_name': 'Resource'},
+            '_order': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'accept_translations': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'category': ('django.db.models.fields.CharField', [], {'max_length': '64', 'null': 'True', 'blank': 'True'}),
+            'created': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'blank': 'True'}),
+            'i18n_type': ('django.db.models.fields.CharField', [], {'max_length': '20'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'last_update': ('django.db.models.fields.DateTimeField', [], {'auto_now': 'True', 'blank': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '255'}),
+            'project': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'resources'", 'null': 'True', 'to': "orm['projects.Project']"}),
+            'slug': ('django.db.models.fields.SlugField', [], {'max_length': '200'}),
+            'source_language': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['languages.Language']"}),
+            'total_entities': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'wordcount': ('django.db.models.fields.IntegerField', [], {'default': '0'})
+        },
+        'resources.reviewhistory': {
+            'Meta': {'unique_together': "(('translation_id', 'username', 'created', 'action'),)", 'object_name': 'ReviewHistory'},
+            'action': ('django.db.models.fields.CharField', [], {'max_length': '1'}),
+            'created': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'db_index': 'True', 'blank': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'project_id': ('django.db.models.fields.IntegerField', [], {'db_index': 'True'}),
+            'string': ('django.db.models.fields.TextField', [], {}),
+            'translation_id': ('django.db.models.fields.IntegerField', [], {'null': 'True', 'blank': 'True'}),
+            'username': ('django.db.models.fields.CharField', [], {'db_index': 'True', 'max_length': '50', 'null': 'True', 'blank': 'True'})
+        },
+        'resources.rlstats': {
+            'Meta': {'ordering': "('_order',)", 'unique_together': "(('resource', 'language'),)", 'object_name': 'RLStats'},
+            '_order': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'language': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['languages.Language']"}),
+            'last_committer': ('django.db.models.fields.related.ForeignKey', [], {'default': 'None', 'to': "orm['auth.User']", 'null': 'True'}),
+            'last_update': ('django.db.models.fields.DateTimeField', [], {'default': 'None', 'auto_now': 'True', 'blank': 'True'}),
+            'resource': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['resources.Resource']"}),
+            'reviewed': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'reviewed_perc': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'translated': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'translated_perc': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'translated_wordcount': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'untranslated': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'untranslated_perc': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'})
+        },
+        'resources.sourceentity': {
+            'Meta': {'ordering': "['last_update']", 'unique_together': "(('string_hash', 'context', 'resource'),)", 'object_name': 'SourceEntity'},
+            'context': ('transifex.txcommon.db.models.ListCharField', [], {'default': "''", 'max_length': '255', 'null': 'False', 'blank': 'False'}),
+            'created': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'blank': 'True'}),
+            'developer_comment': ('django.db.models.fields.TextField', [], {'max_length': '1000', 'blank': 'True'}),
+            'developer_comment_extra': ('django.db.models.fields.TextField', [], {'max_length': '1000', 'blank': 'True'}),
+            'flags': ('django.db.models.fields.TextField', [], {'max_length': '100', 'blank': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'last_update': ('django.db.models.fields.DateTimeField', [], {'auto_now': 'True', 'blank': 'True'}),
+            'occurrences': ('django.db.models.fields.TextField', [], {'max_length': '1000', 'null': 'True', 'blank': 'True'}),
+            'order': ('django.db.models.fields.PositiveIntegerField', [], {'null': 'True', 'db_column': "'appearance_order'", 'blank': 'True'}),
+            'pluralized': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'position': ('django.db.models.fields.IntegerField', [], {'null': 'True', 'blank': 'True'}),
+            'resource': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'source_entities'", 'to': "orm['resources.Resource']"}),
+            'string': ('django.db.models.fields.TextField', [], {}),
+            'string_hash': ('django.db.models.fields.CharField', [], {'max_length': '32'})
+        },
+        'resources.template': {
+            'Meta': {'ordering': "['resource']", 'object_name': 'Template'},
+            'content': ('transifex.txcommon.db.models.CompressedTextField', [], {'null': 'False', 'blank': 'False'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'resource': ('django.db.models.fields.related.OneToOneField', [], {'related_name': "'source_file_template'", 'unique': 'True', 'to': "orm['resources.Resource']"})
+        },
+        'resources.translation': {
+            'Meta': {'ordering': "['last_update']", 'unique_together': "(('source_entity', 'language', 'rule'),)", 'object_name': 'Translation'},
+            'created': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'blank': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'language': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['languages.Language']", 'null': 'True'}),
+            'last_update': ('django.db.models.fields.DateTimeField', [], {'auto_now': 'True', 'blank': 'True'}),
+            'origin': ('django.db.models.fields.CharField', [], {'max_length': '20', 'null': 'True'}),
+            'resource': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'+'", 'to': "orm['resources.Resource']"}),
+            'reviewed': ('django.db.models.fields.NullBooleanField', [], {'default': 'False', 'null': 'True', 'blank': 'True'}),
+            'rule': ('django.db.models.fields.IntegerField', [], {'default': '5'}),
+            'source_entity': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'translations'", 'to': "orm['resources.SourceEntity']"}),
+            'string': ('django.db.models.fields.TextField', [], {}),
+            'string_hash': ('django.db.models.fields.CharField', [], {'max_length': '32'}),
+            'user': ('django.db.models.fields.related.ForeignKey', [], {'to': "orm['auth.User']", 'null': 'True'}),
+            'wordcount': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'})
+        }
+    }
+
+    complete_apps = ['resources']
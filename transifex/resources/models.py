@@ -12,6 +12,7 @@ from django.core.cache import cache
 from django.core.validators import validate_slug
 from django.db import models, connection
 from django.db.models import Q, Sum, Max
+from django.db.models.sql import DeleteQuery
 from django.utils.translation import ugettext_lazy as _
 from django.utils.hashcompat import md5_constructor
 from django.utils import simplejson as json
@@ -20,10 +21,11 @@ from django.forms import ValidationError
 from djangobulk.bulk import insert_many, update_many
 from transifex.languages.models import Language
 from transifex.projects.models import Project
+from transifex.projects.access import visible_projects_q
 from transifex.txcommon.db.models import CompressedTextField, \
     ChainerManager, ListCharField
 from transifex.txcommon.log import logger
-from transifex.resources.utils import invalidate_template_cache
+from transifex.txcommon.cache import bump_generation
 from transifex.resources.signals import post_update_rlstats
 from transifex.resources.tasks import check_and_notify_resource_full_reviewed
 from transifex.txcommon.utils import immutable_property
@@ -100,11 +102,7 @@ class ResourceQuerySet(models.query.QuerySet):
         checks permissions and filters out private resources that the user
         doesn't have access to.
         """
-        return Resource.objects.filter(
-            #FIXME: Adding "Project.objects.for_user(user).values('pk').query"
-            # breaks some queries like
-            # RLStats.objects.private(User.objects.get(username="margie")).count()
-            project__in=Project.objects.for_user(user))
+        return self.filter(visible_projects_q(user, 'project__'))
 
 
     def by_project(self, project, include_outsourcing=True):
@@ -237,10 +235,7 @@ class Resource(models.Model):
                 RLStats.objects.get_or_create(resource=self,
                     language=team.language)
 
-        invalidate_template_cache("project_resource_details",
-            self.project.slug, self.slug)
-        invalidate_template_cache("resource_details",
-            self.project.slug, self.slug)
+        bump_generation('resource', self.id)
 
     def delete(self, *args, **kwargs):
         """
@@ -327,7 +322,7 @@ class SourceEntityManager(models.Manager):
         doesn't have access to.
         """
         return SourceEntity.objects.filter(
-            resource__in=Resource.objects.for_user(user))
+            visible_projects_q(user, 'resource__project__'))
 
     def bulk_insert(self, records):
         """Bulk insert records to the database."""
@@ -338,6 +333,20 @@ class SourceEntityManager(models.Manager):
         """Bulk update records to the database."""
         update_many(SourceEntity, records)
 
+    def bulk_delete(self, se_ids, chunk_size=500):
+        """Delete the source entities with the specified ids.
+
+        Their translations are deleted with set-based queries first, so
+        that the ORM does not have to collect them one by one.
+        """
+        se_ids = list(se_ids)
+        for offset in xrange(0, len(se_ids), chunk_size):
+            chunk = se_ids[offset:offset + chunk_size]
+            Translation.objects.bulk_delete(Translation.objects.filter(
+                source_entity__in=chunk
+            ).values_list('id', flat=True))
+            self.filter(id__in=chunk).delete()
+
 
 class SourceEntity(models.Model):
     """
@@ -477,13 +486,12 @@ class TranslationManager(models.Manager):
         # If no target language given search on any target language.
         if target_code:
             language = Language.objects.by_code_or_alias(target_code)
-            results =  self.filter(language=language,
-                resource__project__in=Project.objects.for_user(user),
+            results =  self.filter(visible_projects_q(user, 'resource__project__'),
+                language=language,
                 source_entity__id__in=self.filter(query, language=source_language).values_list(
                     'source_entity', flat=True))
         else:
-            results =  self.filter(
-                resource__project__in=Project.objects.for_user(user),
+            results =  self.filter(visible_projects_q(user, 'resource__project__'),
                 source_entity__id__in=self.filter(query, language=source_language).values_list(
                     'source_entity', flat=True))
         return results
@@ -516,20 +524,14 @@ class TranslationManager(models.Manager):
             language.
         """
         source_language = get_source_language(resources)
-        all_se_ids = frozenset(SourceEntity.objects.filter(
-            resource__in=resources
-        ).values_list('id', flat=True))
-        translated_se_ids = frozenset(self.filter(
+        translated_se_ids = self.filter(
             resource__in=resources, language=language, rule=5
-        ).values_list('source_entity_id', flat=True))
-        untranslated_se_ids = all_se_ids - translated_se_ids
+        ).values('source_entity')
         # Add resource_id as well to reduce the search space
         # by taking advantage of the indexes in resource and language
         return self.filter(
-            resource__in=resources,
-            source_entity__id__in=untranslated_se_ids,
-            language=source_language, rule=5
-        )
+            resource__in=resources, language=source_language, rule=5
+        ).exclude(source_entity__in=translated_se_ids)
 
     def translated_source_strings(self, resources, language):
         """Return the source strings which have been translated in the specified
@@ -544,9 +546,9 @@ class TranslationManager(models.Manager):
             language.
         """
         source_language = get_source_language(resources)
-        translated_se_ids = frozenset(self.filter(
+        translated_se_ids = self.filter(
             resource__in=resources, language=language, rule=5
-        ).values_list('source_entity_id', flat=True))
+        ).values('source_entity')
         # Add resource_id as well to reduce the search space
         # by taking advantage of the indexes in resource and language
         return self.filter(
@@ -568,9 +570,9 @@ class TranslationManager(models.Manager):
             specified language.
         """
         source_language = get_source_language(resources)
-        reviewed_se_ids = frozenset(self.filter(resource__in=resources,
+        reviewed_se_ids = self.filter(resource__in=resources,
             language=language, rule=5, reviewed=True,
-        ).values_list('source_entity_id', flat=True))
+        ).values('source_entity')
 
         return self.filter(
             resource__in=resources,
@@ -591,9 +593,9 @@ class TranslationManager(models.Manager):
             specified language.
         """
         source_language = get_source_language(resources)
-        reviewed_se_ids = frozenset(self.filter(resource__in=resources,
+        reviewed_se_ids = self.filter(resource__in=resources,
             language=language, rule=5, reviewed=False,
-        ).values_list('source_entity_id', flat=True))
+        ).values('source_entity')
 
         return self.filter(
             resource__in=resources,
@@ -615,11 +617,11 @@ class TranslationManager(models.Manager):
             `language` by `users`.
         """
         source_language = get_source_language(resources)
-        user_translated_se_ids = frozenset(self.filter(
+        user_translated_se_ids = self.filter(
             language=language, rule=5,
             user__id__in=users,
             resource__in=resources
-        ).values_list('source_entity_id', flat=True))
+        ).values('source_entity')
         # Add resource_id as well to reduce the search space
         # by taking advantage of the indexes in resource and language
         return self.filter(
@@ -637,6 +639,14 @@ class TranslationManager(models.Manager):
         """Bulk update records to the database."""
         update_many(Translation, records)
 
+    def bulk_delete(self, ids):
+        """Delete the translations with the specified ids.
+
+        Translations have no dependent objects, so they are deleted
+        directly, without being fetched first.
+        """
+        DeleteQuery(Translation).delete_batch(list(ids), self.db)
+
 
 class Translation(models.Model):
     """
@@ -762,8 +772,7 @@ class RLStatsQuerySet(models.query.QuerySet):
         Return a queryset matching projects plus private projects that the
         given user has access to.
         """
-        return self.filter(
-            resource__in=Resource.objects.for_user(user).values('pk').query).distinct()
+        return self.filter(visible_projects_q(user, 'resource__project__'))
 
     def private(self):
         """
@@ -835,52 +844,6 @@ class RLStatsQuerySet(models.query.QuerySet):
         resources = Resource.objects.by_project(project)
         return self.by_language(language).by_resources(resources)
 
-    def by_release_aggregated(self, release):
-        """
-        Aggregate stats for a ``release``.
-
-        RLStats from several resources are grouped by language.
-        """
-        total = Resource.objects.filter(releases=release).aggregate(
-            total=Sum('total_entities'))['total']
-
-        # In order to do grouping by language, we first need to order by
-        # language. We use language__code just to be safe and not depend on the
-        # __unicode__ method of the language object
-        return _aggregate_rlstats(self.by_release(release).order_by('language__code'),
-            'language', total)
-
-    def by_project_language_aggregated(self, project):
-        """Aggregate stats for a ``project`` and group them by language."""
-
-        def as_aggregated_rlstats(cursor):
-            """
-            Yield each row from a cursor as a AggregatedRLStats object.
-            """
-            total = Resource.objects.by_project(project).aggregate(
-                total=Sum('total_entities'))['total']
-                
-            # Create a kwargs var to be passed to AggregatedRLStats init method
-            kwargs = {'total': total}
-            
-            for row in queryset:
-                # Create a fake language object and associate it to the object key
-                kwargs.update({
-                    'object': Language(code=row['language__code'], 
-                        name=row['language__name']),
-                    'last_update': row['last_update'], 
-                    'translated': row['translated']
-                    })
-
-                yield AggregatedRLStats(**kwargs)
-
-        queryset = self.by_project(project).order_by('language__code'
-            ).values('language__code', 'language__name').annotate(
-            translated=Sum('translated')).annotate(
-            last_update=Max('last_update'))
-
-        return as_aggregated_rlstats(queryset)
-
     def by_project_aggregated(self, project, group_by=None):
         """
         Aggregate stats for a ``project``.
@@ -1003,14 +966,21 @@ class RLStats(models.Model):
         ).count()
         self.reviewed = reviewed
 
-    def update(self, user=None, save=True):
+    def recount(self):
         """
-        Update the RLStat object
+        Recalculate all the counters of the RLStat object from the database,
+        without saving it.
         """
         self._calculate_translated()
         self._calculate_reviewed()
         self._calculate_translated_wordcount()
         self._calculate_perc()
+
+    def update(self, user=None, save=True):
+        """
+        Update the RLStat object
+        """
+        self.recount()
         if user:
             self._update_now(user)
         if save:
@@ -1118,3 +1088,324 @@ class ReviewHistory(models.Model):
         elif isinstance(t, models.query.QuerySet):
             for translation in t:
                 cls.add_one(translation, user, project_id, reviewed)
+
+
+class ImportJob(models.Model):
+    """An import of a source or translation file that runs in the background.
+
+    The uploaded file is stored in ``path`` until a worker has imported it.
+    While the job is running, the number of strings saved so far is kept in
+    the cache (see ``progress``), since the import itself runs in a single
+    database transaction.
+    """
+
+    STATUS_CHOICES = (
+        ('pending', _('Pending')),
+        ('running', _('Running')),
+        ('done', _('Done')),
+        ('failed', _('Failed')),
+    )
+
+    resource = models.ForeignKey(Resource, verbose_name=_('Resource'),
+        related_name='import_jobs',
+        help_text=_("The resource the file is imported to."))
+    language = models.ForeignKey(Language, verbose_name=_('Language'),
+        help_text=_("The language of the imported file."))
+    user = models.ForeignKey(User, verbose_name=_('User'),
+        blank=True, null=True,
+        help_text=_("The user that uploaded the file."))
+    is_source = models.BooleanField(_('Source file'), default=False,
+        help_text=_("Whether the file is a source file."))
+    filename = models.CharField(_('Filename'), max_length=255, blank=True,
+        help_text=_("The name of the uploaded file."))
+    path = models.CharField(_('Path'), max_length=255, editable=False,
+        help_text=_("Where the uploaded file is stored until it is "
+                    "imported."))
+    validation = models.CharField(_('Validation'), max_length=10,
+        blank=True, null=True,
+        help_text=_("The validation mode of the translations."))
+    callback = models.URLField(_('Callback URL'), verify_exists=False,
+        blank=True, null=True,
+        help_text=_("A URL to POST the result of the job to, when it "
+                    "finishes."))
+    status = models.CharField(_('Status'), max_length=10,
+        choices=STATUS_CHOICES, default='pending', db_index=True)
+    strings_total = models.PositiveIntegerField(_('Total strings'),
+        blank=True, null=True,
+        help_text=_("The number of strings in the file, if it is known "
+                    "before they are saved."))
+    strings_processed = models.PositiveIntegerField(_('Processed strings'),
+        default=0)
+    strings_added = models.PositiveIntegerField(_('Added strings'),
+        default=0)
+    strings_updated = models.PositiveIntegerField(_('Updated strings'),
+        default=0)
+    strings_deleted = models.PositiveIntegerField(_('Deleted strings'),
+        default=0)
+    validation_report = models.TextField(_('Validation report'),
+        blank=True, null=True, editable=False,
+        help_text=_("The validation report of the translations, in json."))
+    error = models.TextField(_('Error'), blank=True, null=True)
+    created = models.DateTimeField(auto_now_add=True, editable=False)
+    finished = models.DateTimeField(blank=True, null=True, editable=False)
+
+    class Meta:
+        verbose_name = _('Import job')
+        verbose_name_plural = _('Import jobs')
+        ordering = ['-created']
+
+    def __unicode__(self):
+        return u'%s (%s): %s' % (self.resource, self.language.code,
+                                 self.status)
+
+    def _progress_key(self):
+        return 'import_job.%s.progress' % self.id
+
+    @property
+    def progress(self):
+        """The number of strings that have been saved so far."""
+        if self.status == 'running':
+            processed = cache.get(self._progress_key())
+            if processed is not None:
+                return processed
+        return self.strings_processed
+
+    def set_progress(self, processed):
+        """Publish the number of strings that have been saved so far."""
+        self.strings_processed = processed
+        cache.set(self._progress_key(), processed, 24 * 60 * 60)
+
+    def to_dict(self):
+        """Return the state of the job, as the API shows it."""
+        report = None
+        if self.validation_report:
+            report = json.loads(self.validation_report)
+        return {
+            'id': self.id,
+            'resource': self.resource.slug,
+            'language': self.language.code,
+            'status': self.status,
+            'strings_total': self.strings_total,
+            'strings_processed': self.progress,
+            'strings_added': self.strings_added,
+            'strings_updated': self.strings_updated,
+            'strings_deleted': self.strings_deleted,
+            'validation': report,
+            'error': self.error,
+            'created': self.created and self.created.isoformat(),
+            'finished': self.finished and self.finished.isoformat(),
+        }
+
+
+def latest_committers(queryset, fields, latest):
+    """
+    Return the last committer of each group of objects in the ``queryset``.
+
+    Parameters:
+    queryset: The objects, which have last_update and last_committer fields.
+    fields: The fields the objects are grouped by.
+    latest: A dictionary with the latest last_update of each group, keyed by
+        the tuple of the values of ``fields``.
+
+    Returns a dictionary with the id of the committer of the latest change
+    of each group.
+    """
+    committers = {}
+    if not latest:
+        return committers
+    rows = queryset.filter(last_update__in=set(latest.itervalues()),
+        last_committer__isnull=False).order_by().values_list(
+        *(tuple(fields) + ('last_update', 'last_committer')))
+    for row in rows:
+        if latest.get(row[:-2]) == row[-2]:
+            committers[row[:-2]] = row[-1]
+    return committers
+
+
+class RollupQuerySet(models.query.QuerySet):
+
+    def for_user(self, user):
+        """
+        Return a queryset matching the rollups of public projects plus
+        private projects that the given user has access to.
+        """
+        return self.filter(visible_projects_q(user, 'project__'))
+
+    def by_project(self, project):
+        """
+        Return a queryset matching the rollups of a ``project`` and, if it is
+        a hub, of the projects outsourcing their access to it.
+        """
+        query = Q(project=project)
+        if project.is_hub:
+            query |= Q(project__outsource=project)
+        return self.filter(query)
+
+
+class LanguageRollupQuerySet(RollupQuerySet):
+
+    def by_language(self, language):
+        """Return a queryset matching the rollups of a ``language``."""
+        return self.filter(language=language)
+
+    def aggregated(self, total=None):
+        """
+        Sum the rollups of each language, e.g. those of a hub and of its
+        outsourced projects, with a grouped query.
+
+        Parameters:
+        total: The number of source entities the percentages are calculated
+            against. Defaults to the entities counted in the rollups.
+
+        Returns a list of AggregatedRLStats objects, ordered by the code of
+        their language.
+        """
+        rows = list(self.order_by().values('language').annotate(
+            translated=Sum('translated'), untranslated=Sum('untranslated'),
+            reviewed=Sum('reviewed'),
+            translated_wordcount=Sum('translated_wordcount'),
+            number_resources=Sum('resources'),
+            last_update=Max('last_update')))
+        if not rows:
+            return []
+        committers = latest_committers(self, ('language', ), dict(
+            ((row['language'], ), row['last_update']) for row in rows
+            if row['last_update'] is not None))
+        languages = Language.objects.in_bulk([row['language'] for row in rows])
+        users = User.objects.in_bulk(committers.values())
+
+        stats = []
+        for row in rows:
+            language_id = row.pop('language')
+            row['object'] = languages[language_id]
+            row['last_committer'] = users.get(committers.get((language_id, )))
+            if total is None:
+                row['total'] = row['translated'] + row['untranslated']
+            else:
+                row['total'] = total
+            try:
+                row['translated_perc'] = row['translated'] * 100 / row['total']
+            except ZeroDivisionError:
+                row['translated_perc'] = 0
+            row['untranslated_perc'] = 100 - row['translated_perc']
+            stats.append(AggregatedRLStats(**row))
+        stats.sort(key=lambda s: s.object.code)
+        return stats
+
+
+class ReleaseLanguageStatsQuerySet(LanguageRollupQuerySet):
+
+    def by_release(self, release):
+        """Return a queryset matching the rollups of a ``release``."""
+        return self.filter(release=release)
+
+
+class ProjectStatsQuerySet(RollupQuerySet):
+
+    def total_entities(self):
+        """Return the number of source entities of the matching projects."""
+        return self.aggregate(total=Sum('total_entities'))['total'] or 0
+
+
+class LanguageRollup(models.Model):
+    """
+    The sums of the RLStats objects of a set of resources in a language.
+
+    The rollups are maintained by ``transifex.resources.rollups`` whenever
+    the RLStats objects change, so that pages showing the statistics of many
+    resources do not need to sum them on each request.
+    """
+
+    translated = models.PositiveIntegerField(_("Translated Entities"),
+        default=0)
+    untranslated = models.PositiveIntegerField(_("Untranslated Entities"),
+        default=0)
+    reviewed = models.PositiveIntegerField(_("Reviewed Entities"),
+        default=0)
+    translated_wordcount = models.PositiveIntegerField(
+        _("Wordcount for Translated Entities"), default=0)
+    resources = models.PositiveIntegerField(_("Resources"), default=0,
+        help_text=_("The number of resources with statistics in the "
+                    "language."))
+    last_update = models.DateTimeField(_("Last Update"), null=True,
+        default=None)
+    last_committer = models.ForeignKey(User, null=True, default=None,
+        related_name='%(class)s_committed',
+        verbose_name=_('Last Committer'))
+
+    language = models.ForeignKey(Language, verbose_name=_("Language"))
+
+    objects = ChainerManager(LanguageRollupQuerySet)
+
+    class Meta:
+        abstract = True
+
+
+class ProjectLanguageStats(LanguageRollup):
+    """The statistics of the resources of a project in a language."""
+
+    project = models.ForeignKey(Project, verbose_name=_("Project"),
+        related_name='language_stats')
+
+    def __unicode__(self):
+        return u"%s stats for %s" % (self.project_id, self.language_id)
+
+    class Meta:
+        unique_together = ('project', 'language',)
+
+
+class ReleaseLanguageStats(LanguageRollup):
+    """
+    The statistics of the resources of a project in a release in a language.
+
+    The rollups of a release are kept per project, so that the resources of
+    private projects can be left out for the users that have no access to
+    them.
+    """
+
+    release = models.ForeignKey('releases.Release', verbose_name=_("Release"),
+        related_name='language_stats')
+    project = models.ForeignKey(Project, verbose_name=_("Project"),
+        related_name='release_language_stats')
+
+    objects = ChainerManager(ReleaseLanguageStatsQuerySet)
+
+    def __unicode__(self):
+        return u"%s (%s) stats for %s" % (self.release_id, self.project_id,
+                                          self.language_id)
+
+    class Meta:
+        unique_together = ('release', 'project', 'language',)
+
+
+class ProjectStats(models.Model):
+    """The totals of the resources of a project in all languages."""
+
+    project = models.OneToOneField(Project, verbose_name=_("Project"),
+        related_name='stats')
+    resources = models.PositiveIntegerField(_("Resources"), default=0)
+    total_entities = models.PositiveIntegerField(_("Total Entities"),
+        default=0)
+    wordcount = models.PositiveIntegerField(_("Wordcount"), default=0)
+    languages = models.PositiveIntegerField(_("Languages"), default=0,
+        help_text=_("The number of languages with statistics."))
+    translated = models.PositiveIntegerField(_("Translated Entities"),
+        default=0, help_text=_("The number of translated entities in all "
+        "languages."))
+    reviewed = models.PositiveIntegerField(_("Reviewed Entities"),
+        default=0, help_text=_("The number of reviewed entities in all "
+        "languages."))
+    last_update = models.DateTimeField(_("Last Update"), null=True,
+        default=None)
+    last_committer = models.ForeignKey(User, null=True, default=None,
+        related_name='projectstats_committed',
+        verbose_name=_('Last Committer'))
+
+    objects = ChainerManager(ProjectStatsQuerySet)
+
+    def __unicode__(self):
+        return u"%s stats" % self.project_id
+
+
+# Keep the rollups of the statistics up to date.
+from transifex.resources import rollups
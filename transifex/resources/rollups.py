@@ -0,0 +1,434 @@
+# -*- coding: utf-8 -*-
+
+"""
+Rollups of the statistics of projects and releases.
+
+The project, release and team pages show the statistics of all the
+resources of a project or a release per language. Instead of summing their
+RLStats objects on each request, the sums are kept in the
+ProjectLanguageStats, ReleaseLanguageStats and ProjectStats tables. The
+rollups of the projects, releases and languages affected by a change of
+the RLStats objects are recalculated with a few grouped queries (see
+``rollups_changed``).
+
+The RLStats objects saved or deleted one at a time are picked up by signal
+handlers. The code that updates them in bulk calls ``rollups_changed``
+itself. The rollups of the existing statistics are built with
+``rebuild_rollups``.
+"""
+
+import threading
+from functools import wraps
+from django.db import transaction, IntegrityError
+from django.db.models import get_model, Count, Sum, Max
+from django.db.models.signals import post_save, pre_delete, post_delete, \
+        m2m_changed
+from djangobulk.bulk import insert_many, update_many
+from transifex.projects.models import Project
+from transifex.resources.models import Resource, RLStats, \
+        ProjectLanguageStats, ReleaseLanguageStats, ProjectStats, \
+        latest_committers
+
+_local = threading.local()
+
+ROLLUP_FIELDS = (
+    'translated', 'untranslated', 'reviewed', 'translated_wordcount',
+    'resources', 'last_update', 'last_committer_id',
+)
+
+
+def _release_resources():
+    """Return the model of the resources of the releases."""
+    return get_model('releases', 'Release').resources.through
+
+
+def _merge(pending, ids, language_ids):
+    """Record that the rollups of some objects have to be recalculated for
+    some languages. None stands for all languages.
+    """
+    for id_ in ids:
+        if language_ids is None:
+            pending[id_] = None
+        elif id_ not in pending:
+            pending[id_] = set(language_ids)
+        elif pending[id_] is not None:
+            pending[id_].update(language_ids)
+
+
+def _by_languages(pending):
+    """Group the ids of the pending objects by the languages to recalculate,
+    so that objects with the same languages are recalculated together.
+    """
+    groups = {}
+    for id_, language_ids in pending.iteritems():
+        if language_ids is not None:
+            language_ids = frozenset(language_ids)
+        groups.setdefault(language_ids, []).append(id_)
+    return groups.iteritems()
+
+
+class RollupBatch(object):
+    """Collect the rollups that have to be recalculated and recalculate
+    each of them once.
+
+    While a batch is active in a thread (see ``defer_rollups``),
+    ``rollups_changed`` only records the resources and the languages it is
+    called for.
+    """
+
+    def __init__(self):
+        self._resources = {}
+        self._projects = {}
+        self._releases = {}
+
+    def add_resources(self, resource_ids, language_ids=None):
+        """Record that the statistics of some resources changed."""
+        _merge(self._resources, resource_ids, language_ids)
+
+    def add(self, project_ids, release_ids, language_ids=None):
+        """Record that the rollups of some projects and releases have to be
+        recalculated.
+        """
+        _merge(self._projects, project_ids, language_ids)
+        _merge(self._releases, release_ids, language_ids)
+
+    def flush(self):
+        """Recalculate the recorded rollups."""
+        resources, self._resources = self._resources, {}
+        projects, self._projects = self._projects, {}
+        releases, self._releases = self._releases, {}
+        if resources:
+            for resource_id, project_id in Resource.objects.filter(
+                    id__in=resources.keys()
+                ).values_list('id', 'project').order_by():
+                _merge(projects, [project_id], resources[resource_id])
+            for resource_id, release_id in _release_resources().objects.filter(
+                    resource__in=resources.keys()
+                ).values_list('resource', 'release'):
+                _merge(releases, [release_id], resources[resource_id])
+        for language_ids, project_ids in _by_languages(projects):
+            refresh_project_rollups(project_ids, language_ids)
+        for language_ids, release_ids in _by_languages(releases):
+            refresh_release_rollups(release_ids, language_ids)
+
+
+def defer_rollups(func):
+    """Decorator to recalculate the rollups affected by a function once,
+    when it returns.
+
+    Nested calls are deferred to the outermost one.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(_local, 'batch', None) is not None:
+            return func(*args, **kwargs)
+        _local.batch = RollupBatch()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            batch, _local.batch = _local.batch, None
+            batch.flush()
+    return wrapper
+
+
+@defer_rollups
+def rollups_changed(resource_ids, language_ids=None):
+    """Recalculate the rollups affected by a change of the statistics of
+    some resources.
+
+    Args:
+        resource_ids: The ids of the resources.
+        language_ids: The ids of the languages the statistics of which
+            changed. None stands for all languages and an empty list for
+            none, e.g. when just the number of entities of the resources
+            changed.
+    """
+    _local.batch.add_resources(resource_ids, language_ids)
+
+
+@defer_rollups
+def _scopes_changed(project_ids, release_ids, language_ids=None):
+    """Recalculate the rollups of some projects and releases."""
+    _local.batch.add(project_ids, release_ids, language_ids)
+
+
+def _sums(rlstats):
+    """Return the sums of the RLStats objects per project and language.
+
+    Returns:
+        A dictionary with the values of the fields of the rollups, keyed by
+        (project id, language id) tuples.
+    """
+    fields = ('resource__project', 'language')
+    sums = {}
+    for row in rlstats.order_by().values(*fields).annotate(
+            translated=Sum('translated'), untranslated=Sum('untranslated'),
+            reviewed=Sum('reviewed'),
+            translated_wordcount=Sum('translated_wordcount'),
+            resources=Count('id'), last_update=Max('last_update')):
+        sums[(row.pop('resource__project'), row.pop('language'))] = row
+    committers = latest_committers(rlstats, fields, dict(
+        (key, row['last_update']) for key, row in sums.iteritems()
+        if row['last_update'] is not None
+    ))
+    for key, row in sums.iteritems():
+        row['last_committer_id'] = committers.get(key)
+    return sums
+
+
+def _insert(model, rollups, keys):
+    """Insert new rollups with a bulk insert.
+
+    A concurrent refresh of the same scope may have inserted some of them
+    in the meantime. In that case, they are inserted one by one and those
+    that exist already are updated instead.
+
+    Args:
+        model: The model of the rollups.
+        rollups: The unsaved rollups.
+        keys: The names of the fields the rollups are unique by.
+    """
+    if not rollups:
+        return
+    sid = transaction.savepoint()
+    try:
+        insert_many(model, rollups)
+    except IntegrityError:
+        transaction.savepoint_rollback(sid)
+        for rollup in rollups:
+            _insert_one(model, rollup, keys)
+    else:
+        transaction.savepoint_commit(sid)
+
+
+def _insert_one(model, rollup, keys):
+    """Insert a rollup or update the existing one with the same keys."""
+    sid = transaction.savepoint()
+    try:
+        rollup.save(force_insert=True)
+    except IntegrityError:
+        transaction.savepoint_rollback(sid)
+        values = dict(
+            (f.attname, getattr(rollup, f.attname))
+            for f in model._meta.fields
+            if not f.primary_key and f.attname not in keys
+        )
+        model.objects.filter(
+            **dict((k, getattr(rollup, k)) for k in keys)
+        ).update(**values)
+    else:
+        transaction.savepoint_commit(sid)
+
+
+def _write(model, rollups, sums, **fields):
+    """Make the existing ``rollups`` match the ``sums`` of the RLStats
+    objects, with bulk updates and inserts.
+
+    Args:
+        model: The model of the rollups.
+        rollups: The existing rollups that were recalculated.
+        sums: The values of the rollups, as ``_sums`` returns them.
+        fields: The values of the fields common to all new rollups.
+    """
+    to_update, to_create, stale = [], [], []
+    for rollup in rollups.order_by().iterator():
+        values = sums.pop((rollup.project_id, rollup.language_id), None)
+        if values is None:
+            stale.append(rollup.id)
+            continue
+        for f in ROLLUP_FIELDS:
+            setattr(rollup, f, values[f])
+        to_update.append(rollup)
+    for (project_id, language_id), values in sums.iteritems():
+        rollup = model(project_id=project_id, language_id=language_id,
+                       **fields)
+        for f in ROLLUP_FIELDS:
+            setattr(rollup, f, values[f])
+        to_create.append(rollup)
+    update_many(model, to_update)
+    _insert(model, to_create, ('project_id', 'language_id') + tuple(fields))
+    if stale:
+        model.objects.filter(id__in=stale).delete()
+
+
+def refresh_project_rollups(project_ids, language_ids=None):
+    """Recalculate the rollups of some projects.
+
+    Args:
+        project_ids: The ids of the projects.
+        language_ids: The ids of the languages to recalculate. None stands
+            for all languages and an empty list for none, in which case
+            just the totals of the projects are recalculated.
+    """
+    project_ids = list(Project.objects.filter(
+        id__in=project_ids
+    ).values_list('id', flat=True))
+    if not project_ids:
+        return
+    if language_ids is None or language_ids:
+        rlstats = RLStats.objects.filter(resource__project__in=project_ids)
+        rollups = ProjectLanguageStats.objects.filter(project__in=project_ids)
+        if language_ids is not None:
+            rlstats = rlstats.filter(language__in=language_ids)
+            rollups = rollups.filter(language__in=language_ids)
+        _write(ProjectLanguageStats, rollups, _sums(rlstats))
+    _refresh_project_stats(project_ids)
+
+
+def _refresh_project_stats(project_ids):
+    """Recalculate the totals of some projects from their resources and
+    their rollups per language.
+    """
+    resources = dict(
+        (row.pop('project'), row) for row in Resource.objects.filter(
+            project__in=project_ids
+        ).order_by().values('project').annotate(
+            resources=Count('id'), total_entities=Sum('total_entities'),
+            wordcount=Sum('wordcount')
+        )
+    )
+    rollups = ProjectLanguageStats.objects.filter(project__in=project_ids)
+    languages = dict(
+        (row.pop('project'), row) for row in rollups.order_by().values(
+            'project'
+        ).annotate(
+            languages=Count('id'), translated=Sum('translated'),
+            reviewed=Sum('reviewed'), last_update=Max('last_update')
+        )
+    )
+    committers = latest_committers(rollups, ('project', ), dict(
+        ((project_id, ), row['last_update'])
+        for project_id, row in languages.iteritems()
+        if row['last_update'] is not None
+    ))
+
+    existing = dict(
+        (stats.project_id, stats)
+        for stats in ProjectStats.objects.filter(project__in=project_ids)
+    )
+    to_update, to_create = [], []
+    for project_id in project_ids:
+        stats = existing.get(project_id)
+        if stats is None:
+            stats = ProjectStats(project_id=project_id)
+            to_create.append(stats)
+        else:
+            to_update.append(stats)
+        values = {
+            'resources': 0, 'total_entities': 0, 'wordcount': 0,
+            'languages': 0, 'translated': 0, 'reviewed': 0,
+            'last_update': None,
+        }
+        values.update(resources.get(project_id, {}))
+        values.update(languages.get(project_id, {}))
+        values['last_committer_id'] = committers.get((project_id, ))
+        for f, value in values.iteritems():
+            setattr(stats, f, value)
+    update_many(ProjectStats, to_update)
+    _insert(ProjectStats, to_create, ('project_id', ))
+
+
+def refresh_release_rollups(release_ids, language_ids=None):
+    """Recalculate the rollups of some releases.
+
+    Args:
+        release_ids: The ids of the releases.
+        language_ids: The ids of the languages to recalculate. None stands
+            for all languages.
+    """
+    if language_ids is not None and not language_ids:
+        return
+    Release = get_model('releases', 'Release')
+    for release_id in Release.objects.filter(
+            id__in=release_ids
+        ).values_list('id', flat=True):
+        rlstats = RLStats.objects.filter(
+            resource__in=_release_resources().objects.filter(
+                release=release_id
+            ).values('resource')
+        )
+        rollups = ReleaseLanguageStats.objects.filter(release=release_id)
+        if language_ids is not None:
+            rlstats = rlstats.filter(language__in=language_ids)
+            rollups = rollups.filter(language__in=language_ids)
+        _write(ReleaseLanguageStats, rollups, _sums(rlstats),
+               release_id=release_id)
+
+
+def rebuild_rollups():
+    """Recalculate the rollups of all projects and releases.
+
+    Returns:
+        A tuple with the number of projects and the number of releases.
+    """
+    Release = get_model('releases', 'Release')
+    project_ids = list(Project.objects.values_list('id', flat=True))
+    release_ids = list(Release.objects.values_list('id', flat=True))
+    for project_id in project_ids:
+        refresh_project_rollups([project_id])
+    refresh_release_rollups(release_ids)
+    return len(project_ids), len(release_ids)
+
+
+def on_rlstats_change(sender, instance, **kwargs):
+    """Recalculate the rollups of the language of a RLStats object, when
+    it is saved or deleted.
+    """
+    rollups_changed([instance.resource_id], [instance.language_id])
+
+
+def on_resource_save(sender, instance, **kwargs):
+    """Recalculate the totals of the project of a resource, when it is
+    saved.
+    """
+    rollups_changed([instance.id], [])
+
+
+def on_resource_pre_delete(sender, instance, **kwargs):
+    """Remember the releases of a resource, since they are removed before
+    the resource is.
+    """
+    instance._rollup_release_ids = list(
+        _release_resources().objects.filter(
+            resource=instance.pk
+        ).values_list('release', flat=True)
+    )
+
+
+def on_resource_post_delete(sender, instance, **kwargs):
+    """Recalculate the rollups of the project and the releases of a
+    deleted resource.
+    """
+    _scopes_changed(
+        [instance.project_id], getattr(instance, '_rollup_release_ids', [])
+    )
+
+
+def on_release_resources_change(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    """Recalculate the rollups of the releases the resources of which
+    changed.
+    """
+    if sender is not _release_resources():
+        return
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _scopes_changed([], [instance.pk])
+    elif action == 'pre_clear':
+        instance._rollup_cleared_release_ids = list(
+            instance.releases.values_list('id', flat=True)
+        )
+    elif action == 'post_clear':
+        _scopes_changed(
+            [], getattr(instance, '_rollup_cleared_release_ids', [])
+        )
+    elif action in ('post_add', 'post_remove'):
+        _scopes_changed([], pk_set or [])
+
+
+post_save.connect(on_rlstats_change, sender=RLStats)
+post_delete.connect(on_rlstats_change, sender=RLStats)
+post_save.connect(on_resource_save, sender=Resource)
+pre_delete.connect(on_resource_pre_delete, sender=Resource)
+post_delete.connect(on_resource_post_delete, sender=Resource)
+m2m_changed.connect(on_release_resources_change)
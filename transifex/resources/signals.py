@@ -4,3 +4,4 @@ from django.dispatch import Signal
 
 post_save_translation = Signal()
 post_update_rlstats = Signal()
+post_import_job = Signal()
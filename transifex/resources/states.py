@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""
+Indexes of the translation states of the strings of a resource.
+
+The state index of a resource in a language holds which of the source
+strings of the resource have been translated and reviewed, as bitmaps over
+the source strings ordered by id. The bitmaps are python longs, so that the
+filters are combined with bitwise operations and the matching strings are
+counted and paged in memory, without sending lists of ids to the database.
+
+The indexes are cached per revision of the resource (see
+``resource_revision``), so any change to the strings of a resource makes
+its indexes be rebuilt, with two queries, the next time they are used.
+"""
+
+from array import array
+from django.core.cache import cache
+from django.db.models import get_model
+from transifex.resources.utils import resource_revision
+
+
+# How long an index is kept in the cache, in seconds.
+INDEX_TIMEOUT = 24 * 60 * 60
+
+
+def _bitmap(positions, size):
+    """Return a bitmap of the specified size with the bits at the
+    specified positions set.
+    """
+    bits = ['0'] * size
+    for position in positions:
+        bits[position] = '1'
+    bits.reverse()
+    return long(''.join(bits) or '0', 2)
+
+
+def _positions(bitmap):
+    """Return the positions of the set bits of a bitmap, in ascending
+    order.
+    """
+    # The binary representation of the bitmap, with the least
+    # significant bit first and without the '0b' prefix.
+    bits = bin(bitmap)[:1:-1]
+    positions = []
+    position = bits.find('1')
+    while position != -1:
+        positions.append(position)
+        position = bits.find('1', position + 1)
+    return positions
+
+
+class StateIndex(object):
+    """The translation states of the source strings of a resource in a
+    language.
+
+    The states a filter can select are:
+        'all': All source strings.
+        'translated': The strings that have been translated.
+        'untranslated': The strings that have not been translated.
+        'reviewed': The strings that have been translated and reviewed.
+        'unreviewed': The strings that have been translated, but have not
+            been reviewed.
+
+    Attributes:
+        ids: The ids of the source strings (the Translation objects in the
+            source language with rule 5), in ascending order.
+        translated: The bitmap of the translated strings. The bit at each
+            position refers to the string in the same position of ``ids``.
+        reviewed: The bitmap of the reviewed strings.
+    """
+
+    def __init__(self, ids, translated, reviewed):
+        self.ids = ids
+        self.translated = translated
+        self.reviewed = reviewed
+
+    @classmethod
+    def build(cls, resource, language):
+        """Construct the index of a resource in a language."""
+        Translation = get_model('resources', 'Translation')
+        ids = array('l')
+        positions = {}
+        source_strings = Translation.objects.filter(
+            resource=resource, language=resource.source_language_id, rule=5
+        ).order_by('id').values_list('id', 'source_entity_id')
+        for position, (id_, se_id) in enumerate(source_strings.iterator()):
+            ids.append(id_)
+            positions[se_id] = position
+
+        translated, reviewed = [], []
+        translations = Translation.objects.filter(
+            resource=resource, language=language, rule=5
+        ).values_list('source_entity_id', 'reviewed')
+        for se_id, is_reviewed in translations.iterator():
+            position = positions.get(se_id)
+            if position is None:
+                continue
+            translated.append(position)
+            if is_reviewed:
+                reviewed.append(position)
+        return cls(
+            ids, _bitmap(translated, len(ids)), _bitmap(reviewed, len(ids))
+        )
+
+    def mask(self, *states):
+        """Return the bitmap of the strings in any of the specified states."""
+        everything = (1L << len(self.ids)) - 1
+        masks = {
+            'all': everything,
+            'translated': self.translated,
+            'untranslated': everything & ~self.translated,
+            'reviewed': self.reviewed,
+            'unreviewed': self.translated & ~self.reviewed,
+        }
+        result = 0L
+        for state in states:
+            result |= masks[state]
+        return result
+
+    def count(self, *states):
+        """Return the number of the strings in any of the specified
+        states.
+        """
+        return bin(self.mask(*states)).count('1')
+
+    def select(self, *states):
+        """Return the ids of the strings in any of the specified states, in
+        ascending order.
+        """
+        ids = self.ids
+        return [ids[p] for p in _positions(self.mask(*states))]
+
+
+def _index_key(resource, language):
+    return 'state_index.%s.%s.%s' % (
+        resource.id, language.id, resource_revision(resource.id)
+    )
+
+
+def get_state_index(resource, language):
+    """Return the state index of a resource in a language.
+
+    The index is fetched from the cache, if the resource has not changed
+    since it was built. Otherwise, it is built and stored.
+    """
+    key = _index_key(resource, language)
+    index = cache.get(key)
+    if index is None:
+        index = StateIndex.build(resource, language)
+        cache.set(key, index, INDEX_TIMEOUT)
+    return index
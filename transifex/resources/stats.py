@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+
+"""
+Incremental maintenance of the RLStats objects.
+
+Instead of recounting the statistics of a resource from scratch each time
+a string changes, the code that changes the strings records the changes in
+a ``StatsDelta`` object, which is then applied to the RLStats objects with
+atomic updates. The mode is enabled with the ``INCREMENTAL_STATS`` setting.
+
+Since the counters are not recalculated anymore, ``reconcile_rlstats``
+should run periodically to check them against a full recount.
+"""
+
+import datetime
+from django.conf import settings
+from django.db.models import F, Count, Sum
+from djangobulk.bulk import insert_many, update_many
+from transifex.txcommon.log import logger
+from transifex.txcommon.utils import queryset_iterator
+from transifex.resources.models import Resource, RLStats, SourceEntity, \
+        Translation
+from transifex.resources.signals import post_update_rlstats
+from transifex.resources.rollups import defer_rollups, rollups_changed
+from transifex.teams.models import Team
+
+
+def incremental_stats_enabled():
+    """Return whether the statistics are maintained incrementally."""
+    return getattr(settings, 'INCREMENTAL_STATS', False)
+
+
+class StatsDelta(object):
+    """Accumulate the changes to the statistics of a resource.
+
+    For each language there are three counters: the number of translated
+    entities, the number of reviewed entities and the translated wordcount.
+    The ``total`` counter holds the change of the number of source entities,
+    which affects the untranslated entities of all languages.
+
+    All counters refer to translations of the ``other`` plural rule only,
+    like the RLStats objects do.
+    """
+
+    def __init__(self, resource, chunk_size=500):
+        self.resource = resource
+        self.chunk_size = chunk_size
+        self.enabled = incremental_stats_enabled()
+        self.total = 0
+        self._deltas = {}
+
+    def __nonzero__(self):
+        return bool(self.total or self._deltas)
+
+    def __getitem__(self, language_id):
+        return self._deltas.get(language_id, (0, 0, 0))
+
+    def add(self, language_id, translated=0, reviewed=0, wordcount=0):
+        """Add a change to the counters of a language."""
+        if not (translated or reviewed or wordcount):
+            return
+        t, r, w = self[language_id]
+        self._deltas[language_id] = (
+            t + translated, r + reviewed, w + wordcount
+        )
+
+    def touch(self, language_id):
+        """Mark the statistics of a language as updated, even if none of
+        its counters has changed.
+        """
+        self._deltas.setdefault(language_id, (0, 0, 0))
+
+    def merge(self, other):
+        """Add the changes of another StatsDelta object of the same
+        resource to this one.
+        """
+        self.total += other.total
+        for language_id, (t, r, w) in other._deltas.iteritems():
+            self.touch(language_id)
+            self.add(language_id, translated=t, reviewed=r, wordcount=w)
+
+    def _chunks(self, items):
+        items = list(items)
+        for offset in xrange(0, len(items), self.chunk_size):
+            yield items[offset:offset + self.chunk_size]
+
+    def source_wordcounts(self, se_ids):
+        """Return a dictionary with the wordcount of the source strings of
+        the specified source entities.
+
+        The wordcount of a pluralized entity is the sum of the wordcounts
+        of all its plural forms, as in a full recount.
+        """
+        wordcounts = {}
+        for chunk in self._chunks(se_ids):
+            rows = Translation.objects.filter(
+                source_entity__in=chunk,
+                language=self.resource.source_language
+            ).values_list('source_entity_id', 'wordcount').iterator()
+            for se_id, wordcount in rows:
+                wordcounts[se_id] = wordcounts.get(se_id, 0) + wordcount
+        return wordcounts
+
+    def add_translated(self, language_id, se_ids):
+        """Record that the specified source entities have been translated
+        in a language.
+        """
+        if not self.enabled:
+            return
+        se_ids = list(se_ids)
+        wordcounts = self.source_wordcounts(se_ids)
+        self.add(
+            language_id, translated=len(se_ids),
+            wordcount=sum(wordcounts.get(se_id, 0) for se_id in se_ids)
+        )
+
+    def remove_translations(self, translations):
+        """Record that the translations of a queryset are going to be
+        deleted.
+
+        This must be called before the translations are actually deleted.
+        """
+        if not self.enabled:
+            return
+        rows = list(translations.filter(rule=5).values_list(
+            'language_id', 'source_entity_id', 'reviewed'
+        ).iterator())
+        wordcounts = self.source_wordcounts(set(r[1] for r in rows))
+        for language_id, se_id, reviewed in rows:
+            self.add(
+                language_id, translated=-1, reviewed=reviewed and -1 or 0,
+                wordcount=-wordcounts.get(se_id, 0)
+            )
+
+    def remove_entities(self, se_ids):
+        """Record that the specified source entities are going to be
+        deleted along with their translations.
+        """
+        se_ids = list(se_ids)
+        self.total -= len(se_ids)
+        if not self.enabled:
+            return
+        for chunk in self._chunks(se_ids):
+            self.remove_translations(
+                Translation.objects.filter(source_entity__in=chunk)
+            )
+
+    def review_translations(self, translations, reviewed):
+        """Record that the reviewed flag of the translations of a queryset
+        is going to be set to ``reviewed``.
+        """
+        if not self.enabled:
+            return
+        language_ids = translations.filter(rule=5).exclude(
+            reviewed=reviewed
+        ).values_list('language_id', flat=True).iterator()
+        for language_id in language_ids:
+            self.add(language_id, reviewed=reviewed and 1 or -1)
+
+    def change_source_wordcounts(self, changes):
+        """Record that the wordcount of some source strings has changed.
+
+        This must be called after the source strings are saved, so that
+        the new ones count for the source language, too.
+
+        Args:
+            changes: A dictionary which maps source entity ids to the change
+                of the wordcount of their source strings, over all plural
+                forms.
+        """
+        if not self.enabled:
+            return
+        changes = dict((k, v) for k, v in changes.iteritems() if v)
+        for chunk in self._chunks(changes.keys()):
+            rows = Translation.objects.filter(
+                source_entity__in=chunk, rule=5
+            ).values_list('language_id', 'source_entity_id').iterator()
+            for language_id, se_id in rows:
+                self.add(language_id, wordcount=changes[se_id])
+
+    def apply(self, user=None):
+        """Apply the changes to the RLStats objects of the resource.
+
+        The counters are updated with a single atomic UPDATE per language.
+        Languages that have no RLStats object yet get a new one, which is
+        calculated from scratch.
+
+        Returns:
+            A list with the RLStats objects that have been updated.
+        """
+        if not self:
+            return []
+        if self.total:
+            language_ids = set(RLStats.objects.filter(
+                resource=self.resource
+            ).values_list('language_id', flat=True))
+        else:
+            language_ids = set()
+        language_ids.update(self._deltas.iterkeys())
+
+        created_ids = set()
+        for language_id in language_ids:
+            translated, reviewed, wordcount = self[language_id]
+            rows = RLStats.objects.filter(
+                resource=self.resource, language=language_id
+            ).update(
+                translated=F('translated') + translated,
+                untranslated=F('untranslated') + (self.total - translated),
+                reviewed=F('reviewed') + reviewed,
+                translated_wordcount=F('translated_wordcount') + wordcount
+            )
+            if not rows:
+                # The new object is calculated from the database, which
+                # already contains the changes.
+                RLStats.objects.create(
+                    resource=self.resource, language_id=language_id
+                )
+                created_ids.add(language_id)
+
+        now = datetime.datetime.now()
+        rlstats = list(RLStats.objects.select_related('language').filter(
+            resource=self.resource, language__in=language_ids
+        ))
+        for rl in rlstats:
+            values = {'last_update': now}
+            if user:
+                values['last_committer'] = user
+            if rl.language_id not in created_ids:
+                rl._calculate_perc()
+                values.update({
+                    'translated_perc': rl.translated_perc,
+                    'untranslated_perc': rl.untranslated_perc,
+                    'reviewed_perc': rl.reviewed_perc,
+                })
+            RLStats.objects.filter(pk=rl.pk).update(**values)
+            for field, value in values.iteritems():
+                setattr(rl, field, value)
+            post_update_rlstats.send_robust(sender=rl)
+        self.total = 0
+        self._deltas = {}
+        return rlstats
+
+
+@defer_rollups
+def reconcile_rlstats(queryset=None):
+    """Check the counters of RLStats objects against a full recount.
+
+    Any object whose counters have drifted is corrected and logged.
+
+    Args:
+        queryset: The RLStats objects to check. Defaults to all of them.
+    Returns:
+        The number of objects that have been corrected.
+    """
+    if queryset is None:
+        queryset = RLStats.objects.all()
+    if not queryset.exists():
+        return 0
+    fields = (
+        'translated', 'untranslated', 'reviewed', 'translated_wordcount',
+        'translated_perc', 'untranslated_perc', 'reviewed_perc',
+    )
+    fixed = 0
+    for rl in queryset_iterator(queryset.select_related('resource')):
+        stored = [getattr(rl, f) for f in fields]
+        rl.recount()
+        if stored != [getattr(rl, f) for f in fields]:
+            logger.warning(
+                "Statistics of resource %s in language %s drifted: %s" % (
+                    rl.resource_id, rl.language_id, dict(zip(fields, stored))
+                )
+            )
+            RLStats.objects.filter(pk=rl.pk).update(
+                **dict((f, getattr(rl, f)) for f in fields)
+            )
+            rollups_changed([rl.resource_id], [rl.language_id])
+            fixed += 1
+    return fixed
+
+
+def _grouped(queryset, fields, aggregate):
+    """Return a dictionary with the value of the aggregate for each group
+    of the queryset.
+
+    The default ordering of the queryset is removed, so that it does not
+    end up in the GROUP BY clause.
+    """
+    rows = queryset.order_by().values(*fields).annotate(value=aggregate)
+    return dict(
+        (tuple(row[f] for f in fields), row['value'] or 0) for row in rows
+    )
+
+
+@defer_rollups
+def recount_resources(resources, batch_size=100):
+    """Recalculate the statistics of many resources at once.
+
+    Instead of querying each (resource, language) pair separately, the
+    counters of a batch of resources are calculated with a few grouped
+    queries and written back with bulk updates. No ``post_update_rlstats``
+    signal is sent for the recalculated objects. The rollups of their
+    projects and releases are recalculated once, when all batches are done.
+
+    Args:
+        resources: An iterable of Resource objects, preferably with their
+            project selected too.
+        batch_size: The number of resources to recalculate at once.
+    Returns:
+        The number of (resource, language) pairs recalculated.
+    """
+    resources = list(resources)
+    pairs = 0
+    for offset in xrange(0, len(resources), batch_size):
+        pairs += _recount_batch(resources[offset:offset + batch_size])
+    return pairs
+
+
+def _recount_batch(resources):
+    """Recalculate the statistics of a batch of resources."""
+    ids = [r.id for r in resources]
+    translations = Translation.objects.filter(resource__in=ids)
+    totals = _grouped(
+        SourceEntity.objects.filter(resource__in=ids), ('resource', ),
+        Count('id')
+    )
+    wordcounts = _grouped(
+        translations.filter(language=F('resource__source_language')),
+        ('resource', ), Sum('wordcount')
+    )
+    languages = {}
+    for r_id, language_id in _grouped(
+            translations, ('resource', 'language'), Count('id')):
+        languages.setdefault(r_id, set()).add(language_id)
+    translated = _grouped(
+        translations.filter(rule=5), ('resource', 'language'), Count('id')
+    )
+    reviewed = _grouped(
+        translations.filter(rule=5, reviewed=True),
+        ('resource', 'language'), Count('id')
+    )
+    translated_wordcounts = _grouped(
+        translations.filter(
+            rule=5,
+            source_entity__translations__language=F(
+                'resource__source_language'
+            )
+        ), ('resource', 'language'),
+        Sum('source_entity__translations__wordcount')
+    )
+
+    team_projects = dict(
+        (r.id, r.project.outsource_id or r.project_id) for r in resources
+    )
+    team_languages = {}
+    for project_id, language_id in Team.objects.filter(
+            project__in=set(team_projects.itervalues())
+        ).values_list('project', 'language').iterator():
+        team_languages.setdefault(project_id, set()).add(language_id)
+
+    existing = {}
+    # The position of the new objects of each resource for the
+    # ``order_with_respect_to`` option, since they are not saved one by one.
+    orders = {}
+    for rl in RLStats.objects.filter(resource__in=ids).order_by().iterator():
+        existing[(rl.resource_id, rl.language_id)] = rl
+        orders[rl.resource_id] = max(
+            orders.get(rl.resource_id, 0), rl._order + 1
+        )
+
+    now = datetime.datetime.now()
+    to_update, to_create = [], []
+    for r in resources:
+        total = totals.get((r.id, ), 0)
+        wordcount = wordcounts.get((r.id, ), 0)
+        if (r.total_entities, r.wordcount) != (total, wordcount):
+            Resource.objects.filter(pk=r.pk).update(
+                total_entities=total, wordcount=wordcount
+            )
+        language_ids = languages.get(r.id, set())
+        language_ids.update(team_languages.get(team_projects[r.id], ()))
+        for language_id in language_ids:
+            key = (r.id, language_id)
+            rl = existing.pop(key, None)
+            if rl is None:
+                rl = RLStats(
+                    resource_id=r.id, language_id=language_id,
+                    last_update=now
+                )
+                rl._order = orders.get(r.id, 0)
+                orders[r.id] = rl._order + 1
+                to_create.append(rl)
+            else:
+                to_update.append(rl)
+            rl.translated = translated.get(key, 0)
+            rl.untranslated = total - rl.translated
+            rl.reviewed = reviewed.get(key, 0)
+            rl.translated_wordcount = translated_wordcounts.get(key, 0)
+            rl._calculate_perc()
+
+    # Objects of languages without any translations or a team are stale,
+    # except for the source language.
+    source_languages = dict((r.id, r.source_language_id) for r in resources)
+    stale = [
+        rl.id for rl in existing.itervalues()
+        if rl.language_id != source_languages[rl.resource_id]
+    ]
+    update_many(RLStats, to_update)
+    insert_many(RLStats, to_create)
+    if stale:
+        RLStats.objects.filter(id__in=stale).delete()
+    rollups_changed(ids)
+    return len(to_update) + len(to_create)
@@ -83,3 +83,129 @@ def send_notices_for_resource_edited(resource, user):
     post_resource_save.send(
         sender=None, instance=resource, created=False, user=user
     )
+
+
+@task(name='reconcile_rlstats', ignore_result=True)
+def reconcile_rlstats():
+    """
+    Check the incrementally maintained statistics against a full recount.
+    """
+    from transifex.resources.stats import reconcile_rlstats as reconcile
+    fixed = reconcile()
+    logger.info("resources: Reconciled the statistics of %s objects." % fixed)
+
+
+@task(name='invalidate_stats', ignore_result=True)
+def invalidate_stats(resource_id, language_id, user_id=None):
+    """
+    Invalidate the statistics of a resource in a language, once per
+    STATS_INVALIDATION_DELAY window.
+    """
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from transifex.resources.handlers import invalidate_stats_cache
+    Resource = get_model('resources', 'Resource')
+    Language = get_model('languages', 'Language')
+    # Changes after this point schedule a new task.
+    cache.delete('stats_invalidation.%s.%s' % (resource_id, language_id))
+    try:
+        resource = Resource.objects.select_related('project').get(
+            pk=resource_id
+        )
+        language = Language.objects.get(pk=language_id)
+    except (Resource.DoesNotExist, Language.DoesNotExist):
+        return
+    user = None
+    if user_id is not None:
+        user = User.objects.filter(pk=user_id)
+        user = user and user[0] or None
+    invalidate_stats_cache(resource, language, user=user)
+
+
+@task(name='run_import_job', ignore_result=True, max_retries=3)
+def run_import_job(job_id):
+    """
+    Import the file of an ImportJob and record the result in the job.
+    """
+    import datetime
+    import os
+    from django.core.cache import cache
+    from django.utils import simplejson as json
+    from transifex.resources.backends import FormatsBackend
+    from transifex.resources.signals import post_import_job
+    from transifex.projects.signals import post_submit_translation
+    ImportJob = get_model('resources', 'ImportJob')
+    try:
+        job = ImportJob.objects.select_related(
+            'resource__project', 'language', 'user'
+        ).get(pk=job_id)
+    except ImportJob.DoesNotExist, e:
+        # The transaction that created the job may not have been
+        # committed yet.
+        run_import_job.retry(args=[job_id], exc=e, countdown=1)
+        return
+    if job.status != 'pending':
+        return
+    job.status = 'running'
+    job.save()
+    fb = FormatsBackend(job.resource, job.language, job.user)
+    try:
+        added, updated, deleted = fb.run_import(job)
+    except Exception, e:
+        logger.error("resources: Import job %s failed: %s" % (job, e),
+                     exc_info=True)
+        job.status = 'failed'
+        job.error = unicode(e)
+    else:
+        job.status = 'done'
+        job.strings_added = added
+        job.strings_updated = updated
+        job.strings_deleted = deleted
+        if fb.validation_report is not None:
+            job.validation_report = json.dumps(
+                fb.validation_report.to_dict()
+            )
+    finally:
+        if os.path.exists(job.path):
+            os.unlink(job.path)
+    job.finished = datetime.datetime.now()
+    job.save()
+    cache.delete(job._progress_key())
+    post_import_job.send(sender=ImportJob, instance=job)
+    if job.status == 'done':
+        # There is no request in the background, unlike when the file is
+        # imported while the request is served.
+        post_submit_translation.send(
+            None, request=None, resource=job.resource, language=job.language,
+            modified=job.strings_added > 0 or job.strings_updated > 0
+        )
+    if job.callback:
+        notify_import_job.delay(job.id)
+
+
+@task(name='notify_import_job', ignore_result=True, max_retries=3)
+def notify_import_job(job_id):
+    """
+    POST the result of an ImportJob to its callback URL.
+    """
+    import urllib2
+    from django.utils import simplejson as json
+    ImportJob = get_model('resources', 'ImportJob')
+    try:
+        job = ImportJob.objects.select_related(
+            'resource', 'language'
+        ).get(pk=job_id)
+    except ImportJob.DoesNotExist:
+        return
+    request = urllib2.Request(
+        job.callback, json.dumps(job.to_dict()),
+        {'Content-Type': 'application/json'}
+    )
+    try:
+        urllib2.urlopen(
+            request, timeout=settings.IMPORT_JOB_CALLBACK_TIMEOUT
+        ).close()
+    except (urllib2.URLError, IOError), e:
+        logger.warning("resources: Could not notify %s of import job %s: %s"
+                       % (job.callback, job.id, e))
+        notify_import_job.retry(args=[job_id], exc=e, countdown=60)
@@ -501,6 +501,32 @@ class TestTranslationAPI(APIBaseTests):
         res = self.client['registered'].get(url)
         self.assertEquals(res.status_code, 200)
 
+    def test_get_translation_etag(self):
+        url = "".join([
+                reverse(
+                    'apiv2_translation',
+                    kwargs={
+                        'project_slug': 'project1',
+                        'resource_slug': 'resource1',
+                        'lang_code': 'en_US',
+                    }),
+                "?file"
+        ])
+        res = self.client['registered'].get(url)
+        self.assertEquals(res.status_code, 200)
+        etag = res['ETag']
+        res = self.client['registered'].get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(res.status_code, 304)
+        self.assertEquals(res['ETag'], etag)
+        res = self.client['registered'].get(
+            url, HTTP_IF_NONE_MATCH='"%s"' % ('0' * 32)
+        )
+        self.assertEquals(res.status_code, 200)
+        res = self.client['registered'].get(
+            url.replace('?file', ''), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEquals(res.status_code, 200)
+
     def test_delete_translations(self):
         self._create_resource()
         f = open(self.po_file)
@@ -2,6 +2,10 @@
 
 from __future__ import with_statement
 import os
+import shutil
+import tempfile
+import zipfile
+from StringIO import StringIO
 from mock import patch, Mock
 from django.conf import settings
 from django.test import TransactionTestCase
@@ -9,8 +13,12 @@ from transifex.projects.models import Project
 from transifex.txcommon.tests.base import TransactionLanguages, \
         TransactionUsers, TransactionNoticeTypes
 from transifex.languages.models import Language
-from transifex.resources.models import Resource, SourceEntity, Translation
+from transifex.resources.models import Resource, SourceEntity, \
+        Translation, ImportJob
+from transifex.resources.signals import post_import_job
 from transifex.resources.backends import *
+from transifex.resources.export import export_archive, translation_filename
+from transifex.resources.formats.compilation import Mode
 
 
 class TestBackend(TransactionUsers, TransactionLanguages,
@@ -63,6 +71,96 @@ class TestFormatsBackend(TestBackend):
         self.assertEquals(len(ses), 6)
         self.assertEquals(len(trs), 7)
 
+    def test_import_in_background(self):
+        """Test that a file is imported by an ImportJob."""
+        finished = []
+
+        def on_finish(sender, instance, **kwargs):
+            finished.append(instance.id)
+
+        old_dir = settings.IMPORT_JOBS_DIR
+        settings.IMPORT_JOBS_DIR = tempfile.mkdtemp()
+        post_import_job.connect(on_finish)
+        try:
+            fb = FormatsBackend(
+                self.resource, self.source_lang, self.maintainer
+            )
+            job = fb.schedule_import(
+                self.content, is_source=True, filename='pt_BR.po'
+            )
+            # Celery runs the job eagerly in the tests.
+            job = ImportJob.objects.get(pk=job.pk)
+            self.assertEquals(job.status, 'done')
+            self.assertEquals(job.strings_added, 6)
+            self.assertEquals(job.strings_updated, 0)
+            self.assertEquals(job.strings_deleted, 0)
+            self.assertEquals(job.strings_processed, job.strings_total)
+            self.assertEquals(finished, [job.id])
+            self.assertFalse(os.path.exists(job.path))
+            self.assertEquals(
+                SourceEntity.objects.filter(resource=self.resource).count(), 6
+            )
+            self.assertEquals(job.to_dict()['status'], 'done')
+        finally:
+            post_import_job.disconnect(on_finish)
+            shutil.rmtree(settings.IMPORT_JOBS_DIR)
+            settings.IMPORT_JOBS_DIR = old_dir
+
+    def test_import_in_background_notifies_watchers(self):
+        """Test that the watchers of a translation are notified, when it is
+        imported by an ImportJob.
+        """
+        fb = FormatsBackend(self.resource, self.source_lang, self.maintainer)
+        fb.import_source(self.content, self.method)
+        old_dir = settings.IMPORT_JOBS_DIR
+        old_notices = settings.ENABLE_NOTICES
+        settings.IMPORT_JOBS_DIR = tempfile.mkdtemp()
+        settings.ENABLE_NOTICES = True
+        try:
+            with patch('transifex.txcommon.notifications.'
+                       'send_observation_notices_for') as send:
+                fb = FormatsBackend(
+                    self.resource, self.target_lang, self.maintainer
+                )
+                job = fb.schedule_import(self.content, filename='pt_BR.po')
+                job = ImportJob.objects.get(pk=job.pk)
+                self.assertEquals(job.status, 'done')
+                watches = [
+                    args[0] for args, kwargs in send.call_args_list
+                    if kwargs.get('signal') ==
+                    'project_resource_translation_changed'
+                ]
+                self.assertEquals(len(watches), 1)
+                self.assertEquals(watches[0].resource, self.resource)
+                self.assertEquals(watches[0].language, self.target_lang)
+        finally:
+            shutil.rmtree(settings.IMPORT_JOBS_DIR)
+            settings.IMPORT_JOBS_DIR = old_dir
+            settings.ENABLE_NOTICES = old_notices
+
+    def test_export_archive(self):
+        """Test that the files of a bulk export are the same as the ones
+        compiled one at a time.
+        """
+        fb = FormatsBackend(self.resource, self.source_lang, self.maintainer)
+        fb.import_source(self.content)
+        fb = FormatsBackend(self.resource, self.target_lang, self.maintainer)
+        fb.import_translation(self.content)
+        languages = [self.source_lang, self.target_lang]
+        for mode in (None, Mode.REVIEWED):
+            archive = zipfile.ZipFile(StringIO(''.join(
+                export_archive([self.resource], languages, mode=mode)
+            )))
+            self.assertEquals(len(archive.namelist()), 2)
+            for language in languages:
+                fb = FormatsBackend(self.resource, language)
+                self.assertEquals(
+                    archive.read(translation_filename(
+                        self.resource, language, mode
+                    )),
+                    fb.compile_translation(mode=mode)
+                )
+
     def test_handlers_used_for_source_import(self):
         """Test the handlers used for various combinations of resources and
         languages, when pushing the source file.
@@ -3,6 +3,7 @@
 from django.utils import unittest
 from transifex.resources.formats.compilation.compilers import Compiler, \
         PluralCompiler
+from transifex.resources.formats.compilation.plans import CompilationPlan
 
 
 class TestCompiler(unittest.TestCase):
@@ -36,3 +37,33 @@ class TestPluralCompiler(unittest.TestCase):
         res = compiler._apply_translations(translations, text)
         self.assertEquals(res, 'normal plural')
 
+
+
+class TestCompilationPlan(unittest.TestCase):
+    """Test the compilation plans of templates."""
+
+    def test_render(self):
+        """Test that rendering a plan gives the same result as the
+        regular expression substitution.
+        """
+        hash_normal = '1' * 32 + '_tr'
+        hash_plural = '2' * 32 + '_pl_0'
+        hash_missing = '3' * 32 + '_tr'
+        text = u'a %s b %s c %s' % (hash_normal, hash_plural, hash_missing)
+        translations = {
+            hash_normal: u'normal',
+            hash_plural: u'plural',
+        }
+        plan = CompilationPlan.from_content(text)
+        self.assertEquals(len(plan.segments), 7)
+        compiler = PluralCompiler(resource=None)
+        self.assertEquals(
+            plan.render(translations),
+            compiler._apply_translations(translations, text)
+        )
+
+    def test_no_placeholders(self):
+        """Test a template without any placeholders."""
+        plan = CompilationPlan.from_content(u'text')
+        self.assertEquals(plan.segments, [u'text'])
+        self.assertEquals(plan.render({}), u'text')
@@ -7,7 +7,7 @@ from django.conf import settings
 from transifex.txcommon.tests.base import TransactionUsers,\
         TransactionLanguages
 from transifex.projects.models import Project
-from transifex.resources.models import Resource, SourceEntity
+from transifex.resources.models import Resource, SourceEntity, Translation
 from transifex.languages.models import Language
 from transifex.resources.formats.joomla import JoomlaINIHandler
 from transifex.resources.formats.core import Handler
@@ -44,6 +44,83 @@ class TestCoreFunctions(TransactionUsers, TransactionLanguages,
         self.assertEquals(SourceEntity.objects.filter(resource=r).count(), 2)
         settings.MAX_STRING_ITERATIONS = old_max_iters
 
+    def test_source_change_report(self):
+        """Test the report of the changes of a source file import."""
+        parser = JoomlaINIHandler()
+        p = Project.objects.create(slug="pr", name="Pr", source_language=self.language_en)
+        r = Resource.objects.create(
+            slug="core", name="Core", project=p, source_language=self.language_en
+        )
+        parser.bind_resource(r)
+        parser.set_language(self.language_en)
+        parser.bind_content(';1.6\nKEY1="value1"\nKEY2="value2"\nKEY3="value3"\n')
+        parser.parse_file(is_source=True)
+        parser.save2db(is_source=True)
+        report = parser.source_changes
+        self.assertEquals(len(report.added), 3)
+        self.assertEquals(report.strings_added, 3)
+        self.assertEquals(report.removed, [])
+        self.assertTrue(all(se.id is not None for se in report.added))
+
+        parser.bind_content(';1.6\nKEY1="value1"\nKEY2="changed"\nKEY4="value4"\n')
+        parser.parse_file(is_source=True)
+        parser.save2db(is_source=True)
+        report = parser.source_changes
+        self.assertEquals([se.string for se in report.added], ['KEY4'])
+        self.assertEquals([se.string for se in report.removed], ['KEY3'])
+        self.assertEquals(len(report.kept), 2)
+        self.assertEquals(report.strings_updated, 1)
+        self.assertEquals(report.strings_deleted, 1)
+        self.assertEquals(
+            set(SourceEntity.objects.filter(resource=r).values_list(
+                'string', flat=True
+            )), set(['KEY1', 'KEY2', 'KEY4'])
+        )
+        self.assertFalse(Translation.objects.filter(
+            resource=r, source_entity__string='KEY3'
+        ).exists())
+
+    def _import_validated(self, r, validation):
+        parser = JoomlaINIHandler()
+        parser.bind_resource(r)
+        parser.set_language(self.language)
+        parser.bind_content(';1.6\nKEY1="arquivos"\nKEY2="%s arquivos"\n')
+        parser.parse_file(is_source=False)
+        parser.save2db(is_source=False, validation=validation)
+        return parser.validation_report
+
+    def test_import_validation(self):
+        """Test the validation of the translations of an import."""
+        parser = JoomlaINIHandler()
+        p = Project.objects.create(slug="pr", name="Pr", source_language=self.language_en)
+        r = Resource.objects.create(
+            slug="core", name="Core", project=p, source_language=self.language_en
+        )
+        parser.bind_resource(r)
+        parser.set_language(self.language_en)
+        parser.bind_content(';1.6\nKEY1="%s files"\nKEY2="%s files"\n')
+        parser.parse_file(is_source=True)
+        parser.save2db(is_source=True)
+        translations = Translation.objects.filter(
+            resource=r, language=self.language
+        )
+
+        report = self._import_validated(r, 'reject')
+        self.assertEquals(report.checked, 2)
+        self.assertEquals(report.errors, 1)
+        self.assertEquals(report.rejected, 1)
+        failure = report.to_dict()['failures'][0]
+        self.assertEquals(failure['level'], 'error')
+        self.assertEquals(failure['source_entity'], 'KEY1')
+        self.assertEquals(translations.count(), 1)
+
+        report = self._import_validated(r, 'flag')
+        self.assertEquals(report.errors, 1)
+        self.assertEquals(report.rejected, 0)
+        self.assertEquals(translations.count(), 2)
+
+        self.assertEquals(self._import_validated(r, 'off'), None)
+
 
 class TestMode(TestCase):
     """Test the mode variable used in compilation."""
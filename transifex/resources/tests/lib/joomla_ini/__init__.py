@@ -146,3 +146,36 @@ class TestJoomlaIni(FormatsBaseTestCase):
     def test_save_and_compile(self):
         handler = self._test_save2db()
         self._test_compile(handler)
+
+    def test_streaming(self):
+        """Test that a streamed file is imported like one read in memory."""
+        self.parser.bind_file(self.file)
+        self.parser.parse_file(is_source=True)
+        template = self.parser.template
+        strings = [(s.source_entity, s.translation)
+                   for s in self.parser.stringset]
+
+        handler = JoomlaINIHandler()
+        handler.set_language(self.resource.source_language)
+        handler.bind_resource(self.resource)
+        handler.bind_file(self.file, stream=True)
+        self.assertTrue(handler.supports_streaming)
+        self.assertEqual(handler.content, None)
+        handler.parse_file(is_source=True)
+        handler.save2db(is_source=True)
+        self.assertEqual(handler.template, template)
+        self.assertEqual(
+            set(self.resource.source_entities.values_list('string', flat=True)),
+            set(s[0] for s in strings)
+        )
+
+        handler = JoomlaINIHandler()
+        handler.set_language(self.language_ar)
+        handler.bind_resource(self.resource)
+        handler.bind_file(self.trans_file, stream=True)
+        handler.parse_file()
+        added, updated = handler.save2db()
+        self.assertEqual(added, 2)
+        self.assertEqual(Translation.objects.filter(
+            resource=self.resource, language=self.language_ar
+        ).count(), 2)
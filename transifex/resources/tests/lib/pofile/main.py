@@ -1,5 +1,7 @@
+from __future__ import with_statement
 import os
 import polib
+from mock import patch
 from django.utils import unittest
 from django.conf import settings
 from django.core.urlresolvers import reverse
@@ -390,6 +392,78 @@ class TestPoFile(FormatsBaseTestCase):
         self.assertRaises(PoParseError, handler.parse_file, is_source=True)
 
 
+    def test_incremental_stats_of_plurals(self):
+        """Test that the statistics maintained incrementally match a full
+        recount, when pluralized entities change.
+        """
+        old_incremental = getattr(settings, 'INCREMENTAL_STATS', False)
+        settings.INCREMENTAL_STATS = True
+        try:
+            r = Resource.objects.create(
+                slug='plurals', name='Plurals', i18n_type='PO',
+                source_language=self.language_en, project=self.project
+            )
+            source = self.get_content_from_file(
+                os.path.join(os.path.dirname(__file__), 'tests.pot')
+            )
+            translation = self.get_content_from_file(
+                os.path.join(os.path.dirname(__file__), 'ar.po')
+            )
+            updated_source = source.replace(
+                'msgid_plural "{0} results"',
+                'msgid_plural "{0} more results found"'
+            )
+            imports = [
+                (source, self.language_en, True),
+                (translation, self.language_ar, False),
+                (updated_source, self.language_en, True),
+            ]
+            for content, language, is_source in imports:
+                handler = POHandler()
+                handler.bind_resource(r)
+                handler.set_language(language)
+                handler.bind_content(content)
+                handler.parse_file(is_source=is_source)
+                handler.save2db(is_source=is_source)
+                for rl in RLStats.objects.filter(resource=r):
+                    counters = (rl.translated, rl.untranslated,
+                                rl.translated_wordcount)
+                    rl.recount()
+                    self.assertEqual(counters, (
+                        rl.translated, rl.untranslated,
+                        rl.translated_wordcount
+                    ))
+        finally:
+            settings.INCREMENTAL_STATS = old_incremental
+
+
+    def test_revision_changed_after_commit(self):
+        """Test that the revision of a resource is changed once more, after
+        an import has been committed.
+        """
+        handler = POHandler('%s/tests.pot' % os.path.split(__file__)[0])
+        handler.bind_resource(self.resource)
+        handler.set_language(self.resource.source_language)
+        handler.parse_file(is_source=True)
+        with patch('transifex.resources.formats.core.'
+                   'bump_resource_revision') as bump:
+            handler.save2db(is_source=True)
+        bump.assert_called_once_with(self.resource.id)
+
+
+    def test_no_compilation_plan(self):
+        """Test that no compilation plan is stored for PO templates, since
+        the plural compilers do not use them.
+        """
+        handler = POHandler('%s/tests.pot' % os.path.split(__file__)[0])
+        handler.bind_resource(self.resource)
+        handler.set_language(self.resource.source_language)
+        handler.parse_file(is_source=True)
+        with patch('transifex.resources.formats.core.store_plan') as store:
+            handler.save2db(is_source=True)
+        self.assertFalse(store.called)
+
+
 class TestPoFileHeaders(FormatsBaseTestCase):
     """Test PO File library support for PO file headers."""
 
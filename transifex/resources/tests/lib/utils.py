@@ -5,7 +5,8 @@ Tests for the utils module.
 """
 
 from django.utils import unittest
-from transifex.resources.formats.utils.string_utils import split_by_newline
+from transifex.resources.formats.utils.string_utils import split_by_newline, \
+        percent_diff, SimilarityIndex
 
 
 class TestSplitNewlines(unittest.TestCase):
@@ -45,3 +46,43 @@ class TestSplitNewlines(unittest.TestCase):
         expected_pos = [2, 4, 6, -1]
         for res, expected in zip(split_by_newline(text), expected_pos):
             self.assertEqual(res[0], expected)
+
+
+class TestSimilarityIndex(unittest.TestCase):
+    """Test the SimilarityIndex class."""
+
+    def setUp(self):
+        self.strings = [
+            u'Save the file', u'Open a new window', u'', u'Quit',
+            u'Open a new windows', u'The file could not be saved.',
+        ]
+
+    def test_find(self):
+        """Test that the first similar string is found, like a linear scan
+        with percent_diff would do.
+        """
+        queries = [
+            u'Open a new window!', u'The file could not be saved', u'Quit',
+            u'Quiet', u'', u'Something else entirely', u'save the file',
+        ]
+        for max_diff in (10, 30, 60):
+            index = SimilarityIndex(self.strings, max_diff)
+            for q in queries:
+                expected = None
+                for i, s in enumerate(self.strings):
+                    if percent_diff(q, s) < max_diff:
+                        expected = i
+                        break
+                self.assertEqual(index.find(q)[0], expected)
+
+    def test_candidates(self):
+        """Test that dissimilar strings are not compared."""
+        index = SimilarityIndex(self.strings, 10)
+        self.assertEqual(index.candidates(u'Open a new window!'), [1, 4])
+        self.assertEqual(index.candidates(u'Something else entirely'), [])
+
+    def test_limit(self):
+        """Test the limit of comparisons."""
+        index = SimilarityIndex(self.strings, 20)
+        self.assertEqual(index.find(u'Open a old windows', limit=1), (None, 1))
+        self.assertEqual(index.find(u'Open a old windows', limit=2), (4, 2))
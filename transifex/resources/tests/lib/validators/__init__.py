@@ -221,3 +221,36 @@ class TestValidators(TestCase):
         v.rule = 1
         new = "apple"
         v(old, new)
+
+    def test_string_features(self):
+        f = StringFeatures("Open %(num)d files at http://a.org (x@y.com)\\n")
+        self.assertEqual(f.unescaped,
+                         "Open %(num)d files at http://a.org (x@y.com)\n")
+        self.assertEqual(f.printf, [('%(num)d', 'num', 'd')])
+        self.assertEqual(f.urls, ['http://a.org'])
+        self.assertEqual(f.emails, ['x@y.com'])
+        self.assertEqual(f.brackets['('], 2)
+        self.assertTrue(string_features(f) is f)
+
+    def test_pipeline(self):
+
+        class Language(object):
+            pass
+
+        sl = Language()
+        sl.nplurals = 2
+        tl = Language()
+        tl.nplurals = 2
+        pipeline = ValidatorPipeline('PO', sl, tl)
+        self.assertEqual(pipeline.validate("%s apples", u"%s μήλα", 5), [])
+        self.assertRaises(ValidationError, pipeline.validate,
+                          "%s apples", u"μήλα", 5)
+        warnings = pipeline.validate("2 apples (red)", u"μήλα", 5)
+        self.assertEqual(len(warnings), 2)
+        self.assertEqual(pipeline.validate("%s apples", "", 5), [])
+
+    def test_source_features_memoized(self):
+        f = source_features("%s apples", key=(1, 5))
+        self.assertTrue(source_features("%s apples", key=(1, 5)) is f)
+        self.assertFalse(source_features("%d apples", key=(1, 5)) is f)
+        self.assertFalse(source_features("%s apples") is f)
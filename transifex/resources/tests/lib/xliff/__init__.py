@@ -1,10 +1,12 @@
 import os
 import re
+import tempfile
 import unittest
 from transifex.resources.tests.lib.base import FormatsBaseTestCase
 from transifex.languages.models import Language
 from transifex.resources.models import *
 from transifex.resources.formats.xliff import XliffHandler
+from transifex.resources.formats.exceptions import FormatError
 
 
 class TestXliffParser(FormatsBaseTestCase):
@@ -48,6 +50,52 @@ class TestXliffParser(FormatsBaseTestCase):
                 self.assertEqual(entities, 7)
                 self.assertEqual(translations, 7)
 
+    def test_streaming(self):
+        """Test that a streamed file is parsed like one read in memory."""
+        def strings(stringset):
+            return [(s.source_entity, s.translation, s.context, s.rule,
+                     s.occurrences, s.comment) for s in stringset]
+
+        filename = os.path.join(os.path.dirname(__file__), 'example.xlf')
+        handler = XliffHandler(filename)
+        handler.set_language(self.resource.source_language)
+        handler.parse_file(is_source=True)
+        expected = strings(handler.stringset)
+        expected_template = handler.template
+
+        handler = XliffHandler()
+        handler.set_language(self.resource.source_language)
+        handler.bind_file(filename, stream=True)
+        self.assertTrue(handler.supports_streaming)
+        handler.parse_file(is_source=True)
+        self.assertEqual(strings(handler.stringset), expected)
+        template = handler._generate_template(
+            handler._template_from_chunks(handler.stringset.template)
+        )
+        self.assertEqual(template, expected_template)
+
+    def test_streaming_parse_error(self):
+        """Test that a streamed file, which is malformed after its first
+        entry, fails to be imported.
+        """
+        filename = os.path.join(os.path.dirname(__file__), 'example.xlf')
+        lines = open(filename, 'rb').readlines()
+        fd, broken = tempfile.mkstemp(suffix='.xlf')
+        os.write(fd, ''.join(lines[:10]) + '      </wrong>\n')
+        os.close(fd)
+        try:
+            handler = XliffHandler()
+            handler.set_language(self.resource_new.source_language)
+            handler.bind_resource(self.resource_new)
+            handler.bind_file(broken, stream=True)
+            handler.parse_file(is_source=True)
+            self.assertRaises(FormatError, handler.save2db, is_source=True)
+        finally:
+            os.remove(broken)
+        self.assertEqual(
+            SourceEntity.objects.filter(resource=self.resource_new).count(), 0
+        )
+
     def _test_xliff_save2db(self):
         """Test creating source strings from a XLIFF file"""
         source_file = 'example.xlf'
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
+from __future__ import with_statement
 from django.db import IntegrityError
 from django.core.exceptions import ValidationError
 from django.conf import settings
+from django.db.models import Sum
 from django.test import TestCase
 from django.utils.hashcompat import md5_constructor
 from hashlib import md5
@@ -255,3 +257,263 @@ class RLStatsModelWordsTests(BaseTestCase):
         # untranslated English string; in this case it's just the new string
         self.assertEqual(rls_ar.untranslated_wordcount, self.translation_en2.wordcount)
 
+
+
+class RLStatsIncrementalTests(BaseTestCase):
+    """Test the incremental maintenance of the RLStats objects."""
+
+    def setUp(self):
+        super(RLStatsIncrementalTests, self).setUp()
+        self.old_incremental = getattr(settings, 'INCREMENTAL_STATS', False)
+        settings.INCREMENTAL_STATS = True
+
+    def tearDown(self):
+        settings.INCREMENTAL_STATS = self.old_incremental
+        super(RLStatsIncrementalTests, self).tearDown()
+
+    def _counters(self, rl):
+        return (rl.translated, rl.untranslated, rl.reviewed,
+                rl.translated_wordcount, rl.translated_perc)
+
+    def test_delta_matches_recount(self):
+        from transifex.resources.stats import StatsDelta
+        t = Translation.objects.create(
+            string='Arabic plural', rule=5, language=self.language_ar,
+            source_entity=self.source_entity_plural, resource=self.resource
+        )
+        delta = StatsDelta(self.resource)
+        delta.add_translated(self.language_ar.id, [t.source_entity_id])
+        delta.review_translations(
+            Translation.objects.filter(id=self.translation_ar.id), True
+        )
+        Translation.objects.filter(id=self.translation_ar.id).update(
+            reviewed=True
+        )
+        delta.apply()
+        rl = RLStats.objects.get(resource=self.resource, language=self.language_ar)
+        counters = self._counters(rl)
+        rl.recount()
+        self.assertEqual(counters, self._counters(rl))
+
+        delta.remove_translations(Translation.objects.filter(id=t.id))
+        t.delete()
+        delta.apply()
+        rl = RLStats.objects.get(resource=self.resource, language=self.language_ar)
+        counters = self._counters(rl)
+        rl.recount()
+        self.assertEqual(counters, self._counters(rl))
+
+    def test_reconcile(self):
+        from transifex.resources.stats import reconcile_rlstats
+        rl = RLStats.objects.get(resource=self.resource, language=self.language_ar)
+        RLStats.objects.filter(pk=rl.pk).update(translated=0, untranslated=7)
+        self.assertEqual(reconcile_rlstats(RLStats.objects.filter(pk=rl.pk)), 1)
+        rl = RLStats.objects.get(pk=rl.pk)
+        self.assertEqual(rl.translated, 1)
+        self.assertEqual(reconcile_rlstats(RLStats.objects.filter(pk=rl.pk)), 0)
+
+    def test_bulk_recount(self):
+        from transifex.resources.stats import recount_resources
+        RLStats.objects.filter(resource=self.resource).update(
+            translated=0, untranslated=0, translated_wordcount=0
+        )
+        pairs = recount_resources(
+            Resource.objects.filter(pk=self.resource.pk).select_related('project')
+        )
+        rlstats = RLStats.objects.filter(resource=self.resource)
+        self.assertEqual(pairs, rlstats.count())
+        for rl in rlstats:
+            counters = self._counters(rl)
+            rl.recount()
+            self.assertEqual(counters, self._counters(rl))
+
+    def test_bulk_recount_restores_missing(self):
+        from transifex.resources.stats import recount_resources
+        rl = RLStats.objects.get(resource=self.resource, language=self.language_ar)
+        counters = self._counters(rl)
+        rl.delete()
+        recount_resources(
+            Resource.objects.filter(pk=self.resource.pk).select_related('project')
+        )
+        rl = RLStats.objects.get(resource=self.resource, language=self.language_ar)
+        self.assertEqual(counters, self._counters(rl))
+        orders = list(RLStats.objects.filter(resource=self.resource).values_list(
+            '_order', flat=True
+        ))
+        self.assertEqual(len(orders), len(set(orders)))
+
+    def test_coalesced_invalidations_discarded_on_error(self):
+        from mock import patch
+        from transifex.resources.handlers import coalesce_invalidations, \
+                invalidate_stats_cache
+
+        @coalesce_invalidations
+        def failing():
+            invalidate_stats_cache(self.resource, self.language_ar)
+            raise ValueError
+
+        with patch('transifex.resources.handlers._invalidate_stats_cache') \
+                as invalidate:
+            self.assertRaises(ValueError, failing)
+            self.assertFalse(invalidate.called)
+            invalidate_stats_cache(self.resource, self.language_ar)
+            self.assertEqual(invalidate.call_count, 1)
+
+
+class RollupTests(BaseTestCase):
+    """Test the rollups of the statistics of projects and releases."""
+
+    def _assertRollups(self, rollups, rlstats):
+        expected = {}
+        for rl in rlstats:
+            sums = expected.setdefault(rl.language_id, [0, 0, 0, 0])
+            sums[0] += rl.translated
+            sums[1] += rl.untranslated
+            sums[2] += rl.reviewed
+            sums[3] += 1
+        self.assertEqual(expected, dict(
+            (r.language_id, [r.translated, r.untranslated, r.reviewed,
+                             r.resources])
+            for r in rollups
+        ))
+
+    def test_project_rollups(self):
+        from transifex.resources.handlers import invalidate_stats_cache
+        self._assertRollups(
+            ProjectLanguageStats.objects.filter(project=self.project),
+            RLStats.objects.filter(resource__project=self.project)
+        )
+        stats = ProjectStats.objects.get(project=self.project)
+        self.assertEqual(stats.total_entities, Resource.objects.filter(
+            project=self.project).aggregate(t=Sum('total_entities'))['t'])
+
+        Translation.objects.create(
+            string='Arabic plural', rule=5, language=self.language_ar,
+            source_entity=self.source_entity_plural, resource=self.resource
+        )
+        invalidate_stats_cache(self.resource, self.language_ar,
+                               user=self.user['registered'])
+        rl = RLStats.objects.get(resource=self.resource, language=self.language_ar)
+        rollup = ProjectLanguageStats.objects.get(
+            project=self.project, language=self.language_ar
+        )
+        self.assertEqual(rollup.translated, rl.translated)
+        self.assertEqual(rollup.last_committer, self.user['registered'])
+
+        self.resource.delete()
+        self.assertFalse(ProjectLanguageStats.objects.filter(
+            project=self.project).exists())
+        self.assertEqual(ProjectStats.objects.get(
+            project=self.project).resources, 0)
+
+    def test_release_rollups(self):
+        self._assertRollups(
+            ReleaseLanguageStats.objects.by_release(self.release),
+            RLStats.objects.by_release(self.release)
+        )
+        q = ReleaseLanguageStats.objects.by_release(self.release_private)
+        self.assertEqual(q.for_user(self.user['registered']).aggregated(), [])
+        self.assertEqual(
+            len(q.for_user(self.user['maintainer']).aggregated()),
+            RLStats.objects.by_release(self.release_private).count()
+        )
+
+        self.release.resources.remove(self.resource)
+        self.assertFalse(
+            ReleaseLanguageStats.objects.by_release(self.release).exists()
+        )
+
+    def test_bulk_rollups(self):
+        from transifex.resources.stats import recount_resources, \
+                reconcile_rlstats
+        ProjectLanguageStats.objects.filter(project=self.project).delete()
+        ProjectStats.objects.filter(project=self.project).delete()
+        RLStats.objects.filter(resource=self.resource).update(translated=0)
+        recount_resources(
+            Resource.objects.filter(pk=self.resource.pk).select_related('project')
+        )
+        self._assertRollups(
+            ProjectLanguageStats.objects.filter(project=self.project),
+            RLStats.objects.filter(resource__project=self.project)
+        )
+        self.assertTrue(ProjectStats.objects.filter(
+            project=self.project).exists())
+
+        RLStats.objects.filter(
+            resource=self.resource, language=self.language_ar
+        ).update(translated=0)
+        ProjectLanguageStats.objects.filter(
+            project=self.project, language=self.language_ar
+        ).update(translated=0)
+        reconcile_rlstats(RLStats.objects.filter(resource=self.resource))
+        self._assertRollups(
+            ProjectLanguageStats.objects.filter(project=self.project),
+            RLStats.objects.filter(resource__project=self.project)
+        )
+
+    def test_concurrent_insert(self):
+        """Test that a rollup inserted by a concurrent refresh is updated."""
+        from transifex.resources.rollups import _insert
+        stats = ProjectStats.objects.get(project=self.project)
+        stats.pk = None
+        stats.resources = 42
+        _insert(ProjectStats, [stats], ('project_id', ))
+        stats = ProjectStats.objects.get(project=self.project)
+        self.assertEqual(stats.resources, 42)
+
+        rollup = ProjectLanguageStats.objects.filter(project=self.project)[0]
+        rollup.pk = None
+        rollup.translated = 42
+        _insert(ProjectLanguageStats, [rollup], ('project_id', 'language_id'))
+        self.assertEqual(ProjectLanguageStats.objects.get(
+            project=self.project, language=rollup.language_id
+        ).translated, 42)
+
+
+class StateIndexTests(BaseTestCase):
+    """Test the translation state indexes."""
+
+    def test_state_index(self):
+        from transifex.resources.states import StateIndex
+        Translation.objects.filter(id=self.translation_ar.id).update(
+            reviewed=True
+        )
+        index = StateIndex.build(self.resource, self.language_ar)
+        source_ids = Translation.objects.source_strings(
+            [self.resource]
+        ).values_list('id', flat=True)
+        self.assertEqual(list(index.ids), sorted(source_ids))
+        self.assertEqual(index.count('all'), len(source_ids))
+        for method, state in (
+                ('untranslated_source_strings', 'untranslated'),
+                ('translated_source_strings', 'translated'),
+                ('reviewed_source_strings', 'reviewed'),
+                ('unreviewed_source_strings', 'unreviewed')):
+            strings = getattr(Translation.objects, method)(
+                [self.resource], self.language_ar
+            )
+            ids = sorted(strings.values_list('id', flat=True))
+            self.assertEqual(index.select(state), ids)
+            self.assertEqual(index.count(state), len(ids))
+        self.assertEqual(index.count('reviewed'), 1)
+        self.assertEqual(
+            index.count('untranslated', 'reviewed'),
+            index.count('untranslated') + 1
+        )
+
+    def test_revision_changed_when_request_finishes(self):
+        """Test that a revision changed during a request changes again when
+        the request finishes, after the view has committed.
+        """
+        from django.core.signals import request_started, request_finished
+        from mock import patch
+        from transifex.resources.utils import bump_resource_revision
+        with patch('transifex.resources.utils._bump') as bump:
+            request_started.send(sender=None)
+            try:
+                bump_resource_revision(self.resource.id)
+                self.assertEqual(bump.call_count, 1)
+            finally:
+                request_finished.send(sender=None)
+            self.assertEqual(bump.call_count, 2)
+            bump.assert_called_with(self.resource.id)
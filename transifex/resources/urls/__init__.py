@@ -34,6 +34,8 @@ urlpatterns += patterns('',
     url(RESOURCE_URL_PARTIAL+r'edit/$', resource_edit, name='resource_edit'),
     url(RESOURCE_URL_PARTIAL+r'delete/$', resource_delete, name='resource_delete'),
     url(RESOURCE_URL_PARTIAL+'download/pot/$', get_pot_file, name='download_pot'),
+    url(RESOURCE_URL_PARTIAL+'download/all/$', get_translation_archive,
+        name='download_translation_archive'),
     # Resources-Lang
     url(RESOURCE_LANG_URL_PARTIAL+'delete_all/$',
         resource_translations_delete, name='resource_translations_delete'),
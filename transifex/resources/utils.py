@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
+import threading
+import time
 from django.conf import settings
 from django.core.cache import cache
+from django.core.signals import request_started, request_finished
 from django.utils.hashcompat import md5_constructor
 from django.utils.http import urlquote
 
@@ -23,3 +26,73 @@ def invalidate_template_cache(fragment_name, *variables):
         args = md5_constructor(u':'.join([urlquote(var) for var in cur_vars]))
         cache_key = 'template.cache.%s.%s' % (fragment_name, args.hexdigest())
         cache.delete(cache_key)
+
+
+# Revisions are kept as long as memcached allows.
+REVISION_TIMEOUT = 30 * 24 * 60 * 60
+
+# The resources the revision of which changes again when the current
+# request finishes.
+_pending = threading.local()
+
+
+def _revision_key(resource_id):
+    return 'resource.revision.%s' % resource_id
+
+
+def _new_revision():
+    # Revisions start from the current time, so that a revision that has
+    # been evicted from the cache never gets a value it had before.
+    return int(time.time() * 1000)
+
+
+def resource_revision(resource_id):
+    """Return the current revision of the content of a resource.
+
+    The revision changes each time the template or any translation of
+    the resource changes, so it can be used in the keys of caches for
+    anything derived from them.
+    """
+    key = _revision_key(resource_id)
+    revision = cache.get(key)
+    if revision is None:
+        revision = _new_revision()
+        if not cache.add(key, revision, REVISION_TIMEOUT):
+            revision = cache.get(key) or revision
+    return revision
+
+
+def _bump(resource_id):
+    key = _revision_key(resource_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_revision(), REVISION_TIMEOUT)
+
+
+def bump_resource_revision(resource_id):
+    """Change the revision of a resource.
+
+    Inside a request, the revision is changed once more when the request
+    finishes. A view may commit its transaction after the change and
+    anything cached from the old strings in the meantime (e.g. a state
+    index) would be kept under the new revision.
+    """
+    _bump(resource_id)
+    resource_ids = getattr(_pending, 'resource_ids', None)
+    if resource_ids is not None:
+        resource_ids.add(resource_id)
+
+
+def _start_request(sender, **kwargs):
+    _pending.resource_ids = set()
+
+
+def _finish_request(sender, **kwargs):
+    resource_ids = getattr(_pending, 'resource_ids', None)
+    _pending.resource_ids = None
+    for resource_id in resource_ids or ():
+        _bump(resource_id)
+
+request_started.connect(_start_request)
+request_finished.connect(_finish_request)
@@ -35,7 +35,9 @@ from transifex.resources.handlers import (invalidate_object_templates,
     invalidate_stats_cache)
 from transifex.resources.formats.registry import registry
 from transifex.resources.backends import FormatsBackend, FormatsBackendError, \
-        content_from_uploaded_file
+        content_from_uploaded_file, uploaded_file
+from transifex.resources.export import export_archive, export_options, \
+        archive_response
 from autofetch.forms import URLInfoForm
 from autofetch.models import URLInfo
 from .tasks import send_notices_for_resource_edited
@@ -456,6 +458,37 @@ def get_translation_file(request, project_slug, resource_slug, lang_code,
     return response
 
 
+# Restrict access only for private projects
+# DONT allow anonymous access
+@login_required
+@one_perm_required_or_403(pr_project_private_perm,
+    (Project, 'slug__exact', 'project_slug'))
+def get_translation_archive(request, project_slug, resource_slug):
+    """
+    View to download the translation files of a resource in many languages
+    as a zip archive.
+
+    The languages are given as a comma separated list of codes in the
+    'languages' GET parameter. By default, all languages with translations
+    are exported.
+    """
+    resource = get_object_or_404(
+        Resource.objects.select_related('project'),
+        project__slug=project_slug, slug=resource_slug
+    )
+    try:
+        languages, mode = export_options(request.GET)
+    except ValueError, e:
+        return HttpResponseBadRequest(unicode(e))
+    _filename = "%(proj)s_%(res)s.zip" % {
+        'proj': smart_unicode(resource.project.slug),
+        'res': smart_unicode(resource.slug),
+    }
+    return archive_response(
+        export_archive([resource], languages, mode=mode), _filename
+    )
+
+
 # Restrict access only for private projects
 # DONT allow anonymous access
 @login_required
@@ -592,9 +625,17 @@ def update_translation(request, project_slug, resource_slug, lang_code=None):
             status=403, content_type='text/plain'
         )
 
+    if request.POST.get('async'):
+        return _schedule_translation(
+            resource, target_language, request.user, request.FILES,
+            request.POST.get('validation')
+        )
     content = content_from_uploaded_file(request.FILES)
     try:
-        _save_translation(resource, target_language, request.user, content)
+        report = _save_translation(
+            resource, target_language, request.user, content,
+            request.POST.get('validation')
+        )
     except FormatsBackendError, e:
         return HttpResponse(
             simplejson.dumps({
@@ -603,17 +644,60 @@ def update_translation(request, project_slug, resource_slug, lang_code=None):
             }),
             status=400, content_type='text/plain'
         )
+    response = {'msg': "", 'status': 200, }
+    if report is not None:
+        response['validation'] = report.to_dict()
     return HttpResponse(
-        simplejson.dumps({
-                'msg': "",
-                'status': 200,
+        simplejson.dumps(response), status=200, content_type='text/plain'
+    )
+
+
+def _schedule_translation(resource, target_language, user, files,
+                          validation=None):
+    """Import an uploaded translation file in the background.
+
+    Returns:
+        A response with the state of the ImportJob and the URL to poll it.
+    """
+    submitted_file = uploaded_file(files)
+    fb = FormatsBackend(resource, target_language, user)
+    try:
+        if submitted_file is None:
+            raise FormatsBackendError(_("No file has been uploaded."))
+        job = fb.schedule_import(
+            submitted_file, filename=submitted_file.name,
+            validation=validation
+        )
+    except FormatsBackendError, e:
+        return HttpResponse(
+            simplejson.dumps({
+                    'msg': unicode(e),
+                    'status': 400,
+            }),
+            status=400, content_type='text/plain'
+        )
+    response = {
+        'msg': "", 'status': 202, 'job': job.to_dict(),
+        'url': reverse('apiv2_import_job', kwargs={
+            'project_slug': resource.project.slug,
+            'resource_slug': resource.slug,
+            'job_id': job.id,
         }),
-        status=200, content_type='text/plain'
+    }
+    return HttpResponse(
+        simplejson.dumps(response), status=202, content_type='text/plain'
     )
 
 
 @transaction.commit_on_success
-def _save_translation(resource, target_language, user, content):
-    """Save a new translation file for the resource."""
+def _save_translation(resource, target_language, user, content,
+                      validation=None):
+    """Save a new translation file for the resource.
+
+    Returns:
+        The ValidationReport of the import, if the translations have been
+        validated.
+    """
     fb = FormatsBackend(resource, target_language, user)
-    return fb.import_translation(content)
+    fb.import_translation(content, validation=validation)
+    return fb.validation_report
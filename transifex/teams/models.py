@@ -4,8 +4,10 @@ from django.db.models import Q, get_model, permalink
 from django.utils.translation import ugettext_lazy as _
 from transifex.languages.models import Language
 from transifex.projects.models import Project
+from transifex.projects.access import users_changed, on_team_save, \
+        on_team_pre_delete, on_team_post_delete
 from transifex.txcommon.log import log_model
-from transifex.resources.utils import invalidate_template_cache
+from transifex.txcommon.cache import bump_generation
 
 class TeamManager(models.Manager):
 
@@ -94,10 +96,7 @@ class Team(models.Model):
             Q(project__outsource=self.project))
         for r in res:
             RLStats.objects.get_or_create(resource=r, language=self.language)
-            invalidate_template_cache("project_resource_details",
-                self.project.slug, r.slug)
-            invalidate_template_cache("resource_details",
-                self.project.slug, r.slug)
+            bump_generation('resource', r.id)
 
     def delete(self, *args, **kwargs):
         """
@@ -111,10 +110,7 @@ class Team(models.Model):
             rl, created = RLStats.objects.get_or_create(resource=r, language=self.language)
             if rl.translated == 0:
                 rl.delete()
-            invalidate_template_cache("project_resource_details",
-                self.project.slug, r.slug)
-            invalidate_template_cache("resource_details",
-                self.project.slug, r.slug)
+            bump_generation('resource', r.id)
         super(Team, self).delete(*args, **kwargs)
 
 
@@ -198,3 +194,14 @@ def available_teams(self):
     return Team.objects.filter(project=self.outsource or self)
 
 Project.available_teams = property(available_teams)
+
+
+# Invalidate the cached private projects of the users of the teams
+for field in ('coordinators', 'members', 'reviewers'):
+    models.signals.m2m_changed.connect(
+        users_changed(field), sender=getattr(Team, field).through,
+        weak=False
+    )
+models.signals.post_save.connect(on_team_save, sender=Team)
+models.signals.pre_delete.connect(on_team_pre_delete, sender=Team)
+models.signals.post_delete.connect(on_team_post_delete, sender=Team)
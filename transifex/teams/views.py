@@ -9,7 +9,7 @@ from django.contrib import messages
 from django.core.urlresolvers import reverse
 from django.db import IntegrityError
 from django.db import transaction
-from django.db.models import Q, Sum
+from django.db.models import Q
 from django.dispatch import Signal
 from django.http import HttpResponseRedirect
 from django.shortcuts import render_to_response, get_object_or_404
@@ -23,7 +23,7 @@ from notification import models as notification
 from transifex.projects.models import Project
 from transifex.projects.permissions import *
 from transifex.projects.signals import pre_team_request, pre_team_join, ClaNotSignedError
-from transifex.resources.models import RLStats, Resource
+from transifex.resources.models import RLStats, Resource, ProjectStats
 from transifex.teams.forms import TeamSimpleForm, TeamRequestSimpleForm, ProjectsFilterForm
 from transifex.teams.models import Team, TeamAccessRequest, TeamRequest
 # Temporary
@@ -226,8 +226,7 @@ def team_detail(request, project_slug, language_code):
     if projects_filter:
         empty_rlstats = empty_rlstats.filter(project__in=[projects_filter,])
 
-    total_entries = Resource.objects.by_project(project).aggregate(
-        total_entities=Sum('total_entities'))['total_entities']
+    total_entries = ProjectStats.objects.by_project(project).total_entities()
 
     if team:
         coordinators = team.coordinators.select_related('profile').all()[:6]
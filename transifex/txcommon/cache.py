@@ -4,6 +4,7 @@
 Cache-related functionality.
 """
 
+import time
 from django.core.cache import cache
 from django.conf import settings
 from django.template import Context
@@ -35,6 +36,80 @@ def invalidate_template_cache(fragment_name, *variables):
         cache.delete(cache_key)
 
 
+# Generations are kept as long as memcached allows.
+GENERATION_TIMEOUT = 30 * 24 * 60 * 60
+
+
+def _generation_key(namespace, ids):
+    return 'cache.generation.%s.%s' % (
+        namespace, '.'.join([unicode(id_) for id_ in ids])
+    )
+
+
+def _new_generation():
+    # Generations start from the current time, so that a generation that
+    # has been evicted from the cache never gets a value it had before.
+    return int(time.time() * 1000)
+
+
+def get_generations(scopes):
+    """Return the current generations of the specified scopes.
+
+    A scope is a namespace (e.g. 'resource') followed by the ids of the
+    objects it refers to. Bumping the generation of a scope invalidates
+    all the cache entries that embed it in their keys (see
+    ``versioned_fragment_key``).
+
+    Args:
+        scopes: An iterable of tuples, like ``('resource', 5)`` or
+            ``('resource_language', 5, 12)``.
+    Returns:
+        A list with the generation of each scope.
+    """
+    keys = [_generation_key(scope[0], scope[1:]) for scope in scopes]
+    found = cache.get_many(keys)
+    generations = []
+    for key in keys:
+        generation = found.get(key)
+        if generation is None:
+            generation = _new_generation()
+            if not cache.add(key, generation, GENERATION_TIMEOUT):
+                generation = cache.get(key) or generation
+            found[key] = generation
+        generations.append(generation)
+    return generations
+
+
+def bump_generation(namespace, *ids):
+    """Change the generation of a scope."""
+    key = _generation_key(namespace, ids)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_generation(), GENERATION_TIMEOUT)
+
+
+def versioned_fragment_key(fragment_name, scopes, vary_on):
+    """Return the cache key of a versioned template fragment.
+
+    The key embeds the current generations of the scopes the fragment
+    depends on, so the fragment is invalidated by bumping any of them,
+    instead of deleting its keys.
+
+    Args:
+        fragment_name: The name of the fragment.
+        scopes: An iterable of the scopes of the fragment.
+        vary_on: The values the fragment varies on.
+    """
+    parts = [urlquote(var) for var in vary_on]
+    for scope, generation in zip(scopes, get_generations(scopes)):
+        parts.append(urlquote(u'%s=%s' % (
+            '.'.join([unicode(part) for part in scope]), generation
+        )))
+    args = md5_constructor(u':'.join(parts))
+    return 'template.cache.%s.%s' % (fragment_name, args.hexdigest())
+
+
 def update_template_cache(template_name, fragment_names, key_vars, context):
     """Update the template cache with the new data.
 
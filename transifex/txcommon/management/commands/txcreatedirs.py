@@ -7,6 +7,8 @@ def transifex_paths():
     yield s.SCRATCH_DIR
     # Msgmerge dir
     yield s.STORAGE_DIR
+    # Uploads of background imports
+    yield s.IMPORT_JOBS_DIR
     # Log path
     yield s.LOG_PATH
 
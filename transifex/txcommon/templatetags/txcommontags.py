@@ -7,9 +7,11 @@ from django.utils.safestring import mark_safe
 from django.utils.html import conditional_escape
 from django.utils.translation import ugettext_lazy as _
 from django.template import Node, NodeList, TemplateSyntaxError
+from django.core.cache import cache
 from actionlog.models import LogEntry
 from transifex.projects.models import Project
 from transifex import txcommon
+from transifex.txcommon.cache import versioned_fragment_key
 
 register = template.Library()
 
@@ -323,3 +325,68 @@ def get_settings(parser, token):
     return GetSettings(variable_name, context_variable)
 
 register.tag('settings', get_settings)
+
+
+class VersionedCacheNode(Node):
+
+    def __init__(self, nodelist, expire_time, fragment_name, scopes, vary_on):
+        self.nodelist = nodelist
+        self.expire_time = template.Variable(expire_time)
+        self.fragment_name = fragment_name
+        self.scopes = [
+            (namespace, [template.Variable(v) for v in variables])
+            for namespace, variables in scopes
+        ]
+        self.vary_on = [template.Variable(v) for v in vary_on]
+
+    def render(self, context):
+        try:
+            expire_time = int(self.expire_time.resolve(context))
+        except (ValueError, template.VariableDoesNotExist):
+            raise TemplateSyntaxError(
+                '"versioned_cache" tag got a non-integer timeout value'
+            )
+        scopes = [
+            (namespace, ) + tuple(v.resolve(context) for v in variables)
+            for namespace, variables in self.scopes
+        ]
+        vary_on = [v.resolve(context) for v in self.vary_on]
+        key = versioned_fragment_key(self.fragment_name, scopes, vary_on)
+        value = cache.get(key)
+        if value is None:
+            value = self.nodelist.render(context)
+            cache.set(key, value, expire_time)
+        return value
+
+
+def do_versioned_cache(parser, token):
+    """
+    Like the ``cache`` tag, but the fragment also depends on the
+    generations of some scopes (see ``txcommon.cache.bump_generation``).
+    Each scope is a namespace followed by a colon and the comma separated
+    variables of its ids:
+
+    {% versioned_cache 500 resource_details resource:resource.id resource.slug LANGUAGE_CODE %}
+        ...
+    {% endversioned_cache %}
+
+    The fragment is invalidated by calling:
+     -  bump_generation("resource", resource.id)
+    """
+    nodelist = parser.parse(('endversioned_cache',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise TemplateSyntaxError(
+            "%r tag requires at least 2 arguments." % bits[0]
+        )
+    scopes, vary_on = [], []
+    for bit in bits[3:]:
+        namespace, sep, variables = bit.partition(':')
+        if sep:
+            scopes.append((namespace, variables.split(',')))
+        else:
+            vary_on.append(bit)
+    return VersionedCacheNode(nodelist, bits[1], bits[2], scopes, vary_on)
+
+register.tag('versioned_cache', do_versioned_cache)
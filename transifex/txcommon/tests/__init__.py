@@ -1,3 +1,4 @@
 from base import *
 from testmaker import *
 from user import *
+from cache import *
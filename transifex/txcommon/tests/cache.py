@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import with_statement
+from mock import patch
+from django.core.cache import get_cache
+from django.template import Template, Context
+from django.test import TestCase
+from transifex.txcommon.cache import versioned_fragment_key, bump_generation
+
+
+class TestVersionedCache(TestCase):
+    """Test the versioned template fragments."""
+
+    def setUp(self):
+        super(TestVersionedCache, self).setUp()
+        self.cache = get_cache('django.core.cache.backends.locmem.LocMemCache')
+        self.patches = [
+            patch('transifex.txcommon.cache.cache', self.cache),
+            patch('transifex.txcommon.templatetags.txcommontags.cache',
+                self.cache),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.cache.clear()
+        super(TestVersionedCache, self).tearDown()
+
+    def test_fragment_key(self):
+        scopes = [('resource_source', 1), ('resource_language', 1, 2)]
+        key = versioned_fragment_key('details', scopes, ['slug', 'en'])
+        self.assertEqual(
+            key, versioned_fragment_key('details', scopes, ['slug', 'en'])
+        )
+        bump_generation('resource_language', 1, 3)
+        self.assertEqual(
+            key, versioned_fragment_key('details', scopes, ['slug', 'en'])
+        )
+        bump_generation('resource_language', 1, 2)
+        new_key = versioned_fragment_key('details', scopes, ['slug', 'en'])
+        self.assertNotEqual(key, new_key)
+        bump_generation('resource_source', 1)
+        self.assertNotEqual(
+            new_key, versioned_fragment_key('details', scopes, ['slug', 'en'])
+        )
+
+    def test_versioned_cache_tag(self):
+        t = Template(
+            '{% load txcommontags %}'
+            '{% versioned_cache 500 details resource:id %}'
+            '{{ value }}{% endversioned_cache %}'
+        )
+        self.assertEqual(t.render(Context({'id': 1, 'value': 'a'})), 'a')
+        self.assertEqual(t.render(Context({'id': 1, 'value': 'b'})), 'a')
+        self.assertEqual(t.render(Context({'id': 2, 'value': 'b'})), 'b')
+        bump_generation('resource', 1)
+        self.assertEqual(t.render(Context({'id': 1, 'value': 'b'})), 'b')